@@ -19,7 +19,8 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from services.data_service import load_data
+from services.data_service import ARRIVAL_CANDIDATES, DELAY_CANDIDATES, DISTANCE_CANDIDATES, load_data
+from services.mapreduce_service import MeanJob, flight_kpi_jobs, run_jobs
 
 
 # ============================================================
@@ -185,7 +186,7 @@ def prepare_flight_data() -> pd.DataFrame | None:
     if df is None or df.empty:
         return None
 
-    dist_col = _first_existing_col(df, ["Flight Distance", "FlightDistance", "Distance", "flight_distance"])
+    dist_col = _first_existing_col(df, DISTANCE_CANDIDATES)
     if dist_col is None:
         return None
 
@@ -232,9 +233,9 @@ def run_flight_performance_ui():
     # ✅ Total flights should be total rows from dataset
     total_flights_all = int(len(df))
 
-    dist_col = _first_existing_col(df, ["Flight Distance", "FlightDistance", "Distance", "flight_distance"])
-    dep_delay_col = _first_existing_col(df, ["Departure Delay in Minutes", "DepartureDelay", "DepDelay", "departure_delay", "dep_delay"])
-    arr_delay_col = _first_existing_col(df, ["Arrival Delay in Minutes", "ArrivalDelay", "ArrDelay", "arrival_delay", "arr_delay"])
+    dist_col = _first_existing_col(df, DISTANCE_CANDIDATES)
+    dep_delay_col = _first_existing_col(df, DELAY_CANDIDATES)
+    arr_delay_col = _first_existing_col(df, ARRIVAL_CANDIDATES)
 
     # -------------------------------
     # FILTERS
@@ -276,10 +277,11 @@ def run_flight_performance_ui():
     # -------------------------------
     # KPI SECTION (FIXED RENDERING)
     # -------------------------------
-    avg_distance = float(df_f["_dist_num"].mean())
-
-    fuel_s = pd.to_numeric(df_f["Estimated Fuel Consumption (kg)"], errors="coerce")
-    avg_fuel = float(fuel_s.mean()) if fuel_s.notna().any() else 0.0
+    kpi_run = run_jobs(
+        [MeanJob("Avg Distance", "_dist_num"), MeanJob("Avg Fuel", "Estimated Fuel Consumption (kg)")], df_f
+    )["results"]
+    avg_distance = float(kpi_run["Avg Distance"])
+    avg_fuel = float(kpi_run["Avg Fuel"]) if kpi_run["Avg Fuel"] is not None else 0.0
 
     kpis = [
         ("Total Flights", f"{total_flights_all:,}", "Entire dataset"),
@@ -376,39 +378,35 @@ def run_flight_performance_cli():
         input("Press ENTER to return...")
         return
 
-    total_flights_all = int(len(df))
-
-    dist_col = _first_existing_col(df, ["Flight Distance", "FlightDistance", "Distance", "flight_distance"])
-    dep_delay_col = _first_existing_col(df, ["Departure Delay in Minutes", "DepartureDelay", "DepDelay"])
-    arr_delay_col = _first_existing_col(df, ["Arrival Delay in Minutes", "ArrivalDelay", "ArrDelay"])
+    # all headline KPIs come from one fused map-reduce pass over the frame
+    kpis = run_jobs(flight_kpi_jobs(df), df)["results"]
 
-    dist = pd.to_numeric(df[dist_col], errors="coerce")
-    fuel = pd.to_numeric(df["Estimated Fuel Consumption (kg)"], errors="coerce")
-
-    print(f"✈️ Total Flights        : {total_flights_all:,}")
-    print(f"📏 Avg Distance (km)    : {float(dist.mean()):.1f}")
+    print(f"✈️ Total Flights        : {kpis['Total Flights']:,}")
+    if kpis.get("Avg Distance") is not None:
+        print(f"📏 Avg Distance (km)    : {float(kpis['Avg Distance']):.1f}")
+    else:
+        print("📏 Avg Distance (km)    : N/A (column missing)")
 
-    if dep_delay_col:
-        dep = pd.to_numeric(df[dep_delay_col], errors="coerce")
-        print(f"⏱ Avg Departure Delay  : {float(dep.mean()):.1f} min")
+    if kpis.get("Avg Departure Delay") is not None:
+        print(f"⏱ Avg Departure Delay  : {float(kpis['Avg Departure Delay']):.1f} min")
     else:
         print("⏱ Avg Departure Delay  : N/A (column missing)")
 
-    if arr_delay_col:
-        arr = pd.to_numeric(df[arr_delay_col], errors="coerce")
-        print(f"🛬 Avg Arrival Delay    : {float(arr.mean()):.1f} min")
+    if kpis.get("Avg Arrival Delay") is not None:
+        print(f"🛬 Avg Arrival Delay    : {float(kpis['Avg Arrival Delay']):.1f} min")
     else:
         print("🛬 Avg Arrival Delay    : N/A (column missing)")
 
-    print(f"⛽ Avg Fuel Consumption : {float(fuel.mean()):.1f} kg")
+    if kpis.get("Avg Fuel") is not None:
+        print(f"⛽ Avg Fuel Consumption : {float(kpis['Avg Fuel']):.1f} kg")
+    else:
+        print("⛽ Avg Fuel Consumption : N/A (column missing)")
 
-    crew_cols = ["On-board service", "Inflight service", "Checkin service"]
-    available = [c for c in crew_cols if c in df.columns]
-    if available:
+    crew = kpis.get("Crew Ratings")
+    if crew is not None:
         print("\n👨‍✈️ Crew Service Ratings:")
-        for col in available:
-            s = pd.to_numeric(df[col], errors="coerce")
-            print(f" - {col}: {float(s.mean()):.2f}" if s.notna().any() else f" - {col}: N/A")
+        for col, value in crew.items():
+            print(f" - {col}: {float(value):.2f}" if pd.notna(value) else f" - {col}: N/A")
 
     print("\n✔ Flight Performance CLI completed.")
     input("\nPress ENTER to return to main menu...")
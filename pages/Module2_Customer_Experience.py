@@ -10,6 +10,7 @@
 # - Removes seaborn dependency + palette issues (clean, consistent Matplotlib)
 # - Robust column detection + safe numeric conversion
 # - Cleaner layout: filters + KPIs + charts
+# - Batch satisfaction scoring via services.scoring_service (UI section + CLI file scoring)
 # ============================================================
 
 from __future__ import annotations
@@ -308,9 +309,19 @@ def run_customer_experience_ui():
     # ------------------------------------------------------------
     # KPI Summary
     # ------------------------------------------------------------
-    avg_score = float(df_f["satisfaction_score"].mean())
-    total_passengers = int(len(df_f))
-    satisfied_rate = float((df_f["satisfaction_label"] == "satisfied").mean() * 100.0)
+    from services.mapreduce_service import LabelRateJob, MeanJob, RowCountJob, run_jobs
+
+    kpis = run_jobs(
+        [
+            MeanJob("avg_score", "satisfaction_score"),
+            RowCountJob("passengers"),
+            LabelRateJob("satisfied_rate", "satisfaction_label", ["satisfied"]),
+        ],
+        df_f,
+    )["results"]
+    avg_score = float(kpis["avg_score"])
+    total_passengers = int(kpis["passengers"])
+    satisfied_rate = float(kpis["satisfied_rate"])
 
     _kpi_cards(
         st,
@@ -413,10 +424,79 @@ def run_customer_experience_ui():
     ax3.spines["right"].set_visible(False)
     st.pyplot(fig3, clear_figure=True)
 
+    st.divider()
+
+    # ============================================================
+    # Section 4 — Predicted Satisfaction (batch scoring model)
+    # ============================================================
+    _render_html(st, '<div class="section-title">🤖 Predicted Satisfaction (Batch Scoring)</div>')
+    _render_html(
+        st,
+        '<div class="hint">Model trained on train.csv and persisted to disk; the filtered subset is scored in chunks.</div>',
+    )
+
+    from services.scoring_service import get_model, score
+
+    # Loaded (or trained) once per server process instead of on every rerun.
+    @st.cache_resource(show_spinner="Loading satisfaction model...")
+    def _scoring_model() -> dict:
+        return get_model()
+
+    try:
+        bundle = _scoring_model()
+        result = score(df_f, bundle=bundle)
+    except (FileNotFoundError, ValueError) as exc:
+        st.info(f"Scoring model unavailable: {exc}")
+        return
+
+    scores = result["scores"]
+    accuracy = bundle["metrics"].get("holdout_accuracy")
+    _kpi_cards(
+        st,
+        [
+            ("🎯 Predicted Satisfied", f"{float(scores['predicted_satisfied'].mean() * 100.0):.1f}%", "Model prediction"),
+            ("🧪 Holdout Accuracy", f"{accuracy * 100.0:.1f}%" if accuracy is not None else "N/A", "20% holdout"),
+            ("⚡ Scoring Throughput", f"{result['rows_per_sec']:,.0f}", "Rows / sec"),
+            ("🧵 Workers", f"{result['workers']}", f"{result['chunks']} chunk(s)"),
+        ],
+    )
+
 
 # ============================================================
 # CLI Version
 # ============================================================
+def run_scoring_cli(input_path: str, output_path: str | None = None, workers: int | None = None) -> None:
+    """Score a survey CSV of any size, streaming results to `<input>_scored.csv`."""
+    from pathlib import Path
+
+    from services.scoring_service import DEFAULT_MODEL_PATH, get_model, score
+
+    src = Path(input_path)
+    if not src.exists():
+        print(f"❌ ERROR: File not found: {src}")
+        return
+
+    out = Path(output_path) if output_path else src.with_name(f"{src.stem}_scored.csv")
+
+    if not DEFAULT_MODEL_PATH.exists():
+        print("⏳ Training satisfaction model on train.csv (first run only)...")
+    try:
+        bundle = get_model()
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"❌ ERROR: Scoring model unavailable: {exc}")
+        return
+
+    try:
+        result = score(src, bundle=bundle, workers=workers, output_path=out)
+    except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as exc:
+        print(f"❌ ERROR: Could not score {src}: {exc}")
+        return
+
+    print(f"🤖 Scored rows        : {result['rows']:,} ({result['chunks']} chunk(s), {result['workers']} worker(s))")
+    print(f"⚡ Throughput         : {result['rows_per_sec']:,.0f} rows/sec ({result['seconds']:.2f} s)")
+    print(f"💾 Output             : {result['output_path']}")
+
+
 def run_customer_experience_cli():
     print("\n=======================================")
     print("  CUSTOMER EXPERIENCE ANALYTICS (CLI)  ")
@@ -428,15 +508,28 @@ def run_customer_experience_cli():
         input("Press ENTER to return...")
         return
 
+    from services.mapreduce_service import LabelRateJob, MeanJob, ValueCountsJob, run_jobs
+
     df = _standardize_satisfaction(df)
 
-    avg_score = float(df["satisfaction_score"].mean())
-    satisfied_rate = float((df["satisfaction_label"] == "satisfied").mean() * 100.0)
+    # one fused map-reduce pass for all summary KPIs
+    kpis = run_jobs(
+        [
+            MeanJob("avg_score", "satisfaction_score"),
+            LabelRateJob("satisfied_rate", "satisfaction_label", ["satisfied"]),
+            ValueCountsJob("labels", "satisfaction_label"),
+        ],
+        df,
+    )["results"]
 
-    print(f"⭐ Average Satisfaction Score: {avg_score:.2f}")
-    print(f"✅ Satisfied Rate (score ≥ 4): {satisfied_rate:.1f}%")
+    print(f"⭐ Average Satisfaction Score: {float(kpis['avg_score']):.2f}")
+    print(f"✅ Satisfied Rate (score ≥ 4): {float(kpis['satisfied_rate']):.1f}%")
     print("\n📊 Satisfaction Distribution (labels):")
-    print(df["satisfaction_label"].value_counts())
+    print(kpis["labels"])
+
+    path = input("\n🤖 Score a survey CSV for predicted satisfaction? Enter path (blank to skip): ").strip()
+    if path:
+        run_scoring_cli(path)
 
     print("\n✔ Analysis Completed.")
     input("Press ENTER to return...")
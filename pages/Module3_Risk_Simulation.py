@@ -10,9 +10,51 @@
 # academic demonstration purposes.
 # ============================================================
 
+import os
+
 import numpy as np
 import pandas as pd
 
+from services.scenario_store_service import (
+    cached_scenario,
+    clear_scenarios,
+    compare_scenarios,
+    list_scenarios,
+    scenario_overlay,
+)
+from services.simulation_service import (
+    DELAY_MODELS,
+    ExceedanceCurve,
+    FUEL_MODELS,
+    SIMULATION_BACKENDS,
+    STRATA_ALLOCATIONS,
+    VARIANCE_REDUCTION_MODES,
+    adaptive_delay_risk,
+    benchmark_backends,
+    benchmark_delay_models,
+    benchmark_fuel_models,
+    compare_variance_reduction,
+    delay_exceedance_curve,
+    delay_draws,
+    estimate_delay_risk,
+    fit_delay_model,
+    fit_delay_strata,
+    fuel_bands_and_risk,
+    fuel_risk_analytics,
+    gbm_draws,
+    model_delay_draws,
+    network_delay_risk,
+    resolve_backend,
+    run_monte_carlo,
+    simulate_stratified_delay_risk,
+    stream_monte_carlo,
+    sweep_delay_scenarios,
+    sweep_frame,
+    sweep_lookup,
+)
+
+DEFAULT_SEED = 2025
+
 
 def _safe_apply_global_styles() -> bool:
     """Apply shared UI theme if available (safe for CLI too)."""
@@ -163,10 +205,42 @@ def _first_existing_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
     return None
 
 
-def simulate_delay_monte_carlo(mean_delay: float, std_delay: float, n: int, crisis_multiplier: float) -> np.ndarray:
-    delays = np.random.normal(loc=mean_delay, scale=std_delay, size=n)
-    delays = np.clip(delays, 0, None)
-    return delays * crisis_multiplier
+def simulate_delay_monte_carlo(
+    mean_delay: float,
+    std_delay: float,
+    n: int,
+    crisis_multiplier: float,
+    seed: int | None = None,
+    workers: int = 1,
+) -> np.ndarray:
+    """Seeded, shardable delay simulation (same seed -> same draws for any worker count)."""
+    return run_monte_carlo(
+        delay_draws,
+        n,
+        seed=seed,
+        workers=workers,
+        mean_delay=mean_delay,
+        std_delay=std_delay,
+        crisis_multiplier=crisis_multiplier,
+    )
+
+
+def simulate_delay_from_model(
+    model: dict,
+    n: int,
+    crisis_multiplier: float,
+    seed: int | None = None,
+    workers: int = 1,
+) -> np.ndarray:
+    """Delay simulation from a fitted model (see services.simulation_service.fit_delay_model)."""
+    return run_monte_carlo(
+        model_delay_draws,
+        n,
+        seed=seed,
+        workers=workers,
+        model=model,
+        crisis_multiplier=crisis_multiplier,
+    )
 
 
 def delay_risk_kpis(delays: np.ndarray, threshold: float) -> dict:
@@ -185,33 +259,41 @@ def simulate_fuel_price_paths(
     annual_vol: float,
     annual_drift: float,
     n_paths: int,
+    dtype=np.float64,
+    seed: int | None = None,
+    workers: int = 1,
 ) -> pd.DataFrame:
-    dt = 1 / 365.0
-    prices = np.zeros((days + 1, n_paths), dtype=float)
-    prices[0, :] = start_price
-
-    for t in range(1, days + 1):
-        z = np.random.normal(0, 1, n_paths)
-        prices[t, :] = prices[t - 1, :] * np.exp(
-            (annual_drift - 0.5 * annual_vol**2) * dt + annual_vol * np.sqrt(dt) * z
-        )
+    """Raw GBM paths as a DataFrame (one column per path). Use fuel_price_bands for large n_paths."""
+    prices = run_monte_carlo(
+        gbm_draws,
+        n_paths,
+        seed=seed,
+        workers=workers,
+        block_size=4096,
+        start_price=start_price,
+        days=days,
+        annual_vol=annual_vol,
+        annual_drift=annual_drift,
+        dtype=dtype,
+    )
 
     out = pd.DataFrame(prices)
     out.index.name = "Day"
     return out
 
 
-def _delay_histogram_df(delays: np.ndarray) -> pd.DataFrame:
+def _delay_histogram_df(delays: np.ndarray, weights: np.ndarray | None = None) -> pd.DataFrame:
     """
     Build a clean binned histogram DataFrame for st.bar_chart.
     Using value_counts() on float delays creates thousands of unique bins -> ugly chart.
+    Importance-sampling weights (if any) give an unbiased weighted count.
     """
     # Choose a sensible upper bound (avoid extreme tails dominating)
     upper = int(max(180, np.percentile(delays, 99) + 30))
     bin_width = 5
     bins = np.arange(0, upper + bin_width, bin_width)
 
-    hist, edges = np.histogram(delays, bins=bins)
+    hist, edges = np.histogram(delays, bins=bins, weights=weights)
     df_hist = pd.DataFrame(
         {
             "Delay (min)": edges[:-1],
@@ -254,6 +336,7 @@ def _distance_delay_trend_df(df: pd.DataFrame, dist_col: str, delay_col: str) ->
 
 
 def run_streamlit():
+    import matplotlib.pyplot as plt
     import streamlit as st
     from services.data_service import load_data
 
@@ -277,6 +360,7 @@ def run_streamlit():
         df,
         ["Flight Distance", "FlightDistance", "Distance", "flight_distance"],
     )
+    class_col = _first_existing_col(df, ["Class", "Cabin Class", "cabin_class", "class"])
 
     if delay_col is None:
         st.error("Dataset does not contain a departure delay column (expected 'Departure Delay in Minutes' or similar).")
@@ -288,32 +372,128 @@ def run_streamlit():
         return
 
     mean_delay = float(delay_series.mean())
-    std_delay = float(delay_series.std())
-    if not (std_delay > 0):
-        std_delay = 10.0
 
     st.markdown('<div class="section-title">🎛️ Scenario Controls</div>', unsafe_allow_html=True)
 
     c1, c2, c3 = st.columns(3)
     with c1:
-        sims = st.slider("Monte Carlo simulations", 2000, 50000, 12000, step=2000)
+        streaming = st.checkbox("Chunked mode (constant memory, up to 100M draws)", value=False)
+        if streaming:
+            sims = st.select_slider(
+                "Monte Carlo simulations",
+                options=[1_000_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000, 100_000_000],
+                value=10_000_000,
+                format_func=lambda v: f"{v // 1_000_000}M",
+            )
+        else:
+            sims = st.slider("Monte Carlo simulations", 10000, 2000000, 100000, step=10000)
     with c2:
         threshold = st.slider("Delay risk threshold (min)", 15, 180, 60, step=5)
     with c3:
         crisis_mult = st.slider("Crisis multiplier", 1.0, 2.5, 1.15, step=0.05)
 
-    delays = simulate_delay_monte_carlo(mean_delay, std_delay, sims, crisis_mult)
-    kpis = delay_risk_kpis(delays, threshold)
+    r1, r2, r3, r4, r5 = st.columns(5)
+    with r1:
+        model_kind = st.selectbox(
+            "Delay model",
+            list(DELAY_MODELS),
+            index=list(DELAY_MODELS).index("normal"),
+            format_func=DELAY_MODELS.get,
+            help="Clipped normal is the baseline; the other generators fit the observed delay distribution.",
+        )
+    with r2:
+        vr_mode = st.selectbox(
+            "Variance reduction",
+            list(VARIANCE_REDUCTION_MODES),
+            format_func=VARIANCE_REDUCTION_MODES.get,
+            disabled=streaming,
+            help="Chunked mode always uses plain Monte Carlo.",
+        )
+    with r3:
+        seed = st.number_input("Seed", min_value=0, max_value=999999, value=DEFAULT_SEED, step=1)
+    with r4:
+        cpu = os.cpu_count() or 1
+        workers = st.slider("Worker processes", 1, cpu, 1, step=1) if cpu > 1 else 1
+    with r5:
+        backend_choice = st.selectbox(
+            "Kernel backend",
+            list(SIMULATION_BACKENDS),
+            format_func=SIMULATION_BACKENDS.get,
+            help="Numba fuses draw/clip/scale into compiled loops when installed; otherwise NumPy is used.",
+        )
+        backend = resolve_backend(backend_choice)
+
+    use_store = st.checkbox(
+        "Serve repeated scenarios from the scenario store",
+        value=True,
+        help="Results are saved by (dataset, model, parameters, seed, sims) and reused across reruns and users.",
+    )
+
+    delay_values = delay_series.to_numpy(dtype=float)
+    model = fit_delay_model(model_kind, delay_values)
+
+    def _simulate_delay_scenario() -> dict:
+        if streaming:
+            with st.spinner(f"Streaming {sims:,} draws through constant-memory accumulators..."):
+                acc = stream_monte_carlo(
+                    model_delay_draws,
+                    sims,
+                    seed=int(seed),
+                    workers=workers,
+                    model=model,
+                    crisis_multiplier=crisis_mult,
+                    backend=backend,
+                )
+            kpis, kpi_se = acc.kpis(threshold)
+            hist_df = acc.histogram_frame()
+            exceedance = ExceedanceCurve.from_accumulator(acc)
+        elif vr_mode == "plain":
+            # Simulated once per scenario and indexed; threshold changes are searchsorted lookups
+            exceedance = delay_exceedance_curve(
+                model, sims, crisis_mult, seed=int(seed), workers=workers, backend=backend
+            )
+            kpis, kpi_se = exceedance.kpis(threshold)
+            hist_df = _delay_histogram_df(exceedance.values)
+        else:
+            result = estimate_delay_risk(model, sims, threshold, crisis_mult, mode=vr_mode, seed=int(seed))
+            kpis, kpi_se = result["kpis"], result["se"]
+            hist_df = _delay_histogram_df(result["delays"], weights=result["weights"])
+            exceedance = ExceedanceCurve.from_draws(result["delays"], result["weights"])
+        return {
+            "kpis": kpis,
+            "data": {"se": kpi_se, "index_seconds": exceedance.build_seconds},
+            # A fixed x-grid keeps saved curves aligned for side-by-side comparison
+            "frames": {"histogram": hist_df, "exceedance": exceedance.curve(np.arange(0.0, 602.5, 2.5))},
+        }
+
+    engine = "chunked" if streaming else vr_mode
+    if use_store:
+        delay_scenario = cached_scenario(
+            _simulate_delay_scenario,
+            "delay",
+            model.get("fingerprint"),
+            model_kind,
+            {"engine": engine, "backend": backend, "threshold": threshold, "crisis_multiplier": crisis_mult},
+            int(seed),
+            sims,
+            label=f"{DELAY_MODELS[model_kind]} · {engine} · ×{crisis_mult:.2f} · >{threshold}m · {sims:,} · seed {int(seed)}",
+        )
+    else:
+        delay_scenario = {**_simulate_delay_scenario(), "cached": False}
+    kpis, kpi_se = delay_scenario["kpis"], delay_scenario["data"]["se"]
+    hist_df = delay_scenario["frames"]["histogram"]
+    if delay_scenario["cached"]:
+        st.caption(f"Served from the scenario store (saved {pd.Timestamp(delay_scenario['created'], unit='s'):%Y-%m-%d %H:%M}).")
 
     st.markdown('<div class="section-title">⭐ Key Risk Indicators</div>', unsafe_allow_html=True)
 
     k1, k2, k3, k4 = st.columns(4)
     with k1:
-        _kpi_card(st, "Expected Delay (min)", f"{kpis['expected']:.1f}", badge=f"Baseline μ={mean_delay:.1f}")
+        _kpi_card(st, "Expected Delay (min)", f"{kpis['expected']:.1f}", badge=f"± {kpi_se['expected']:.2f} SE | μ={mean_delay:.1f}")
     with k2:
-        _kpi_card(st, f"P(Delay > {threshold}m)", f"{kpis['p_over']:.1f}%", badge="Operational risk")
+        _kpi_card(st, f"P(Delay > {threshold}m)", f"{kpis['p_over']:.1f}%", badge=f"± {kpi_se['p_over']:.3f} pp SE")
     with k3:
-        _kpi_card(st, "95th Percentile", f"{kpis['p95']:.1f}", badge="Resilience KPI")
+        _kpi_card(st, "95th Percentile", f"{kpis['p95']:.1f}", badge=f"± {kpi_se['p95']:.2f} SE")
     with k4:
         _kpi_card(st, "Worst Case", f"{kpis['worst']:.1f}", badge="Tail risk")
 
@@ -323,25 +503,382 @@ def run_streamlit():
     st.markdown('<div class="section-title">📊 Simulated Delay Distribution</div>', unsafe_allow_html=True)
     st.markdown('<div class="hint">Binned histogram (5-minute buckets) of simulated delays.</div>', unsafe_allow_html=True)
 
-    hist_df = _delay_histogram_df(delays)
     st.bar_chart(hist_df)
 
+    st.markdown('<div class="section-title">📈 Exceedance Curve: P(Delay > x)</div>', unsafe_allow_html=True)
+    st.markdown(
+        f'<div class="hint">Read any threshold straight off the curve. Draws are indexed once '
+        f"({delay_scenario['data']['index_seconds'] * 1000:.0f} ms); every point is an O(log n) lookup.</div>",
+        unsafe_allow_html=True,
+    )
+    st.line_chart(delay_scenario["frames"]["exceedance"])
+
+    with st.expander("Precision comparison (same draw budget, all variance-reduction modes)"):
+        st.markdown(
+            '<div class="hint">"Draw savings ×" = how many times more plain Monte Carlo draws give the same SE for P(Delay > threshold).</div>',
+            unsafe_allow_html=True,
+        )
+        if st.button("Compare modes"):
+            st.dataframe(
+                compare_variance_reduction(model, min(sims, 2_000_000), threshold, crisis_mult, seed=int(seed)),
+                use_container_width=True,
+            )
+
+    with st.expander("Delay model benchmark (1M draws per model)"):
+        st.markdown(
+            '<div class="hint">Fit time is cached per dataset fingerprint; sampling throughput is measured on this machine.</div>',
+            unsafe_allow_html=True,
+        )
+        if st.button("Run benchmark"):
+            st.dataframe(benchmark_delay_models(delay_values, seed=int(seed)), use_container_width=True)
+
+    with st.expander("Kernel backend benchmark (NumPy vs Numba, same seed)"):
+        st.markdown(
+            f'<div class="hint">Active backend: <b>{backend}</b>. "Max rel. diff" checks numerical equivalence '
+            "(0 = bit-identical; paths through exp() agree to ~1 ulp). Compile time is the one-off first call.</div>",
+            unsafe_allow_html=True,
+        )
+        if st.button("Benchmark backends"):
+            st.dataframe(benchmark_backends(delay_values, seed=int(seed)), use_container_width=True)
+
     # =========================================================
-    # Fuel price simulation (unchanged)
+    # 🧩 Stratified simulation (distance bucket × class)
+    # =========================================================
+    st.markdown('<div class="section-title">🧩 Stratified Simulation: Distance × Class</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">One delay model per (distance bucket, class) stratum, all strata drawn in one batch. '
+        "Neyman allocation puts more draws where P(Delay > threshold) is most uncertain.</div>",
+        unsafe_allow_html=True,
+    )
+
+    if dist_col is None and class_col is None:
+        st.info("No distance or class column found. Skipping stratified simulation.")
+    else:
+        s1, s2 = st.columns(2)
+        with s1:
+            n_buckets = st.slider("Distance buckets", 2, 8, 4, step=1, disabled=dist_col is None)
+        with s2:
+            allocation = st.selectbox("Allocation", list(STRATA_ALLOCATIONS), format_func=STRATA_ALLOCATIONS.get)
+
+        strata = fit_delay_strata(
+            pd.to_numeric(df[delay_col], errors="coerce"),
+            df[dist_col] if dist_col else None,
+            df[class_col] if class_col else None,
+            kind=model_kind,
+            distance_buckets=n_buckets,
+        )
+        stratified = simulate_stratified_delay_risk(
+            strata, min(sims, 2_000_000), threshold, crisis_mult, allocation=allocation, seed=int(seed)
+        )
+        sk, sse = stratified["kpis"], stratified["se"]
+
+        s1, s2, s3, s4 = st.columns(4)
+        with s1:
+            _kpi_card(st, "Expected Delay (min)", f"{sk['expected']:.1f}", badge=f"± {sse['expected']:.2f} SE")
+        with s2:
+            _kpi_card(st, f"P(Delay > {threshold}m)", f"{sk['p_over']:.1f}%", badge=f"± {sse['p_over']:.3f} pp SE")
+        with s3:
+            _kpi_card(st, "95th Percentile", f"{sk['p95']:.1f}", badge=f"{len(strata['table'])} strata")
+        with s4:
+            _kpi_card(st, "Draw Savings ×", f"{stratified['draw_savings']:.2f}", badge=f"vs plain MC · {stratified['seconds'] * 1000:.0f} ms")
+
+        per = stratified["per_stratum"]
+        st.markdown(f'<div class="hint">P(Delay > {threshold}m) by stratum</div>', unsafe_allow_html=True)
+        st.bar_chart(per.pivot(index="Distance", columns="Class", values="P(>threshold) %").loc[per["Distance"].unique()])
+        with st.expander("Per-stratum KPIs"):
+            st.dataframe(per.round(3), use_container_width=True)
+
+    # =========================================================
+    # 🎯 Adaptive precision (convergence-based stopping)
+    # =========================================================
+    st.markdown('<div class="section-title">🎯 Target-Precision Mode</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Draws in batches until every KPI\'s 95% confidence half-width meets the tolerance '
+        "(or the time budget runs out). Easy scenarios stop early; rare tails get more draws. "
+        "Runs are cached per model, threshold, multiplier, tolerance and seed.</div>",
+        unsafe_allow_html=True,
+    )
+
+    a1, a2 = st.columns(2)
+    with a1:
+        rel_tol = st.select_slider(
+            "Relative tolerance (95% CI half-width)",
+            options=[0.05, 0.02, 0.01, 0.005],
+            value=0.02,
+            format_func=lambda v: f"±{v * 100:g}%",
+        )
+    with a2:
+        time_budget = st.slider("Time budget (s)", 1, 30, 3, step=1)
+
+    adaptive = adaptive_delay_risk(
+        model, threshold, crisis_mult, rel_tol=rel_tol, time_budget_s=float(time_budget), seed=int(seed)
+    )
+    hw = adaptive["half_width"]
+    status = "Converged" if adaptive["converged"] else f"Stopped: {adaptive['stop_reason']}"
+
+    a1, a2, a3, a4 = st.columns(4)
+    with a1:
+        timing = "cache hit" if adaptive["cached"] else f"{adaptive['seconds'] * 1000:.0f} ms"
+        _kpi_card(st, "Draws Used", f"{adaptive['draws']:,}", badge=f"{status} · {timing}")
+    with a2:
+        _kpi_card(st, "Expected Delay (min)", f"{adaptive['kpis']['expected']:.2f}", badge=f"± {hw['expected']:.2f}")
+    with a3:
+        _kpi_card(st, f"P(Delay > {threshold}m)", f"{adaptive['kpis']['p_over']:.2f}%", badge=f"± {hw['p_over']:.3f} pp")
+    with a4:
+        _kpi_card(st, "95th / 99th Percentile", f"{adaptive['kpis']['p95']:.0f} / {adaptive['kpis']['p99']:.0f}", badge=f"± {hw['p95']:.1f} / {hw['p99']:.1f}")
+
+    trace = adaptive["trace"].set_index("Draws")
+    rel_width = pd.DataFrame(
+        {
+            label: (trace[f"{k} ±"] / trace[k].abs()).replace([np.inf, -np.inf], np.nan) * 100.0
+            for k, label in [("expected", "Expected"), ("p_over", "P(>threshold)"), ("p95", "P95"), ("p99", "P99")]
+        }
+    )
+    rel_width["Target"] = rel_tol * 100.0
+    st.markdown('<div class="hint">Convergence trace: relative CI half-width (%) vs draws.</div>', unsafe_allow_html=True)
+    st.line_chart(rel_width)
+
+    # =========================================================
+    # 🗺️ Scenario sweep (crisis multiplier x threshold)
+    # =========================================================
+    st.markdown('<div class="section-title">🗺️ Scenario Sweep: Crisis Multiplier × Threshold</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Every slider combination evaluated from one shared base draw (common random numbers). '
+        "Results are cached, so moving the sliders above is a lookup.</div>",
+        unsafe_allow_html=True,
+    )
+
+    sweep_n = min(sims, 2_000_000)
+    sweep = sweep_delay_scenarios(
+        model,
+        sweep_n,
+        multipliers=np.round(np.arange(1.0, 2.5001, 0.05), 2),
+        thresholds=np.arange(15, 181, 5),
+        seed=int(seed),
+        workers=workers,
+    )
+    current = sweep_lookup(sweep, crisis_mult, threshold)
+
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        _kpi_card(st, "Grid Scenarios", f"{sweep['tensor'][0].size:,}", badge=f"{sweep_n:,} shared draws")
+    with s2:
+        status = "Cache hit" if sweep["cached"] else f"Computed in {sweep['seconds'] * 1000:.0f} ms"
+        _kpi_card(st, f"Lookup: P(>{threshold}m) @ ×{crisis_mult:.2f}", f"{current['p_over']:.1f}%", badge=status)
+    with s3:
+        _kpi_card(st, "Lookup: 99th Percentile", f"{current['p99']:.1f}", badge="Plain MC, same seed")
+
+    heat = sweep_frame(sweep, "p_over")
+    fig, ax = plt.subplots(figsize=(10, 4.5))
+    im = ax.imshow(heat.to_numpy(), aspect="auto", origin="lower", cmap="YlOrRd")
+    ax.set_xticks(range(0, heat.shape[1], 3), [f"{v:g}" for v in heat.columns[::3]])
+    ax.set_yticks(range(0, heat.shape[0], 5), [f"{v:.2f}" for v in heat.index[::5]])
+    ax.set_xlabel("Delay risk threshold (min)")
+    ax.set_ylabel("Crisis multiplier")
+    ax.set_title("P(Delay > threshold) %")
+    fig.colorbar(im, ax=ax, label="%")
+    st.pyplot(fig, clear_figure=True)
+
+    # =========================================================
+    # 🔗 Network delay propagation (aircraft rotations)
+    # =========================================================
+    st.markdown('<div class="section-title">🔗 Network Delay Propagation (Aircraft Rotations)</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Synthetic daily rotations built from the dataset\'s distance distribution. '
+        "Late arrivals eat into turnaround buffers and push delay onto later legs.</div>",
+        unsafe_allow_html=True,
+    )
+
+    if dist_col is None:
+        st.info("No distance column found. Skipping rotation-based propagation.")
+    else:
+        n1, n2, n3 = st.columns(3)
+        with n1:
+            n_aircraft = st.slider("Aircraft", 100, 5000, 1000, step=100)
+        with n2:
+            replicas = st.slider("Network replicas", 100, 5000, 500, step=100)
+        with n3:
+            mean_buffer = st.slider("Mean turnaround buffer (min)", 0, 90, 20, step=5)
+
+        distances = pd.to_numeric(df[dist_col], errors="coerce").to_numpy(dtype=float)
+        network = network_delay_risk(
+            model, distances, n_aircraft, replicas, threshold, crisis_mult, mean_buffer=float(mean_buffer), seed=int(seed)
+        )
+        nk = network["kpis"]
+
+        p1, p2, p3, p4 = st.columns(4)
+        with p1:
+            _kpi_card(st, "Network Delay / Day (min)", f"{nk['network_delay_mean']:,.0f}", badge=f"P95 {nk['network_delay_p95']:,.0f}")
+        with p2:
+            _kpi_card(st, "Knock-on Share", f"{nk['knock_on_share']:.1f}%", badge="Propagated delay")
+        with p3:
+            _kpi_card(
+                st,
+                f"Chains Breaching {threshold}m",
+                f"{nk['breach_share']:.1f}%",
+                badge=f"Independent model: {nk['breach_share_independent']:.1f}%",
+            )
+        with p4:
+            legs_badge = "Cache hit" if network["cached"] else f"{network['legs']:,} legs × {replicas} replicas"
+            _kpi_card(st, "Legs Simulated / s", f"{network['legs_per_sec'] / 1e6:.1f}M", badge=legs_badge)
+
+        st.markdown('<div class="hint">Mean delay by leg of the day: primary vs knock-on.</div>', unsafe_allow_html=True)
+        st.bar_chart(network["leg_profile"])
+
+    # =========================================================
+    # Fuel price simulation (percentile fan chart)
     # =========================================================
     st.markdown('<div class="section-title">🛢️ Fuel Price Volatility (Simulation)</div>', unsafe_allow_html=True)
-    st.markdown('<div class="hint">Synthetic simulation for academic demonstration.</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Synthetic simulation for academic demonstration. Percentile bands across all simulated paths.</div>',
+        unsafe_allow_html=True,
+    )
 
-    f1, f2, f3 = st.columns(3)
+    f0, f1, f2, f3, f4 = st.columns(5)
+    with f0:
+        fuel_kind = st.selectbox("Fuel price model", list(FUEL_MODELS), format_func=lambda k: FUEL_MODELS[k])
     with f1:
         start_price = st.number_input("Starting fuel price (USD)", min_value=20.0, max_value=250.0, value=85.0, step=1.0)
     with f2:
         days = st.slider("Days to simulate", 30, 365, 180, step=15)
     with f3:
         vol = st.slider("Annual volatility", 0.05, 0.80, 0.35, step=0.05)
+    with f4:
+        n_paths = st.slider("Price paths", 10000, 200000, 50000, step=10000)
+
+    def _simulate_fuel_scenario() -> dict:
+        # one pass gives the bands and the risk section below
+        nonlocal fuel_risk
+        run = fuel_bands_and_risk(
+            start_price,
+            days,
+            annual_vol=vol,
+            annual_drift=0.03,
+            n_paths=n_paths,
+            confidence=confidence,
+            volume_bbl=volume_m * 1e6,
+            seed=int(seed),
+            kind=fuel_kind,
+            backend=backend,
+        )
+        fuel_risk = run["risk"]
+        bands = run["bands"]
+        return {"kpis": {f"Day {days} {k}": float(v) for k, v in bands.iloc[-1].items()}, "frames": {"bands": bands}}
+
+    # the chart is filled in once the risk controls below are known
+    fuel_chart = st.empty()
+
+    with st.expander("Fuel model benchmark (paths/sec, float32 vs float64)"):
+        st.markdown(
+            '<div class="hint">All models share one chunked path kernel; jump-diffusion adds Poisson jumps, '
+            "regime-switching alternates calm/stress volatility.</div>",
+            unsafe_allow_html=True,
+        )
+        if st.button("Benchmark fuel models"):
+            st.dataframe(
+                benchmark_fuel_models(start_price, days, annual_vol=vol, annual_drift=0.03, seed=int(seed)),
+                use_container_width=True,
+            )
+
+    st.markdown('<div class="section-title">📉 Fuel Price Risk & Hedging</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">VaR/CVaR of the fuel price rise (airline as buyer), path drawdowns, and the cost '
+        "distribution when a share of volume is swapped at today\'s price.</div>",
+        unsafe_allow_html=True,
+    )
 
-    fuel_paths = simulate_fuel_price_paths(start_price, days, annual_vol=vol, annual_drift=0.03, n_paths=18)
-    st.line_chart(fuel_paths)
+    h1, h2 = st.columns(2)
+    with h1:
+        confidence = st.select_slider("VaR confidence", options=[0.90, 0.95, 0.99], value=0.95, format_func=lambda v: f"{v:.0%}")
+    with h2:
+        volume_m = st.number_input("Fuel volume (million bbl)", min_value=0.1, max_value=50.0, value=1.0, step=0.1)
+
+    fuel_risk = None
+    fuel_params = {"start_price": start_price, "days": days, "annual_vol": vol, "annual_drift": 0.03, "backend": backend}
+    if use_store:
+        fuel_scenario = cached_scenario(
+            _simulate_fuel_scenario,
+            "fuel",
+            None,
+            fuel_kind,
+            fuel_params,
+            int(seed),
+            n_paths,
+            label=f"{FUEL_MODELS[fuel_kind]} · ${start_price:.0f} · σ={vol:.2f} · {days}d · {n_paths:,} · seed {int(seed)}",
+        )
+    else:
+        fuel_scenario = {**_simulate_fuel_scenario(), "cached": False}
+    fuel_chart.line_chart(fuel_scenario["frames"]["bands"])
+
+    if fuel_risk is None:
+        # bands came from the scenario store: only the risk pass is needed
+        fuel_risk = fuel_risk_analytics(
+            start_price,
+            days,
+            annual_vol=vol,
+            annual_drift=0.03,
+            n_paths=n_paths,
+            confidence=confidence,
+            volume_bbl=volume_m * 1e6,
+            seed=int(seed),
+            kind=fuel_kind,
+            backend=backend,
+        )
+    var_row = fuel_risk["var_table"].iloc[-1]
+    dd = fuel_risk["drawdowns"]
+
+    v1, v2, v3, v4 = st.columns(4)
+    with v1:
+        _kpi_card(st, f"VaR {confidence:.0%} @ {days}d", f"${var_row['VaR (USD M)']:.1f}M", badge=f"{var_row['VaR (USD/bbl)']:.2f} USD/bbl")
+    with v2:
+        _kpi_card(st, f"CVaR {confidence:.0%} @ {days}d", f"${var_row['CVaR (USD M)']:.1f}M", badge="Expected tail loss")
+    with v3:
+        _kpi_card(st, "P95 Max Run-up", f"{dd.loc['P95', 'Max run-up %']:.1f}%", badge=f"P95 drawdown {dd.loc['P95', 'Max drawdown %']:.1f}%")
+    with v4:
+        _kpi_card(st, "Paths / s", f"{fuel_risk['paths_per_sec']:,.0f}", badge=f"{fuel_risk['paths']:,} paths")
+
+    st.markdown('<div class="hint">VaR / CVaR by horizon</div>', unsafe_allow_html=True)
+    st.dataframe(fuel_risk["var_table"].round(2), use_container_width=True)
+    st.markdown(f'<div class="hint">Hedge ratio comparison at day {days}</div>', unsafe_allow_html=True)
+    st.dataframe(fuel_risk["hedge_table"].round(2), use_container_width=True)
+    with st.expander("Drawdown / run-up distribution"):
+        st.dataframe(dd.round(2), use_container_width=True)
+
+    # =========================================================
+    # 💾 Saved scenarios (side-by-side comparison)
+    # =========================================================
+    st.markdown('<div class="section-title">💾 Saved Scenarios</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Every seeded delay and fuel scenario above is persisted. Pick saved scenarios to compare '
+        "them side by side. Nothing is resimulated.</div>",
+        unsafe_allow_html=True,
+    )
+
+    g1, g2 = st.columns([1, 3])
+    with g1:
+        store_kind = st.radio("Scenario type", ["delay", "fuel"], format_func={"delay": "Delay risk", "fuel": "Fuel price"}.get)
+    saved = list_scenarios(scenario=store_kind)
+    with g2:
+        repeated = saved["label"].duplicated(keep=False)
+        labels = {
+            key: f"{label} · {key[:8]}" if dup else label
+            for key, label, dup in zip(saved["key"], saved["label"], repeated)
+        }
+        chosen = st.multiselect("Scenarios to compare", list(labels), default=list(labels)[:2], format_func=labels.get)
+
+    if saved.empty:
+        st.info("No saved scenarios of this type yet.")
+    elif chosen:
+        st.dataframe(compare_scenarios(chosen).round(3), use_container_width=True)
+        if store_kind == "delay":
+            st.line_chart(scenario_overlay(chosen, "exceedance", "P(Delay > x) %"))
+        else:
+            st.line_chart(scenario_overlay(chosen, "bands", "Median"))
+
+    with st.expander(f"Scenario store ({len(saved)} saved {store_kind} scenarios)"):
+        st.dataframe(saved.drop(columns="key"), use_container_width=True)
+        if st.button("Clear scenario store"):
+            st.success(f"Removed {clear_scenarios()} saved scenarios.")
 
     # =========================================================
     # FIXED: 🧭 Distance vs Delay (readable buckets)
@@ -385,17 +922,98 @@ def run_cli():
     threshold = 60
     crisis_mult = 1.15
 
-    delays = simulate_delay_monte_carlo(mean_delay, std_delay, sims, crisis_mult)
+    delays = simulate_delay_monte_carlo(mean_delay, std_delay, sims, crisis_mult, seed=DEFAULT_SEED)
     kpis = delay_risk_kpis(delays, threshold)
 
     print(f"Baseline mean delay: {mean_delay:.2f} min | std: {std_delay:.2f} min")
-    print(f"Simulations: {sims} | Crisis multiplier: {crisis_mult:.2f}")
+    print(f"Simulations: {sims} | Crisis multiplier: {crisis_mult:.2f} | Seed: {DEFAULT_SEED}")
     print(f"Expected delay: {kpis['expected']:.2f} min")
     print(f"P(Delay > {threshold} min): {kpis['p_over']:.2f}%")
     print(f"95th percentile: {kpis['p95']:.2f} min")
     print(f"99th percentile: {kpis['p99']:.2f} min")
     print(f"Worst case: {kpis['worst']:.2f} min")
 
+    print("\nDelay model comparison (1M draws each, no crisis multiplier):")
+    bench = benchmark_delay_models(delay_series.to_numpy(dtype=float), seed=DEFAULT_SEED)
+    for _, row in bench.iterrows():
+        print(
+            f" - {row['Model']:<30} {row['Draws/sec'] / 1e6:6.1f}M draws/s | "
+            f"mean={row['Mean']:.1f} | p95={row['P95']:.1f} | p99={row['P99']:.1f}"
+        )
+
+    rare_threshold = 180
+    print(f"\nVariance reduction for P(Delay > {rare_threshold} min), empirical model, {sims} draws:")
+    model = fit_delay_model("empirical", delay_series.to_numpy(dtype=float))
+    vr = compare_variance_reduction(model, sims, rare_threshold, crisis_mult, seed=DEFAULT_SEED)
+    for _, row in vr.iterrows():
+        print(
+            f" - {row['Mode']:<28} P={row['P(>threshold) %']:.3f}% ± {row['SE P(>threshold)']:.4f} "
+            f"(draw savings ×{row['Draw savings ×']:.1f})"
+        )
+
+    dist_col = _first_existing_col(df, ["Flight Distance", "FlightDistance", "Distance"])
+    class_col = _first_existing_col(df, ["Class", "Cabin Class", "cabin_class"])
+    if dist_col or class_col:
+        strata = fit_delay_strata(
+            delay_series,
+            df.loc[delay_series.index, dist_col] if dist_col else None,
+            df.loc[delay_series.index, class_col] if class_col else None,
+            kind="empirical",
+        )
+        stratified = simulate_stratified_delay_risk(strata, 1_000_000, threshold, crisis_mult, seed=DEFAULT_SEED)
+        sk, sse = stratified["kpis"], stratified["se"]
+        print(
+            f"\nStratified (distance × class, {len(strata['table'])} strata, Neyman, 1M draws): "
+            f"expected={sk['expected']:.2f}±{sse['expected']:.3f} | P(>{threshold})={sk['p_over']:.2f}±{sse['p_over']:.3f}% "
+            f"| draw savings ×{stratified['draw_savings']:.2f}"
+        )
+        for _, row in stratified["per_stratum"].iterrows():
+            print(
+                f" - {row['Distance']:>13} | {row['Class']:<9} w={row['Weight']:.3f} draws={row['Draws']:>7,} "
+                f"P(>{threshold})={row['P(>threshold) %']:.2f}% p95={row['P95']:.1f}"
+            )
+
+    exceedance = delay_exceedance_curve(model, 1_000_000, crisis_mult, seed=DEFAULT_SEED)
+    points = ", ".join(f"{x}m: {exceedance.p_over(x) * 100:.2f}%" for x in (15, 30, 60, 120, 180, 240))
+    print(f"\nExceedance curve P(Delay > x), 1M draws indexed in {exceedance.build_seconds:.2f}s: {points}")
+
+    adaptive = adaptive_delay_risk(model, threshold, crisis_mult, rel_tol=0.01, time_budget_s=5.0, seed=DEFAULT_SEED)
+    hw = adaptive["half_width"]
+    print(
+        f"\nTarget precision ±1% (95% CI): {adaptive['draws']:,} draws in {adaptive['seconds']:.2f}s "
+        f"({adaptive['stop_reason']}) | expected={adaptive['kpis']['expected']:.2f}±{hw['expected']:.2f} | "
+        f"P(>{threshold})={adaptive['kpis']['p_over']:.2f}±{hw['p_over']:.3f}%"
+    )
+
+    fuel = fuel_bands_and_risk(85.0, 180, annual_vol=0.35, annual_drift=0.03, n_paths=100000, seed=DEFAULT_SEED)
+    end = fuel["bands"].iloc[-1]
+    print(f"Fuel price day 180 (100k paths): P5={end['P5']:.2f} | median={end['Median']:.2f} | P95={end['P95']:.2f} USD")
+
+    print(f"\nKernel backends (active: {resolve_backend('auto')}):")
+    for _, row in benchmark_backends(delay_series.to_numpy(dtype=float), seed=DEFAULT_SEED).iterrows():
+        if pd.isna(row["Numba (ms)"]):
+            print(f" - {row['Kernel']:<40} NumPy {row['NumPy (ms)']:7.1f} ms | Numba not installed")
+            continue
+        print(
+            f" - {row['Kernel']:<40} NumPy {row['NumPy (ms)']:7.1f} ms | Numba {row['Numba (ms)']:7.1f} ms "
+            f"(×{row['Speedup ×']:.2f}) | max rel. diff {row['Max rel. diff']:.1e}"
+        )
+
+    print("\nFuel model benchmark (50k paths, 180 days):")
+    for _, row in benchmark_fuel_models(85.0, 180, annual_vol=0.35, annual_drift=0.03, seed=DEFAULT_SEED).iterrows():
+        print(
+            f" - {row['Model']:<28} {row['dtype']:<7}: {row['Paths/sec']:>10,.0f} paths/s | "
+            f"day-180 P5={row['Final P5']:.2f} P95={row['Final P95']:.2f}"
+        )
+
+    fuel_risk = fuel["risk"]
+    print(f"\nFuel price risk (95%, 1M bbl, {fuel_risk['paths']:,} paths, {fuel_risk['paths_per_sec']:,.0f} paths/s):")
+    for horizon, row in fuel_risk["var_table"].iterrows():
+        print(f" - {horizon:>3}d: VaR ${row['VaR (USD M)']:.2f}M | CVaR ${row['CVaR (USD M)']:.2f}M")
+    print("Hedge ratios (day 180):")
+    for ratio, row in fuel_risk["hedge_table"].iterrows():
+        print(f" - {ratio:.0%} hedged: VaR ${row['VaR (USD M)']:.2f}M | CVaR ${row['CVaR (USD M)']:.2f}M")
+
 
 def main(mode="streamlit"):
     if mode == "cli":
@@ -11,7 +11,9 @@
 
 from __future__ import annotations
 
+import os
 import time
+import uuid
 from typing import Optional
 
 import numpy as np
@@ -177,9 +179,22 @@ def _df_memory_bytes(df: pd.DataFrame) -> int:
 # -----------------------------
 # Cloud-style patterns
 # -----------------------------
+BATCH_SIZES = list(range(1000, 50001, 1000))
+
+
 def _batch_aggregate(df: pd.DataFrame, batch_size: int) -> pd.DataFrame:
     """
-    Simple batch processing pattern:
+    Batch processing pattern: per-batch KPIs for consecutive chunks.
+    Vectorised (services/batch_service.py); same output as _batch_aggregate_loop.
+    """
+    from services.batch_service import batch_aggregate
+
+    return batch_aggregate(df, batch_size)
+
+
+def _batch_aggregate_loop(df: pd.DataFrame, batch_size: int) -> pd.DataFrame:
+    """
+    Reference chunk-by-chunk implementation:
     - process the dataset in chunks
     - emit per-batch KPIs
     """
@@ -212,7 +227,11 @@ def _batch_aggregate(df: pd.DataFrame, batch_size: int) -> pd.DataFrame:
         sat_rate = None
         if sat_col:
             v = chunk[sat_col]
-            if v.dtype == object:
+            if (
+                pd.api.types.is_object_dtype(v.dtype)
+                or pd.api.types.is_string_dtype(v.dtype)
+                or isinstance(v.dtype, pd.CategoricalDtype)
+            ):
                 sat_rate = float((v.astype(str).str.lower().str.contains("satisf")).mean() * 100.0)
             else:
                 vv = pd.to_numeric(v, errors="coerce")
@@ -236,39 +255,33 @@ def _batch_aggregate(df: pd.DataFrame, batch_size: int) -> pd.DataFrame:
     return pd.DataFrame(out)
 
 
-def _streaming_simulation(df: pd.DataFrame, window_size: int, steps: int, seed: int) -> pd.DataFrame:
+def _streaming_simulation(df: pd.DataFrame, window_size: int, steps: int, seed: int, index=None) -> pd.DataFrame:
     """
     Lightweight streaming-like simulation:
     - sample a rolling window from the dataset
-    - compute metrics per step
+    - compute metrics per step from the prefix-sum window index (O(1) per window)
     """
+    from services.window_service import window_index
+
     rng = np.random.default_rng(seed)
     n = len(df)
     if n == 0:
         return pd.DataFrame()
 
-    delay_col = _first_existing_col(df, ["Departure Delay in Minutes", "DepartureDelay", "DepDelay"])
-    dist_col = _first_existing_col(df, ["Flight Distance", "FlightDistance", "Distance"])
+    index = window_index(df) if index is None else index
+    starts = rng.integers(0, max(1, n), size=steps)
+    ends = np.minimum(n, starts + window_size)
 
-    rows = []
-    for t in range(1, steps + 1):
-        start = int(rng.integers(0, max(1, n)))
-        end = min(n, start + window_size)
-        window = df.iloc[start:end]
-
-        avg_delay = None
-        if delay_col:
-            s = pd.to_numeric(window[delay_col], errors="coerce")
-            avg_delay = float(s.mean()) if s.notna().any() else None
+    out = {"Step": np.arange(1, steps + 1), "Window Rows": ends - starts}
+    for label, name in (("Avg Delay", "delay"), ("Avg Distance", "distance")):
+        if name not in index:
+            out[label] = [None] * steps
+            continue
+        means = index.mean(name, starts, ends)
+        counts = index.count(name, starts, ends)
+        out[label] = [float(m) if c > 0 else None for m, c in zip(means, counts)]
 
-        avg_dist = None
-        if dist_col:
-            s = pd.to_numeric(window[dist_col], errors="coerce")
-            avg_dist = float(s.mean()) if s.notna().any() else None
-
-        rows.append({"Step": t, "Window Rows": len(window), "Avg Delay": avg_delay, "Avg Distance": avg_dist})
-
-    return pd.DataFrame(rows)
+    return pd.DataFrame(out)
 
 
 # -----------------------------
@@ -276,7 +289,27 @@ def _streaming_simulation(df: pd.DataFrame, window_size: int, steps: int, seed:
 # -----------------------------
 def run_streamlit() -> None:
     import streamlit as st
-    from services.data_service import load_data
+    from services.batch_service import (
+        batch_aggregate_many,
+        benchmark_parallel_batches,
+        parallel_batch_aggregate_many,
+        prepare_batch_columns,
+    )
+    from services.cache_service import cache_key, cached, file_fingerprint, shared_cache
+    from services.data_service import dataset_fingerprint, load_data
+    from services.dtype_service import optimize_frame
+    from services.eventtime_service import WINDOW_KINDS, run_event_time_windows
+    from services.ingest_service import DEFAULT_DATA_PATH, ingest_csv
+    from services.mapreduce_service import MAPREDUCE_EXECUTORS, module_kpi_jobs, run_jobs
+    from services.object_store_service import (
+        LocalObjectStore,
+        benchmark_concurrency,
+        delete_prefix,
+        load_partitions,
+        publish_partitions,
+    )
+    from services.stream_service import STREAM_SOURCES, run_event_stream
+    from services.window_service import window_index
 
     _safe_apply_global_styles()
     _inject_module_css()
@@ -294,10 +327,50 @@ def run_streamlit() -> None:
         unsafe_allow_html=True,
     )
 
+    i1, i2, i3, i4 = st.columns(4)
+    with i1:
+        ingest_mode = st.selectbox("Ingestion", ["Async pipeline", "Blocking load_data()"])
+    pipelined = ingest_mode == "Async pipeline"
+    with i2:
+        block_kb = st.select_slider("Read block (KB)", [64, 128, 256, 512, 1024, 2048, 4096], value=1024, disabled=not pipelined)
+    with i3:
+        queue_size = st.number_input("Queue size", min_value=1, max_value=64, value=4, step=1, disabled=not pipelined)
+    with i4:
+        parse_workers = st.number_input("Parse workers", min_value=1, max_value=16, value=2, step=1, disabled=not pipelined)
+    c1, c2 = st.columns(2)
+    with c1:
+        use_cache = st.checkbox("Serve from result cache", value=True)
+    with c2:
+        optimise = st.checkbox("Optimise column dtypes", value=True)
+
     # timing load (cloud-style: show latency and caching behavior)
+    # the cache holds the frame as loaded: dtype-optimised when enabled.
+    # The ingestion settings are part of the key, so changing one reruns the load.
+    cache = shared_cache()
+    source_fp = file_fingerprint(DEFAULT_DATA_PATH)
+    frame_params = {"optimise_dtypes": optimise, "ingestion": ingest_mode}
+    if pipelined:
+        frame_params.update(block_kb=int(block_kb), queue_size=int(queue_size), parse_workers=int(parse_workers))
+    frame_key = cache_key(source_fp, "Dataset frame", frame_params)
+    ingest = None
     t0 = time.perf_counter()
-    df = load_data()
+    loaded = cache.get(frame_key, name="Dataset frame") if use_cache else None
+    from_cache = loaded is not None
+    if not from_cache:
+        if pipelined:
+            ingest = ingest_csv(block_bytes=int(block_kb) * 1024, queue_size=int(queue_size), parse_workers=int(parse_workers))
+            raw = ingest["df"]
+        else:
+            raw = load_data()
+        loaded = optimize_frame(raw) if optimise else {"df": raw}
+        if optimise and not loaded["identical"]:
+            # a KPI changed: keep the report for the page but serve the frame as parsed
+            loaded = {**loaded, "df": raw}
+        if use_cache:
+            cache.put(frame_key, loaded, time.perf_counter() - t0)
+    df = loaded["df"]
     load_ms = (time.perf_counter() - t0) * 1000.0
+    data_fp = cached("Dataset fingerprint", frame_key, lambda: dataset_fingerprint(df)) if use_cache else None
 
     total_rows = int(len(df))
     total_cols = int(df.shape[1])
@@ -312,24 +385,161 @@ def run_streamlit() -> None:
     with k3:
         _kpi_card(st, "Missing Cells", f"{missing_cells:,}", "Data quality")
     with k4:
-        _kpi_card(st, "Load Time", f"{load_ms:.0f} ms", "Ingestion latency")
+        _kpi_card(st, "Load Time", f"{load_ms:.0f} ms", "Served from cache" if from_cache else "Ingestion latency")
+
+    if ingest is not None:
+        with st.expander(f"Pipeline stages · bottleneck: {ingest['bottleneck']}"):
+            st.markdown(
+                '<div class="hint">read → parse → validate → aggregate, joined by bounded queues. '
+                "<b>Starved</b> = waiting for input, <b>Blocked</b> = waiting for space downstream (backpressure). "
+                "The stage with the highest utilisation limits throughput.</div>",
+                unsafe_allow_html=True,
+            )
+            report = ingest["validation"]
+            v1, v2, v3, v4 = st.columns(4)
+            with v1:
+                _kpi_card(st, "Bottleneck", str(ingest["bottleneck"]).title(), "Highest utilisation")
+            with v2:
+                _kpi_card(st, "Blocks", f"{ingest['blocks']:,}", f"{int(block_kb)} KB reads")
+            with v3:
+                _kpi_card(st, "Rows With Gaps", f"{report['rows_with_missing']:,}", "Validation")
+            with v4:
+                _kpi_card(st, "Schema Issues", f"{report['schema_mismatches']}", f"{report['negative_values']} negative values")
+            st.dataframe(ingest["stages"], use_container_width=True)
+            if len(ingest["queues"]):
+                st.line_chart(ingest["queues"].set_index("ms"))
 
     with st.expander("Preview sample records"):
         st.dataframe(df.head(20), use_container_width=True)
 
+    st.markdown('<div class="section-title">🧮 Memory Optimisation</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Each column is profiled (value range, cardinality, missing values) and stored in the smallest '
+        "type that holds every value exactly: downcast integers, nullable integers for whole-number floats with gaps, "
+        "and categoricals for low-cardinality text. The KPIs of this module are recomputed on both frames and must match "
+        "exactly.</div>",
+        unsafe_allow_html=True,
+    )
+    if not optimise:
+        st.caption(f"Dtype optimisation is off · frame uses {mem_mb:.1f} MB.")
+    else:
+        report = loaded["report"]
+        k1, k2, k3, k4 = st.columns(4)
+        with k1:
+            _kpi_card(st, "Before", f"{_bytes_to_mb(loaded['before_bytes']):.1f} MB", "As parsed")
+        with k2:
+            _kpi_card(st, "After", f"{_bytes_to_mb(loaded['after_bytes']):.1f} MB", f"{loaded['seconds'] * 1000:.0f} ms to optimise")
+        with k3:
+            saved = 1 - loaded["after_bytes"] / loaded["before_bytes"] if loaded["before_bytes"] else 0.0
+            changed = int((report["Before dtype"] != report["After dtype"]).sum())
+            _kpi_card(st, "Memory Saved", f"{saved:.0%}", f"{changed} of {len(report)} columns converted")
+        with k4:
+            _kpi_card(st, "KPI Round Trip", "Identical" if loaded["identical"] else "Differs", f"{len(loaded['kpis'])} KPI checks")
+        table = report.assign(
+            **{"Before KB": report["Before bytes"] / 1024.0, "After KB": report["After bytes"] / 1024.0}
+        )[["Column", "Before dtype", "After dtype", "Before KB", "After KB", "Saved %", "Reason"]]
+        if not loaded["identical"]:
+            st.caption("A KPI changed on the optimised frame, so the frame is served as parsed.")
+        st.dataframe(table, use_container_width=True, hide_index=True)
+        st.bar_chart(table.set_index("Column")[["Before KB", "After KB"]])
+        with st.expander("KPI round-trip checks"):
+            st.dataframe(loaded["kpis"], use_container_width=True, hide_index=True)
+
+    st.markdown('<div class="section-title">🪣 Object Storage</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">The dataset is published as CSV partition objects to a local, filesystem-backed object store '
+        "(buckets, keys, multipart uploads, ranged GETs). The loader then fetches the partitions concurrently and parses "
+        "each one as it arrives. Simulated latency adds a fixed round trip to every request, like a remote store.</div>",
+        unsafe_allow_html=True,
+    )
+    o1, o2, o3 = st.columns(3)
+    with o1:
+        rows_per_partition = st.slider("Rows per partition", 2_000, 50_000, 10_000, step=1_000)
+    with o2:
+        latency_ms = st.slider("Simulated request latency (ms)", 0, 200, 20, step=5)
+    with o3:
+        max_concurrency = st.select_slider("Max concurrency", [1, 2, 4, 8, 16, 32], value=8)
+
+    if st.button("Publish & benchmark loader"):
+        store = LocalObjectStore(latency_ms=float(latency_ms))
+        # one prefix per run: concurrent sessions never replace each other's partitions
+        prefix = f"train-{uuid.uuid4().hex}/"
+        with st.spinner("Publishing partitions and timing concurrent loads..."):
+            try:
+                t0 = time.perf_counter()
+                published = publish_partitions(df, store, "sia-analytics", prefix, rows_per_partition=int(rows_per_partition))
+                publish_s = time.perf_counter() - t0
+                levels = [c for c in (1, 2, 4, 8, 16, 32) if c <= int(max_concurrency)]
+                curve = benchmark_concurrency(store, "sia-analytics", prefix, concurrencies=levels)
+                check = load_partitions(store, "sia-analytics", prefix, concurrency=int(max_concurrency))
+                stored = pd.DataFrame(store.list_objects("sia-analytics", prefix))
+            finally:
+                store.latency_ms = 0.0
+                delete_prefix(store, "sia-analytics", prefix)
+
+        best = curve.loc[curve["MB/s"].idxmax()]
+        k1, k2, k3, k4 = st.columns(4)
+        with k1:
+            _kpi_card(st, "Objects", f"{len(published):,}", f"{sum(m['size'] for m in published) / 1024**2:.1f} MB published")
+        with k2:
+            _kpi_card(st, "Publish Time", f"{publish_s * 1000:.0f} ms", f"{sum(len(m['parts']) > 1 for m in published)} multipart")
+        with k3:
+            _kpi_card(st, "Best Throughput", f"{best['MB/s']:.1f} MB/s", f"concurrency {int(best['Concurrency'])}")
+        with k4:
+            same = check["df"].astype(df.dtypes.to_dict()).equals(df)
+            _kpi_card(st, "Round Trip", "Identical" if same else "Differs", "Loaded vs source frame")
+        st.line_chart(curve.set_index("Concurrency")[["MB/s"]])
+        st.dataframe(curve, use_container_width=True)
+        with st.expander("Stored objects"):
+            st.dataframe(stored, use_container_width=True)
+
     st.markdown('<div class="section-title">🧱 Batch Processing</div>', unsafe_allow_html=True)
     st.markdown(
-        '<div class="hint">Process data in chunks and compute per-batch metrics.</div>',
+        '<div class="hint">Process data in chunks and compute per-batch metrics. '
+        "Columns are prepared once and every slider position is aggregated in the same pass, "
+        "so moving the slider is a lookup.</div>",
         unsafe_allow_html=True,
     )
 
     c1, c2 = st.columns(2)
     with c1:
-        batch_size = st.slider("Batch size (rows)", 1000, 50000, 10000, step=1000)
+        batch_size = st.slider("Batch size (rows)", BATCH_SIZES[0], BATCH_SIZES[-1], 10000, step=1000)
     with c2:
         show_table = st.checkbox("Show batch table", value=True)
 
-    batch_df = _batch_aggregate(df, batch_size=batch_size)
+    cpu_count = os.cpu_count() or 1
+    p1, p2 = st.columns(2)
+    with p1:
+        batch_mode = st.selectbox("Batch executor", ["Vectorised (in-process)", "Process pool (shared memory)"])
+    with p2:
+        pool_workers = st.number_input(
+            "Pool workers", min_value=1, max_value=max(2, 2 * cpu_count), value=cpu_count, step=1,
+            disabled=batch_mode.startswith("Vectorised"),
+        )
+
+    computed = []
+
+    def _aggregate_batches() -> dict:
+        computed.append(True)
+        if batch_mode.startswith("Process pool"):
+            return parallel_batch_aggregate_many(df, BATCH_SIZES, workers=int(pool_workers))
+        return batch_aggregate_many(df, BATCH_SIZES)
+
+    t0 = time.perf_counter()
+    if use_cache:
+        # keyed by executor too, so switching it times that executor instead of a lookup
+        batch_params = {"batch_sizes": BATCH_SIZES, "executor": batch_mode}
+        if batch_mode.startswith("Process pool"):
+            batch_params["workers"] = int(pool_workers)
+        batch_tables = cached("Batch tables", data_fp, _aggregate_batches, params=batch_params)
+    else:
+        batch_tables = _aggregate_batches()
+    batch_ms = (time.perf_counter() - t0) * 1000.0
+    batch_df = batch_tables[int(batch_size)]
+    if computed:
+        st.caption(f"{len(batch_tables)} batch sizes aggregated in {batch_ms:.0f} ms · {batch_mode}.")
+    else:
+        st.caption(f"{len(batch_tables)} batch sizes served from the result cache in {batch_ms:.0f} ms · {batch_mode}.")
 
     # chart: rows per batch
     chart_df = batch_df[["Batch", "Rows"]].set_index("Batch")
@@ -343,6 +553,86 @@ def run_streamlit() -> None:
     if show_table:
         st.dataframe(batch_df, use_container_width=True)
 
+    with st.expander("⚡ Parallel speedup curve (this machine)"):
+        st.markdown(
+            '<div class="hint">Partitions every batch size across 1..N pool workers (columns in shared memory, '
+            "partial sums merged) and times each pool warm. Speedup is relative to one worker; "
+            "efficiency = speedup / workers.</div>",
+            unsafe_allow_html=True,
+        )
+        b1, b2 = st.columns(2)
+        with b1:
+            bench_workers = st.number_input(
+                "Max workers", min_value=1, max_value=max(2, 2 * cpu_count), value=min(max(2, cpu_count), 8), step=1
+            )
+        with b2:
+            bench_repeats = st.number_input("Repeats", min_value=1, max_value=10, value=3, step=1)
+        if st.button("Measure speedup"):
+            with st.spinner("Timing process pools..."):
+                bench = benchmark_parallel_batches(
+                    prepare_batch_columns(df), BATCH_SIZES, max_workers=int(bench_workers), repeats=int(bench_repeats)
+                )
+            curve = bench["curve"]
+            best = curve.loc[curve["Speedup"].idxmax()]
+            k1, k2, k3, k4 = st.columns(4)
+            with k1:
+                _kpi_card(st, "CPU Cores", f"{bench['cpu_count']}", "os.cpu_count()")
+            with k2:
+                _kpi_card(st, "Best Speedup", f"{best['Speedup']:.2f}×", f"{int(best['Workers'])} workers")
+            with k3:
+                _kpi_card(st, "In-process", f"{bench['serial_seconds'] * 1000:.0f} ms", "No-pool baseline")
+            with k4:
+                _kpi_card(st, "Output", "Identical" if bench["identical"] else "Differs", "Pool vs serial")
+            ideal = curve.set_index("Workers")[["Speedup"]].assign(Ideal=curve["Workers"].to_numpy(dtype=float))
+            st.line_chart(ideal)
+            st.line_chart(curve.set_index("Workers")[["Efficiency"]])
+            st.dataframe(curve, use_container_width=True)
+
+    st.markdown('<div class="section-title">🗺️ Map-Reduce KPIs</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">The headline KPIs of Modules 1, 2 and 4 are map-reduce jobs: each maps a row partition to a '
+        "partial result that an associative combiner merges. Fused, every job runs inside one task per partition, "
+        "so the frame is scanned once.</div>",
+        unsafe_allow_html=True,
+    )
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        mr_executor = st.selectbox("Executor", list(MAPREDUCE_EXECUTORS))
+    with m2:
+        mr_partitions = st.slider("Partitions", 1, 64, 8)
+    with m3:
+        mr_fuse = st.checkbox("Fuse jobs into one scan", value=True)
+
+    kpi_groups = module_kpi_jobs(df)
+    kpi_jobs = [job for group in kpi_groups.values() for job in group]
+    mr = run_jobs(kpi_jobs, df, partitions=mr_partitions, executor=mr_executor, fuse=mr_fuse)
+
+    k1, k2, k3, k4 = st.columns(4)
+    with k1:
+        _kpi_card(st, "Jobs", f"{len(kpi_jobs)}", f"{len(kpi_groups)} modules")
+    with k2:
+        _kpi_card(st, "Tasks", f"{mr['tasks']:,}", "Fused" if mr["fused"] else "One per job × partition")
+    with k3:
+        _kpi_card(st, "Wall Time", f"{mr['seconds'] * 1000:.0f} ms", f"{mr_executor} executor")
+    with k4:
+        slowest = mr["timings"].loc[mr["timings"]["Map s"].idxmax(), "Job"]
+        _kpi_card(st, "Costliest Job", slowest, "Largest map time")
+
+    job_module = {job.name: module for module, group in kpi_groups.items() for job in group}
+    summary = []
+    for name, value in mr["results"].items():
+        if isinstance(value, pd.Series):
+            text = ", ".join(f"{k}: {v:,.2f}" for k, v in value.items())
+        elif isinstance(value, float):
+            text = f"{value:,.2f}"
+        elif isinstance(value, int):
+            text = f"{value:,}"
+        else:
+            text = "n/a" if value is None else str(value)
+        summary.append({"Module": job_module[name], "KPI": name, "Value": text})
+    st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+    st.bar_chart(mr["timings"].set_index("Job")[["Map s"]])
+
     st.markdown('<div class="section-title">📡 Streaming Simulation</div>', unsafe_allow_html=True)
     st.markdown(
         '<div class="hint">A lightweight simulation that computes metrics on a rolling window, similar to near real-time dashboards.</div>',
@@ -357,7 +647,10 @@ def run_streamlit() -> None:
     with s3:
         seed = st.number_input("Seed", min_value=1, max_value=999999, value=2025, step=1)
 
-    stream_df = _streaming_simulation(df, window_size=window_size, steps=steps, seed=int(seed))
+    t0 = time.perf_counter()
+    win_index = window_index(df, data_fp)
+    index_ms = (time.perf_counter() - t0) * 1000.0
+    stream_df = _streaming_simulation(df, window_size=window_size, steps=steps, seed=int(seed), index=win_index)
     if len(stream_df) == 0:
         st.info("No data available for streaming simulation.")
     else:
@@ -372,6 +665,203 @@ def run_streamlit() -> None:
         with st.expander("Show streaming metrics table"):
             st.dataframe(stream_df, use_container_width=True)
 
+        st.markdown("**Window sweep**")
+        st.markdown(
+            f'<div class="hint">Every window of the chosen size, one per step of rows, answered from a prefix-sum index '
+            f"(ready in {index_ms:.1f} ms; reused across reruns while the dataset is unchanged). Each window mean is two lookups, so the whole sweep is one vectorised subtraction.</div>",
+            unsafe_allow_html=True,
+        )
+        w1, w2 = st.columns(2)
+        with w1:
+            sweep_window = st.slider("Sweep window (rows)", 100, 50_000, 4_000, step=100)
+        with w2:
+            sweep_step = st.slider("Sweep step (rows)", 1, 5_000, 1, step=1)
+
+        t0 = time.perf_counter()
+        sweep = win_index.sweep(sweep_window, step=sweep_step)
+        sweep_ms = (time.perf_counter() - t0) * 1000.0
+
+        k1, k2, k3, k4 = st.columns(4)
+        with k1:
+            _kpi_card(st, "Windows", f"{len(sweep):,}", f"{sweep_ms:.1f} ms to compute")
+        if "delay" in win_index and len(sweep):
+            delay_means = sweep["delay mean"]
+            low_at = int(sweep.loc[delay_means.idxmin(), "Start"])
+            high_at = int(sweep.loc[delay_means.idxmax(), "Start"])
+            with k2:
+                _kpi_card(st, "Lowest Window Delay", f"{delay_means.min():.2f} min", f"Starts at row {low_at:,}")
+            with k3:
+                _kpi_card(st, "Highest Window Delay", f"{delay_means.max():.2f} min", f"Starts at row {high_at:,}")
+            with k4:
+                _kpi_card(st, "Spread", f"{delay_means.max() - delay_means.min():.2f} min", "Max − min window mean")
+            # chart a thinned view; the KPIs above use every window
+            thin = max(1, len(sweep) // 2000)
+            st.line_chart(sweep.iloc[::thin].set_index("Start")[["delay mean"]])
+
+    st.markdown('<div class="section-title">⏱️ Event-Time Windows</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Windows over <b>event time</b> instead of row order. Each record gets an event time (from a '
+        "timestamp column when the dataset has one, otherwise seeded Poisson arrivals with a random delivery lag, so "
+        "records arrive out of order). A window fires when the watermark (latest event time − allowed "
+        "out-of-orderness) passes its end. Late records re-emit the window until the allowed lateness runs out; then "
+        "its state is evicted and later records are dropped. Streams longer than the dataset cycle through it, and "
+        "open-window state stays flat.</div>",
+        unsafe_allow_html=True,
+    )
+    e1, e2, e3, e4 = st.columns(4)
+    with e1:
+        et_kind = st.selectbox("Window type", list(WINDOW_KINDS))
+    with e2:
+        et_size = st.slider("Window size (s)", 5, 600, 60, step=5, disabled=et_kind == "session")
+    with e3:
+        slide_options = [v for v in (5, 10, 15, 30, 60, 120, 300) if v <= et_size]
+        et_slide = st.select_slider(
+            "Slide (s)", slide_options, value=min(15, slide_options[-1]), disabled=et_kind != "sliding"
+        )
+    with e4:
+        et_gap = st.slider("Session gap (s)", 0.01, 5.0, 0.1, step=0.01, disabled=et_kind != "session")
+    e5, e6, e7, e8 = st.columns(4)
+    with e5:
+        et_ooo = st.slider("Out-of-orderness (s)", 0.0, 30.0, 5.0, step=0.5)
+    with e6:
+        et_lateness = st.slider("Allowed lateness (s)", 0.0, 60.0, 0.0, step=0.5)
+    with e7:
+        et_events = st.select_slider("Stream length (events)", [25_000, 50_000, 100_000, 200_000, 500_000], value=100_000)
+    with e8:
+        key_options = ["(none)"] + [c for c in ("Class", "Type of Travel", "Customer Type") if c in df.columns]
+        et_key = st.selectbox("Key by", key_options)
+
+    et_params = {
+        "kind": et_kind,
+        "size": float(et_size),
+        "slide": float(et_slide) if et_kind == "sliding" else None,
+        "gap": float(et_gap),
+        "out_of_orderness": float(et_ooo),
+        "allowed_lateness": float(et_lateness),
+        "events": int(et_events),
+        "key": None if et_key == "(none)" else et_key,
+        "seed": int(seed),
+    }
+    if use_cache:
+        et = cached("Event-time windows", data_fp, lambda: run_event_time_windows(df, **et_params), params=et_params)
+    else:
+        et = run_event_time_windows(df, **et_params)
+
+    k1, k2, k3, k4 = st.columns(4)
+    with k1:
+        eps = f"{et['events_per_sec']:,.0f} events/s" if et["events_per_sec"] else ""
+        _kpi_card(st, "Windows Emitted", f"{et['emitted']:,}", eps)
+    with k2:
+        _kpi_card(st, "Late Accepted", f"{et['late_accepted']:,}", "Behind the watermark, still counted")
+    with k3:
+        _kpi_card(st, "Late Dropped", f"{et['late_dropped']:,}", "Window state already evicted")
+    with k4:
+        _kpi_card(st, "Peak Open Windows", f"{et['max_open_windows']:,}", f"{et['evicted']:,} evicted · event time: {et['time_source']}")
+
+    results = et["results"]
+    if len(results):
+        fired = results[~results["Late Update"]]
+        if et_params["key"]:
+            chart = fired.pivot_table(index="End", columns="Key", values="Avg Delay", aggfunc="last")
+        else:
+            chart = fired.set_index("End")[["Avg Delay"]]
+        st.line_chart(chart.tail(300))
+    if len(et["state"]):
+        st.line_chart(et["state"].set_index("Events")[["Open Windows"]])
+    with st.expander("Emitted windows (latest)"):
+        st.dataframe(results.tail(500), use_container_width=True, hide_index=True)
+
+    st.markdown('<div class="section-title">🛰️ Event Stream</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">A real local stream: a replayer emits dataset rows at a fixed rate over a Unix socket '
+        "(events are dropped when the buffer is full) or appends them to a log file that is tailed. "
+        "The consumer updates rolling-window KPIs per event and measures throughput, end-to-end lag and drops.</div>",
+        unsafe_allow_html=True,
+    )
+
+    e1, e2, e3, e4 = st.columns(4)
+    with e1:
+        source_labels = {"socket": "Unix socket (datagrams)", "file": "Append-only file tail"}
+        stream_source = st.selectbox("Source", list(STREAM_SOURCES), format_func=source_labels.get)
+    with e2:
+        stream_rate = st.number_input("Rate (events/sec, 0 = max)", min_value=0, max_value=1_000_000, value=20_000, step=5_000)
+    with e3:
+        stream_events = st.slider("Events", 1_000, 200_000, 20_000, step=1_000)
+    with e4:
+        stream_window = st.slider("Window (events)", 100, 20_000, 4_000, step=100)
+
+    if st.button("Start event stream"):
+        with st.spinner("Streaming events..."):
+            stream = run_event_stream(
+                df,
+                source=stream_source,
+                rate=float(stream_rate),
+                events=int(stream_events),
+                window_size=int(stream_window),
+                report_every=max(100, int(stream_events) // 50),
+            )
+        lag = stream["lag_ms"]
+        eps = stream["events_per_sec"]
+        target = f"Target {stream['target_rate']:,.0f}/s" if stream["target_rate"] else "Unthrottled"
+        k1, k2, k3, k4 = st.columns(4)
+        with k1:
+            _kpi_card(st, "Sustained Rate", f"{eps:,.0f}/s" if eps else "n/a", target)
+        with k2:
+            if lag["p95"] is None:
+                _kpi_card(st, "Lag p95", "n/a", "No events received")
+            else:
+                _kpi_card(st, "Lag p95", f"{lag['p95']:.2f} ms", f"mean {lag['mean']:.2f} ms")
+        with k3:
+            _kpi_card(st, "Dropped", f"{stream['dropped']:,}", f"{stream['dropped'] / int(stream_events):.1%} of events")
+        with k4:
+            avg = stream["window"]["avg_delay"]
+            _kpi_card(st, "Window Avg Delay", f"{avg:.2f} min" if avg is not None else "n/a", f"Last {stream['window']['events']:,} events")
+        if not stream["completed"]:
+            st.warning("The stream timed out before the end-of-stream marker arrived.")
+        timeline = stream["timeline"]
+        if len(timeline):
+            st.line_chart(timeline.set_index("Events")[["Window Avg Delay"]].dropna())
+            st.line_chart(timeline.set_index("Events")[["Lag ms"]])
+            with st.expander("Show stream timeline"):
+                st.dataframe(timeline, use_container_width=True)
+
+    st.markdown('<div class="section-title">🗄️ Result Cache</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="hint">Expensive results are cached in two tiers: an in-memory LRU with a byte budget in front of an '
+        "on-disk store with size-based eviction and a TTL. Keys hash the dataset fingerprint with the computation "
+        "and its parameters. Latency saved = original compute time minus lookup time, summed over hits.</div>",
+        unsafe_allow_html=True,
+    )
+    stats = cache.stats()
+    k1, k2, k3, k4 = st.columns(4)
+    with k1:
+        hit_rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+        _kpi_card(st, "Hit Rate", hit_rate, f"{stats['memory_hits']} memory · {stats['disk_hits']} disk · {stats['misses']} miss")
+    with k2:
+        _kpi_card(st, "Latency Saved", f"{stats['seconds_saved'] * 1000:,.0f} ms", f"{stats['lookups']} lookups")
+    with k3:
+        _kpi_card(
+            st,
+            "Memory Tier",
+            f"{_bytes_to_mb(stats['memory_bytes']):.1f} MB",
+            f"{stats['memory_entries']} entries · {stats['memory_evictions']} evicted · {_bytes_to_mb(stats['memory_budget']):.0f} MB budget",
+        )
+    with k4:
+        _kpi_card(
+            st,
+            "Disk Tier",
+            f"{_bytes_to_mb(stats['disk_bytes']):.1f} MB",
+            f"{stats['disk_entries']} entries · {stats['disk_evictions']} evicted · {stats['disk_expired']} expired",
+        )
+    history = cache.history()
+    if len(history):
+        with st.expander("Recent lookups"):
+            st.dataframe(history.iloc[::-1], use_container_width=True, hide_index=True)
+    if st.button("Clear cache"):
+        cache.clear()
+        cache.reset_stats()
+        st.caption("Cache cleared (both tiers); the next run recomputes every entry.")
+
     st.markdown('<div class="section-title">⚖️ Batch vs Real-time</div>', unsafe_allow_html=True)
     st.markdown(
         """
@@ -410,22 +900,146 @@ def run_cli() -> None:
     print(f"Estimated memory: {mem_mb:.2f} MB")
     print(f"Load time: {load_ms:.0f} ms")
 
+    from services.dtype_service import optimize_frame
+
+    opt = optimize_frame(df)
+    print(
+        f"\nDtype optimisation: {_bytes_to_mb(opt['before_bytes']):.2f} MB -> {_bytes_to_mb(opt['after_bytes']):.2f} MB "
+        f"in {opt['seconds'] * 1000:.0f} ms | KPI round trip: {'identical' if opt['identical'] else 'DIFFERS'}"
+    )
+    for _, r in opt["report"].sort_values("Before bytes", ascending=False).head(8).iterrows():
+        print(
+            f"  {r['Column']:<34} {r['Before dtype']:>8} -> {r['After dtype']:<9} "
+            f"{r['Before bytes'] / 1024:8.0f} KB -> {r['After bytes'] / 1024:6.0f} KB"
+        )
+
+    from services.ingest_service import ingest_csv
+
+    ingest = ingest_csv()
+    print(
+        f"\nAsync ingestion pipeline: {ingest['seconds'] * 1000:.0f} ms, {ingest['blocks']} blocks, "
+        f"identical frame: {'yes' if ingest['df'].equals(df) else 'NO'}, bottleneck: {ingest['bottleneck']}"
+    )
+    for _, r in ingest["stages"].iterrows():
+        print(
+            f"  {r['Stage']:<9} busy {r['Busy s'] * 1000:6.0f} ms | starved {r['Starved s'] * 1000:6.0f} ms | "
+            f"blocked {r['Blocked s'] * 1000:6.0f} ms | utilisation {r['Utilisation']:.0%}"
+        )
+
     batch_size = 10000
+    t0 = time.perf_counter()
     batch_df = _batch_aggregate(df, batch_size=batch_size)
+    vec_ms = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    loop_df = _batch_aggregate_loop(df, batch_size=batch_size)
+    loop_ms = (time.perf_counter() - t0) * 1000.0
+
+    from services.object_store_service import LocalObjectStore, benchmark_concurrency, delete_prefix, publish_partitions
+
+    store = LocalObjectStore(latency_ms=20.0)
+    prefix = f"train-{uuid.uuid4().hex}/"
+    try:
+        published = publish_partitions(df, store, "sia-analytics", prefix, rows_per_partition=10_000)
+        curve = benchmark_concurrency(store, "sia-analytics", prefix, concurrencies=(1, 2, 4, 8))
+    finally:
+        store.latency_ms = 0.0
+        delete_prefix(store, "sia-analytics", prefix)
+    print(f"\nObject store loader ({len(published)} partitions, 20 ms simulated latency):")
+    for _, r in curve.iterrows():
+        print(f"  concurrency {int(r['Concurrency']):>2}: {r['MB/s']:.1f} MB/s | {r['Rows/s']:,.0f} rows/s | speedup {r['Speedup']:.2f}x")
 
     print(f"\nBatch processing (batch_size={batch_size}):")
     print(f"Total batches: {len(batch_df)}")
     print(f"Rows processed: {int(batch_df['Rows'].sum()):,}")
+    print(
+        f"Vectorised: {vec_ms:.0f} ms | loop: {loop_ms:.0f} ms | "
+        f"identical output: {'yes' if batch_df.equals(loop_df) else 'NO'}"
+    )
 
-    delay_col = _first_existing_col(df, ["Departure Delay in Minutes", "DepartureDelay", "DepDelay"])
-    if delay_col and batch_df["Avg Departure Delay"].notna().any():
-        avg_delay_overall = float(pd.to_numeric(df[delay_col], errors="coerce").mean())
+    from services.batch_service import batch_aggregate_many, benchmark_parallel_batches
+
+    bench = benchmark_parallel_batches(df, BATCH_SIZES, max_workers=min(max(2, os.cpu_count() or 1), 8), repeats=2)
+    print(f"\nParallel batch stage ({bench['batch_sizes']} batch sizes, {bench['cpu_count']} CPU cores):")
+    for _, r in bench["curve"].iterrows():
+        print(
+            f"  {int(r['Workers'])} workers: {r['Seconds'] * 1000:.0f} ms warm, {r['Cold Seconds'] * 1000:.0f} ms cold | "
+            f"speedup {r['Speedup']:.2f}x | efficiency {r['Efficiency']:.0%}"
+        )
+    print(f"  In-process vectorised: {bench['serial_seconds'] * 1000:.0f} ms | identical output: {'yes' if bench['identical'] else 'NO'}")
+
+    from services.mapreduce_service import module_kpi_jobs, run_jobs
+
+    kpi_groups = module_kpi_jobs(df)
+    mr = run_jobs([job for group in kpi_groups.values() for job in group], df)
+    avg_delay_overall = mr["results"].get("Overall Avg Departure Delay")
+    if avg_delay_overall is not None and batch_df["Avg Departure Delay"].notna().any():
         print(f"Overall avg departure delay: {avg_delay_overall:.2f} min")
 
-    stream_df = _streaming_simulation(df, window_size=4000, steps=10, seed=2025)
+    print(f"\nMap-reduce KPI pass ({len(mr['timings'])} jobs, {mr['tasks']} fused tasks): {mr['seconds'] * 1000:.0f} ms")
+    for _, r in mr["timings"].iterrows():
+        print(f"  {r['Job']:<28} map {r['Map s'] * 1000:6.1f} ms | combine {r['Combine s'] * 1000:5.2f} ms")
+
+    from services.cache_service import TwoTierCache, cache_key, file_fingerprint
+    from services.data_service import dataset_fingerprint
+    from services.ingest_service import DEFAULT_DATA_PATH
+
+    cache = TwoTierCache()
+    data_fp = dataset_fingerprint(df)
+    key = cache_key(data_fp, "Batch tables", {"batch_sizes": BATCH_SIZES})
+    for _ in range(2):
+        cache.get_or_compute(key, lambda: batch_aggregate_many(df, BATCH_SIZES), name="Batch tables")
+    cache.memory.clear()
+    cache.get(key, name="Batch tables")
+    frame_key = cache_key(file_fingerprint(DEFAULT_DATA_PATH), "Dataset frame")
+    cache.get_or_compute(frame_key, load_data, name="Dataset frame")
+    stats = cache.stats()
+    print(
+        f"\nResult cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, {stats['misses']} misses "
+        f"(hit rate {stats['hit_rate']:.0%}), latency saved {stats['seconds_saved'] * 1000:.0f} ms"
+    )
+    print(
+        f"  memory {_bytes_to_mb(stats['memory_bytes']):.1f} MB in {stats['memory_entries']} entries | "
+        f"disk {_bytes_to_mb(stats['disk_bytes']):.1f} MB in {stats['disk_entries']} entries"
+    )
+
+    from services.window_service import window_index
+
+    t0 = time.perf_counter()
+    win_index = window_index(df, data_fp)
+    index_ms = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    sweep = win_index.sweep(4000, step=1)
+    sweep_ms = (time.perf_counter() - t0) * 1000.0
+    print(f"\nWindow index: built in {index_ms:.1f} ms; {len(sweep):,} windows of 4,000 rows swept in {sweep_ms:.1f} ms")
+
+    stream_df = _streaming_simulation(df, window_size=4000, steps=10, seed=2025, index=win_index)
     if len(stream_df) > 0 and stream_df["Avg Delay"].notna().any():
         print(f"Streaming avg delay (10 steps): mean={float(stream_df['Avg Delay'].mean()):.2f} min")
 
+    from services.eventtime_service import run_event_time_windows
+
+    print("\nEvent-time windows (200,000 events, 5 s out-of-orderness, 2 s allowed lateness):")
+    for kind, kwargs in (("tumbling", {"size": 60.0}), ("sliding", {"size": 60.0, "slide": 15.0}), ("session", {"gap": 0.1})):
+        et = run_event_time_windows(
+            df, kind, out_of_orderness=5.0, allowed_lateness=2.0, events=200_000, report_every=10_000, **kwargs
+        )
+        print(
+            f"  {kind:<8} {et['emitted']:,} windows | late accepted {et['late_accepted']:,}, dropped {et['late_dropped']:,} | "
+            f"peak open {et['max_open_windows']} | {et['events_per_sec'] or 0:,.0f} events/s"
+        )
+
+    from services.stream_service import STREAM_SOURCES, run_event_stream
+
+    print("\nEvent stream (20,000 events at 20,000/s):")
+    for source in STREAM_SOURCES:
+        stream = run_event_stream(df, source=source, rate=20_000, events=20_000, window_size=4_000)
+        lag = stream["lag_ms"]
+        eps = stream["events_per_sec"] or 0.0
+        print(
+            f"  {source:<6} {eps:,.0f} events/s | lag mean {lag['mean'] or 0:.2f} ms, p95 {lag['p95'] or 0:.2f} ms | "
+            f"dropped {stream['dropped']:,}"
+        )
+
 
 def main(mode: str = "streamlit") -> None:
     if mode == "cli":
@@ -0,0 +1,371 @@
+# ============================================================
+# batch_service.py – Vectorised Batch Aggregation
+# ============================================================
+#
+# Per-batch KPIs for the Cloud Analytics module without a Python loop
+# over chunks. Columns are typed once (numeric coercion, missing-cell
+# counts, satisfaction flags) and every batch size is then a handful of
+# segment reductions over those arrays.
+#
+# The parallel mode places those arrays in one shared-memory block,
+# hands each worker of a process pool a batch-aligned row range and
+# merges the per-batch partial sums it returns.
+# ============================================================
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import DELAY_CANDIDATES, DISTANCE_CANDIDATES, SATISFACTION_CANDIDATES, first_existing_col
+
+BATCH_COLUMNS = ["Batch", "Rows", "Missing Cells", "Avg Departure Delay", "Avg Flight Distance", "Satisfaction Rate %"]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _numeric_column(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """(values with NaN -> 0, valid mask) for a column coerced like pd.to_numeric(errors="coerce")."""
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(values)
+    return np.where(valid, values, 0.0), valid
+
+
+def _is_label_column(s: pd.Series) -> bool:
+    """Text labels stored as object, string or categorical dtype."""
+    return (
+        pd.api.types.is_object_dtype(s.dtype)
+        or pd.api.types.is_string_dtype(s.dtype)
+        or isinstance(s.dtype, pd.CategoricalDtype)
+    )
+
+
+def _segment_sums(values: np.ndarray, batch_size: int) -> np.ndarray:
+    """
+    Sum of each consecutive batch_size-row segment.
+
+    Full batches are summed as rows of a reshaped view, which uses the
+    same pairwise summation as summing each slice on its own, so float
+    means are bit-identical to chunk-by-chunk pandas means.
+    """
+    full = len(values) // batch_size * batch_size
+    sums = values[:full].reshape(-1, batch_size).sum(axis=1)
+    if full < len(values):
+        sums = np.append(sums, values[full:].sum())
+    return sums
+
+
+def _segment_counts(flags: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    return np.add.reduceat(flags.astype(np.int64), starts)
+
+
+def _optional_kpi(values: np.ndarray, present: np.ndarray) -> np.ndarray | list:
+    """Per-batch KPI where batches with no data read None, matching a list-of-dicts frame."""
+    if present.all():
+        return values
+    if not present.any():
+        return [None] * len(values)
+    return np.where(present, values, np.nan)
+
+
+# ============================================================
+# Batch engine
+# ============================================================
+def prepare_batch_columns(df: pd.DataFrame) -> dict:
+    """
+    One pass over the frame: every per-row input the batch KPIs need, as flat arrays.
+    The result can be aggregated at any batch size without touching df again.
+    """
+    prepared = {"rows": len(df), "missing": df.isna().sum(axis=1).to_numpy(dtype=np.int64)}
+
+    for key, candidates in (("delay", DELAY_CANDIDATES), ("distance", DISTANCE_CANDIDATES)):
+        col = first_existing_col(df, candidates)
+        prepared[key] = _numeric_column(df[col]) if col else None
+
+    sat_col = first_existing_col(df, SATISFACTION_CANDIDATES)
+    prepared["satisfaction"] = None
+    if sat_col:
+        v = df[sat_col]
+        if _is_label_column(v):
+            # Text labels: evaluate the substring test once per distinct label
+            codes, uniques = pd.factorize(v.astype(str), use_na_sentinel=False)
+            hits = np.asarray(pd.Series(uniques).str.lower().str.contains("satisf"), dtype=bool)
+            prepared["satisfaction"] = ("text", hits[codes], None)
+        else:
+            values, valid = _numeric_column(v)
+            prepared["satisfaction"] = ("numeric", values > 0, valid)
+    return prepared
+
+
+def batch_partials(prepared: dict, batch_size: int, lo: int = 0, hi: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Per-batch sums and counts for rows [lo, hi) of prepared columns.
+
+    lo should be a multiple of batch_size so every batch is summed in one
+    piece; partials from adjacent row ranges then merge exactly.
+    """
+    n = prepared["rows"]
+    hi = n if hi is None else min(int(hi), n)
+    starts = np.arange(lo, hi, batch_size)
+    rel = starts - lo
+    out = {
+        "batch": starts // batch_size,
+        "rows": np.minimum(starts + batch_size, hi) - starts,
+        "missing": _segment_counts(prepared["missing"][lo:hi], rel),
+    }
+    for key in ("delay", "distance"):
+        if prepared[key] is not None:
+            values, valid = prepared[key]
+            out[f"{key}_sum"] = _segment_sums(values[lo:hi], batch_size)
+            out[f"{key}_count"] = _segment_counts(valid[lo:hi], rel)
+    sat = prepared["satisfaction"]
+    if sat is not None:
+        kind, hits, valid = sat
+        out["sat_hits"] = _segment_counts(hits[lo:hi], rel)
+        out["sat_count"] = out["rows"] if kind == "text" else _segment_counts(valid[lo:hi], rel)
+    return out
+
+
+def merge_batch_partials(parts: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """Combine partials from several row ranges: every field is a sum, keyed by batch id."""
+    parts = [p for p in parts if len(p["batch"])]
+    if not parts:
+        return {"batch": np.zeros(0, dtype=np.int64)}
+    ids = np.concatenate([p["batch"] for p in parts])
+    batch, slot = np.unique(ids, return_inverse=True)
+    merged = {"batch": batch}
+    for key in parts[0]:
+        if key == "batch":
+            continue
+        values = np.concatenate([p[key] for p in parts])
+        acc = np.zeros(len(batch), dtype=values.dtype)
+        np.add.at(acc, slot, values)
+        merged[key] = acc
+    return merged
+
+
+def _partials_frame(partials: dict[str, np.ndarray]) -> pd.DataFrame:
+    n_batches = len(partials["batch"])
+    if n_batches == 0:
+        return pd.DataFrame()
+    rows = partials["rows"]
+    out = {
+        "Batch": partials["batch"] + 1,
+        "Rows": rows,
+        "Missing Cells": partials["missing"],
+    }
+    for label, key in (("Avg Departure Delay", "delay"), ("Avg Flight Distance", "distance")):
+        if f"{key}_sum" not in partials:
+            out[label] = [None] * n_batches
+            continue
+        counts = partials[f"{key}_count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = partials[f"{key}_sum"] / counts
+        out[label] = _optional_kpi(means, counts > 0)
+
+    if "sat_hits" not in partials:
+        out["Satisfaction Rate %"] = [None] * n_batches
+    else:
+        rate = partials["sat_hits"] / rows * 100.0
+        out["Satisfaction Rate %"] = _optional_kpi(rate, partials["sat_count"] > 0)
+
+    return pd.DataFrame(out, columns=BATCH_COLUMNS)
+
+
+def batch_aggregate(data: pd.DataFrame | dict, batch_size: int) -> pd.DataFrame:
+    """
+    Per-batch KPIs (rows, missing cells, average delay and distance,
+    satisfaction rate) for consecutive batches of batch_size rows.
+
+    Accepts the frame itself or the output of prepare_batch_columns.
+    Output matches the chunk-by-chunk loop it replaces.
+    """
+    prepared = data if isinstance(data, dict) else prepare_batch_columns(data)
+    if prepared["rows"] == 0:
+        return pd.DataFrame()
+    return _partials_frame(batch_partials(prepared, max(1, int(batch_size))))
+
+
+def batch_aggregate_many(df: pd.DataFrame, batch_sizes) -> dict[int, pd.DataFrame]:
+    """Batch tables for several batch sizes from a single preparation pass over df."""
+    prepared = prepare_batch_columns(df)
+    return {int(b): batch_aggregate(prepared, int(b)) for b in batch_sizes}
+
+
+# ============================================================
+# Parallel execution (process pool + shared memory)
+# ============================================================
+_WORKER_PREPARED: dict | None = None
+_WORKER_SHM: shared_memory.SharedMemory | None = None
+
+
+def _flatten_prepared(prepared: dict) -> tuple[dict[str, np.ndarray], dict]:
+    """Split prepared columns into named flat arrays plus the metadata needed to rebuild them."""
+    arrays = {"missing": prepared["missing"]}
+    meta = {"rows": prepared["rows"], "delay": False, "distance": False, "satisfaction": None}
+    for key in ("delay", "distance"):
+        if prepared[key] is not None:
+            arrays[f"{key}_values"], arrays[f"{key}_valid"] = prepared[key]
+            meta[key] = True
+    if prepared["satisfaction"] is not None:
+        kind, hits, valid = prepared["satisfaction"]
+        arrays["sat_hits"] = hits
+        if valid is not None:
+            arrays["sat_valid"] = valid
+        meta["satisfaction"] = kind
+    return arrays, meta
+
+
+def _unflatten_prepared(arrays: dict[str, np.ndarray], meta: dict) -> dict:
+    prepared = {"rows": meta["rows"], "missing": arrays["missing"]}
+    for key in ("delay", "distance"):
+        prepared[key] = (arrays[f"{key}_values"], arrays[f"{key}_valid"]) if meta[key] else None
+    kind = meta["satisfaction"]
+    prepared["satisfaction"] = None if kind is None else (kind, arrays["sat_hits"], arrays.get("sat_valid"))
+    return prepared
+
+
+def _share_prepared(prepared: dict) -> tuple[shared_memory.SharedMemory, dict]:
+    """
+    Copy prepared columns into one shared-memory block.
+    Returns the block (caller closes and unlinks it) and a picklable spec
+    workers use to map the same arrays without copying.
+    """
+    arrays, meta = _flatten_prepared(prepared)
+    layout = []
+    offset = 0
+    for name, arr in arrays.items():
+        offset = (offset + 7) // 8 * 8
+        layout.append((name, arr.dtype.str, len(arr), offset))
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, length, start), arr in zip(layout, arrays.values()):
+        np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)[:] = arr
+    return shm, {"name": shm.name, "layout": layout, "meta": meta}
+
+
+def _attach_prepared(spec: dict) -> tuple[shared_memory.SharedMemory, dict]:
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    arrays = {
+        name: np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)
+        for name, dtype, length, start in spec["layout"]
+    }
+    return shm, _unflatten_prepared(arrays, spec["meta"])
+
+
+def _init_worker(spec: dict) -> None:
+    global _WORKER_SHM, _WORKER_PREPARED
+    _WORKER_SHM, _WORKER_PREPARED = _attach_prepared(spec)
+
+
+def _worker_partials(batch_size: int, lo: int, hi: int) -> tuple[int, dict[str, np.ndarray]]:
+    return batch_size, batch_partials(_WORKER_PREPARED, batch_size, lo, hi)
+
+
+def _partition_tasks(n: int, batch_sizes: list[int], workers: int) -> list[tuple[int, int, int]]:
+    """(batch_size, lo, hi) tasks: each batch size split into `workers` batch-aligned row ranges."""
+    tasks = []
+    for b in batch_sizes:
+        n_batches = -(-n // b)
+        per = -(-n_batches // workers)
+        for first in range(0, n_batches, per):
+            tasks.append((b, first * b, min(n, (first + per) * b)))
+    return tasks
+
+
+def _run_pool(pool: ProcessPoolExecutor, n: int, batch_sizes: list[int], workers: int) -> dict[int, pd.DataFrame]:
+    parts: dict[int, list] = {b: [] for b in batch_sizes}
+    tasks = _partition_tasks(n, batch_sizes, workers)
+    for b, partial in pool.map(_worker_partials, *zip(*tasks)):
+        parts[b].append(partial)
+    return {b: _partials_frame(merge_batch_partials(parts[b])) for b in batch_sizes}
+
+
+def parallel_batch_aggregate_many(
+    data: pd.DataFrame | dict,
+    batch_sizes,
+    workers: int | None = None,
+) -> dict[int, pd.DataFrame]:
+    """
+    batch_aggregate_many on a process pool.
+
+    Prepared columns live in shared memory (workers map them, nothing is
+    pickled per partition); each batch size is split into batch-aligned
+    row ranges whose partial sums merge to exactly the serial tables.
+    """
+    prepared = data if isinstance(data, dict) else prepare_batch_columns(data)
+    batch_sizes = [max(1, int(b)) for b in batch_sizes]
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    if prepared["rows"] == 0:
+        return {b: pd.DataFrame() for b in batch_sizes}
+
+    shm, spec = _share_prepared(prepared)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+            return _run_pool(pool, prepared["rows"], batch_sizes, workers)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def benchmark_parallel_batches(
+    data: pd.DataFrame | dict,
+    batch_sizes,
+    max_workers: int | None = None,
+    repeats: int = 3,
+) -> dict:
+    """
+    Measured speedup curve for the parallel batch stage on this machine.
+
+    For 1..max_workers workers: pool start-up plus first run (cold), then
+    the best of `repeats` runs on the warm pool. Speedup is relative to
+    the 1-worker pool; efficiency = speedup / workers. The in-process
+    vectorised time is reported alongside as the no-pool baseline.
+    """
+    prepared = data if isinstance(data, dict) else prepare_batch_columns(data)
+    batch_sizes = [max(1, int(b)) for b in batch_sizes]
+    max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+    repeats = max(1, int(repeats))
+    if prepared["rows"] == 0:
+        raise ValueError("No rows to benchmark.")
+
+    t0 = time.perf_counter()
+    serial = {b: batch_aggregate(prepared, b) for b in batch_sizes}
+    serial_s = time.perf_counter() - t0
+
+    rows = []
+    identical = True
+    shm, spec = _share_prepared(prepared)
+    try:
+        for w in range(1, max_workers + 1):
+            t0 = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=w, initializer=_init_worker, initargs=(spec,)) as pool:
+                tables = _run_pool(pool, prepared["rows"], batch_sizes, w)
+                cold_s = time.perf_counter() - t0
+                best = float("inf")
+                for _ in range(repeats):
+                    t1 = time.perf_counter()
+                    _run_pool(pool, prepared["rows"], batch_sizes, w)
+                    best = min(best, time.perf_counter() - t1)
+            identical = identical and all(tables[b].equals(serial[b]) for b in batch_sizes)
+            rows.append({"Workers": w, "Cold Seconds": cold_s, "Seconds": best})
+    finally:
+        shm.close()
+        shm.unlink()
+
+    curve = pd.DataFrame(rows)
+    curve["Speedup"] = curve["Seconds"].iloc[0] / curve["Seconds"]
+    curve["Efficiency"] = curve["Speedup"] / curve["Workers"]
+    return {
+        "curve": curve,
+        "serial_seconds": float(serial_s),
+        "batch_sizes": len(batch_sizes),
+        "cpu_count": os.cpu_count() or 1,
+        "identical": bool(identical),
+    }
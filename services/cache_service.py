@@ -0,0 +1,365 @@
+# ============================================================
+# cache_service.py – Two-Tier Result Cache (memory LRU + disk)
+# ============================================================
+#
+# Shared cache for expensive results of any module. Tier 1 is an
+# in-process LRU bounded by a byte budget; tier 2 is a directory of
+# pickled entries bounded by total size and an entry TTL. A miss in
+# memory falls through to disk (and is promoted back into memory);
+# a miss in both computes the value and writes it to both tiers.
+#
+# Keys are hashes of (CACHE_VERSION, dataset fingerprint, computation
+# name, parameters), so a result is reused only for identical data and
+# arguments; bumping CACHE_VERSION orphans every existing entry. Each entry remembers how long it took to compute, which
+# gives the latency saved on every later hit.
+# ============================================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path("cache")
+DEFAULT_MEMORY_BYTES = 256 * 1024**2
+DEFAULT_DISK_BYTES = 1024**3
+DEFAULT_TTL_SECONDS = 24 * 3600.0
+# Bump whenever a cached computation changes its output (or the layout of
+# a cached object), so stale disk entries are never served.
+CACHE_VERSION = 1
+
+_MISSING = object()
+
+
+# ============================================================
+# Keys
+# ============================================================
+def cache_key(fingerprint: str | None, name: str, params: dict | None = None) -> str:
+    """Stable key: hash of (cache version, dataset fingerprint, computation name, parameters)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{CACHE_VERSION}|{fingerprint}|{name}|{json.dumps(params or {}, sort_keys=True, default=str)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """Cheap fingerprint of a source file (resolved path, size, mtime) for keys taken before the data is loaded."""
+    path = Path(path).resolve()
+    st = path.stat()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _sizeof(value) -> int:
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values()) + 64 * len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value) + 8 * len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 64
+
+
+# ============================================================
+# Tiers
+# ============================================================
+class MemoryTier:
+    """LRU of (value, size, compute_seconds) evicting least recently used entries beyond max_bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        if key not in self.entries:
+            return _MISSING
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key: str, value, compute_seconds: float, size: int | None = None) -> bool:
+        """Store an entry; returns False when it alone exceeds the budget (it is then not kept)."""
+        size = _sizeof(value) if size is None else int(size)
+        self.discard(key)
+        if size > self.max_bytes:
+            return False
+        self.entries[key] = (value, size, float(compute_seconds))
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old, _) = self.entries.popitem(last=False)
+            self.bytes -= old
+            self.evictions += 1
+        return True
+
+    def discard(self, key: str) -> None:
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+
+class DiskTier:
+    """
+    One pickle file per key under root. Entries older than ttl_seconds
+    are expired on read and during eviction; when the directory grows
+    past max_bytes the least recently used files (by mtime, refreshed on
+    every hit) are removed. Writes go through a temp file and os.replace.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int, ttl_seconds: float | None):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = None if ttl_seconds is None else float(ttl_seconds)
+        self.evictions = 0
+        self.expired = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def _is_expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                created, compute_seconds, value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except Exception:
+            # Truncated, corrupt or unloadable (e.g. a class that has since
+            # moved) entries are dropped and recomputed.
+            path.unlink(missing_ok=True)
+            return _MISSING
+        if self._is_expired(created):
+            path.unlink(missing_ok=True)
+            self.expired += 1
+            return _MISSING
+        os.utime(path)
+        return value, compute_seconds
+
+    def put(self, key: str, value, compute_seconds: float) -> bool:
+        payload = pickle.dumps((time.time(), float(compute_seconds), value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return False
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(payload)
+        os.replace(tmp, self._path(key))
+        self.evict()
+        return True
+
+    def _files(self) -> list[tuple[float, int, Path]]:
+        out = []
+        for path in self.root.glob("*.pkl") if self.root.exists() else []:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until the tier fits max_bytes."""
+        # mtime is the last access, which is never earlier than creation, so
+        # anything idle for longer than the TTL is certainly expired.
+        files = sorted(self._files())
+        kept = []
+        for mtime, size, path in files:
+            if self.ttl_seconds is not None and time.time() - mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                self.expired += 1
+            else:
+                kept.append((mtime, size, path))
+        total = sum(size for _, size, _ in kept)
+        for _, size, path in kept:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+    @property
+    def bytes(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    @property
+    def entries(self) -> int:
+        return len(self._files())
+
+    def clear(self) -> None:
+        for _, _, path in self._files():
+            path.unlink(missing_ok=True)
+
+
+# ============================================================
+# Two-tier cache
+# ============================================================
+class TwoTierCache:
+    """
+    Memory LRU in front of a disk store. get_or_compute() is the main
+    entry point; counters cover hits per tier, misses, evictions, bytes
+    and the compute time saved by hits. Thread-safe.
+
+    Memory hits return the stored object itself: treat cached values as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        disk_dir: str | Path = CACHE_DIR,
+        disk_bytes: int = DEFAULT_DISK_BYTES,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+        use_disk: bool = True,
+    ):
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = DiskTier(disk_dir, disk_bytes, ttl_seconds) if use_disk else None
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.lookup_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.log: list[dict] = []
+
+    def _record(self, key: str, name: str, tier: str, seconds: float, saved: float) -> None:
+        self.log.append({"Name": name, "Key": key[:12], "Tier": tier, "ms": seconds * 1000.0, "Saved ms": saved * 1000.0})
+        del self.log[:-200]
+
+    def get(self, key: str, default=None, name: str = ""):
+        """Look key up in memory, then on disk (promoting disk hits); counts a miss when absent."""
+        t0 = time.perf_counter()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not _MISSING:
+                value, _, compute_seconds = entry
+                tier = "memory"
+            else:
+                found = self.disk.get(key) if self.disk is not None else _MISSING
+                if found is _MISSING:
+                    self.misses += 1
+                    self.lookup_seconds += time.perf_counter() - t0
+                    return default
+                value, compute_seconds = found
+                self.memory.put(key, value, compute_seconds)
+                tier = "disk"
+            elapsed = time.perf_counter() - t0
+            saved = max(0.0, compute_seconds - elapsed)
+            if tier == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            self.seconds_saved += saved
+            self.lookup_seconds += elapsed
+            self._record(key, name, tier, elapsed, saved)
+        return value
+
+    def put(self, key: str, value, compute_seconds: float = 0.0) -> None:
+        with self.lock:
+            self.memory.put(key, value, compute_seconds)
+            if self.disk is not None:
+                self.disk.put(key, value, compute_seconds)
+
+    def get_or_compute(self, key: str, compute: Callable[[], object], name: str = ""):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key, _MISSING, name=name)
+        if value is not _MISSING:
+            return value
+        t0 = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - t0
+        with self.lock:
+            self.compute_seconds += elapsed
+            self._record(key, name, "miss", elapsed, 0.0)
+        self.put(key, value, elapsed)
+        return value
+
+    def clear(self, disk: bool = True) -> None:
+        with self.lock:
+            self.memory.clear()
+            if disk and self.disk is not None:
+                self.disk.clear()
+
+    def stats(self) -> dict:
+        """Counters and derived rates; hit_rate is None before the first lookup."""
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "lookups": lookups,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else None,
+                "seconds_saved": self.seconds_saved,
+                "compute_seconds": self.compute_seconds,
+                "lookup_seconds": self.lookup_seconds,
+                "memory_entries": len(self.memory.entries),
+                "memory_bytes": self.memory.bytes,
+                "memory_budget": self.memory.max_bytes,
+                "memory_evictions": self.memory.evictions,
+                "disk_entries": self.disk.entries if self.disk is not None else 0,
+                "disk_bytes": self.disk.bytes if self.disk is not None else 0,
+                "disk_budget": self.disk.max_bytes if self.disk is not None else 0,
+                "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+                "disk_expired": self.disk.expired if self.disk is not None else 0,
+            }
+
+    def history(self) -> pd.DataFrame:
+        """Recent lookups (latest 200): name, tier (memory / disk / miss), time and latency saved."""
+        with self.lock:
+            return pd.DataFrame(self.log, columns=["Name", "Key", "Tier", "ms", "Saved ms"])
+
+
+# ============================================================
+# Shared instance
+# ============================================================
+_SHARED: TwoTierCache | None = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_cache() -> TwoTierCache:
+    """Process-wide cache used by the modules (survives Streamlit reruns)."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = TwoTierCache()
+        return _SHARED
+
+
+def cached(
+    name: str,
+    fingerprint: str | None,
+    compute: Callable[[], object],
+    params: dict | None = None,
+    cache: TwoTierCache | None = None,
+):
+    """Memoise compute() in the shared cache under (fingerprint, name, params)."""
+    cache = cache or shared_cache()
+    return cache.get_or_compute(cache_key(fingerprint, name, params), compute, name=name)
@@ -1,4 +1,42 @@
+import hashlib
+
+import numpy as np
 import pandas as pd
 
+# Column spellings seen across survey exports; first_existing_col picks the one present.
+DELAY_CANDIDATES = ["Departure Delay in Minutes", "DepartureDelay", "DepDelay", "departure_delay", "dep_delay"]
+ARRIVAL_CANDIDATES = ["Arrival Delay in Minutes", "ArrivalDelay", "ArrDelay", "arrival_delay", "arr_delay"]
+DISTANCE_CANDIDATES = ["Flight Distance", "FlightDistance", "Distance", "flight_distance"]
+SATISFACTION_CANDIDATES = ["satisfaction", "Satisfaction", "satisfied"]
+# Satisfaction labels that score >= 4 in Module 2's mapping
+SATISFIED_LABELS = {"satisfied", "very satisfied", "neutral or satisfied"}
+ID_CANDIDATES = ["id", "ID", "passenger_id"]
+TIMESTAMP_CANDIDATES = ["event_time", "Event Time", "timestamp", "Timestamp", "datetime", "Flight Date", "FlightDate", "date"]
+
 def load_data():
     return pd.read_csv("assets/train.csv")
+
+def first_existing_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
+    """Return the first matching column name in df from candidates (case-safe)."""
+    cols_lower = {c.lower(): c for c in df.columns}
+    for cand in candidates:
+        if cand in df.columns:
+            return cand
+        cl = cand.lower()
+        if cl in cols_lower:
+            return cols_lower[cl]
+    return None
+
+def dataset_fingerprint(data) -> str:
+    """Stable content hash of a DataFrame, Series or array (used as a cache key)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(data, pd.DataFrame):
+        h.update("|".join(map(str, data.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    elif isinstance(data, pd.Series):
+        h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    else:
+        arr = np.ascontiguousarray(data)
+        h.update(f"{arr.dtype}{arr.shape}".encode("utf-8"))
+        h.update(arr.tobytes())
+    return h.hexdigest()
@@ -0,0 +1,272 @@
+# ============================================================
+# dtype_service.py – Column dtype optimiser
+# ============================================================
+#
+# Profiles every column (value range, cardinality, missing values,
+# dominant value) and picks the smallest representation that holds
+# every value exactly:
+#
+#   integers            -> smallest signed/unsigned int for [min, max]
+#   integral floats     -> the same, as a nullable Int/UInt when NaN is present
+#   low-cardinality text-> category
+#   dominated columns   -> sparse (opt-in, only when smaller than dense)
+#
+# Non-integral floats stay float64: float32 would change how pandas
+# accumulates sums, and the KPIs must come out bit-identical. Sparse
+# is off by default because row-wise reductions over sparse blocks
+# fall back to a per-row Python loop in pandas. Every converted column
+# is cast back and compared with the original; a column that does not
+# round-trip keeps its dtype.
+# ============================================================
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY_RATIO = 0.5
+SPARSE_FILL = 0.9  # dominant-value share that makes a column a sparse candidate
+
+_INT_TYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.uint64, np.int64]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _smallest_int(lo, hi) -> np.dtype | None:
+    for t in _INT_TYPES:
+        info = np.iinfo(t)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(t)
+    return None
+
+
+def _nullable(dtype: np.dtype) -> str:
+    """numpy int dtype -> pandas nullable name (uint16 -> UInt16)."""
+    name = dtype.name
+    return "UInt" + name[4:] if name.startswith("uint") else "Int" + name[3:]
+
+
+def _is_text(s: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)
+
+
+def _series_bytes(s: pd.Series) -> int:
+    return int(s.memory_usage(deep=True, index=False))
+
+
+# ============================================================
+# Analysis
+# ============================================================
+def analyse_column(
+    s: pd.Series,
+    category_ratio: float = DEFAULT_CATEGORY_RATIO,
+    sparse_fill: float | None = None,
+) -> dict:
+    """
+    Profile one column and recommend a target dtype (None = keep as is).
+    sparse_fill (e.g. SPARSE_FILL) enables sparse targets for columns whose
+    most common value covers at least that share of rows.
+    """
+    n = len(s)
+    missing = int(s.isna().sum())
+    unique = int(s.nunique(dropna=True))
+    profile = {"Column": s.name, "Dtype": str(s.dtype), "Unique": unique, "Missing": missing, "Min": None, "Max": None}
+    target, reason = None, "Already compact"
+
+    if n == 0 or isinstance(s.dtype, (pd.CategoricalDtype, pd.SparseDtype)):
+        return {**profile, "Target": None, "Reason": "Already compact" if n else "Empty column"}
+
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return {**profile, "Target": None, "Reason": "Boolean"}
+
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        if len(valid) == 0:
+            target = "Sparse[float64, nan]" if sparse_fill is not None else None
+            return {**profile, "Target": target, "Reason": "All values missing"}
+        lo, hi = valid.min(), valid.max()
+        profile.update(Min=lo.item(), Max=hi.item())
+        integral = pd.api.types.is_integer_dtype(s.dtype) or bool(np.all(np.mod(valid, 1) == 0))
+        dense = _smallest_int(lo, hi) if integral and np.isfinite(lo) and np.isfinite(hi) else None
+        if dense is not None:
+            target = _nullable(dense) if missing else dense.name
+            reason = f"Integers in [{lo:.0f}, {hi:.0f}]" + (" with missing values" if missing else "")
+            dense_bytes = n * (dense.itemsize + (1 if missing else 0))
+        else:
+            reason = "Non-integral floats kept as float64" if not integral else "Out of integer range"
+            dense_bytes = _series_bytes(s)
+
+        # sparse: only for a dominant fill value and only if it beats the dense form
+        counts = s.value_counts(dropna=False)
+        fill, fill_frac = counts.index[0], counts.iloc[0] / n
+        sparse_dtype = None
+        if sparse_fill is not None and fill_frac >= sparse_fill:
+            if pd.isna(fill):
+                sparse_dtype, item = "Sparse[float64, nan]", 8
+            elif dense is not None and not missing:
+                sparse_dtype, item = f"Sparse[{dense.name}, {int(fill)}]", dense.itemsize
+        if sparse_dtype and (n - counts.iloc[0]) * (item + 4) < dense_bytes:
+            target = sparse_dtype
+            reason = f"{fill_frac:.0%} of values are {fill}"
+        return {**profile, "Target": target, "Reason": reason}
+
+    if _is_text(s):
+        if unique <= category_ratio * n:
+            return {**profile, "Target": "category", "Reason": f"{unique:,} distinct values in {n:,} rows"}
+        return {**profile, "Target": None, "Reason": "High-cardinality text"}
+
+    return {**profile, "Target": None, "Reason": "Unsupported dtype"}
+
+
+def analyse_columns(
+    df: pd.DataFrame,
+    category_ratio: float = DEFAULT_CATEGORY_RATIO,
+    sparse_fill: float | None = None,
+) -> pd.DataFrame:
+    """One profile row per column with the recommended Target dtype and the Reason."""
+    return pd.DataFrame([analyse_column(df[c], category_ratio, sparse_fill) for c in df.columns])
+
+
+# ============================================================
+# Conversion
+# ============================================================
+def _convert(s: pd.Series, target: str) -> pd.Series:
+    if target.startswith("Sparse["):
+        base, fill = target[len("Sparse[") : -1].split(", ")
+        fill_value = np.nan if fill == "nan" else np.dtype(base).type(int(fill))
+        return s.astype(pd.SparseDtype(base, fill_value))
+    return s.astype(target)
+
+
+def _round_trips(original: pd.Series, converted: pd.Series) -> bool:
+    try:
+        return converted.astype(original.dtype).equals(original)
+    except (TypeError, ValueError):
+        return False
+
+
+def apply_dtypes(df: pd.DataFrame, plan: pd.DataFrame) -> pd.DataFrame:
+    """Apply a plan from analyse_columns(); columns that do not convert losslessly are left unchanged."""
+    out = {}
+    targets = dict(zip(plan["Column"], plan["Target"]))
+    for col in df.columns:
+        s = df[col]
+        target = targets.get(col)
+        if isinstance(target, str):
+            try:
+                converted = _convert(s, target)
+            except (TypeError, ValueError):
+                converted = s
+            s = converted if _round_trips(df[col], converted) else s
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def _memory_report(before: pd.DataFrame, after: pd.DataFrame, plan: pd.DataFrame) -> pd.DataFrame:
+    rows = []
+    for col in before.columns:
+        b, a = _series_bytes(before[col]), _series_bytes(after[col])
+        rows.append(
+            {
+                "Column": col,
+                "Before dtype": str(before[col].dtype),
+                "After dtype": str(after[col].dtype),
+                "Before bytes": b,
+                "After bytes": a,
+                "Saved %": (1 - a / b) * 100.0 if b else 0.0,
+            }
+        )
+    report = pd.DataFrame(rows, columns=["Column", "Before dtype", "After dtype", "Before bytes", "After bytes", "Saved %"])
+    return report.merge(plan[["Column", "Reason"]], on="Column", how="left")
+
+
+def optimize_frame(
+    df: pd.DataFrame,
+    category_ratio: float = DEFAULT_CATEGORY_RATIO,
+    sparse_fill: float | None = None,
+    verify: bool = True,
+) -> dict:
+    """
+    Analyse and convert df (sparse_fill=None disables sparse targets).
+
+    With verify=True the Module 4 KPIs are recomputed on both frames and
+    compared exactly (see verify_kpis). Sparse columns are not supported
+    by every pandas reduction, so if a plan with sparse targets fails the
+    check it is retried without them.
+
+    Returns {"df", "plan", "report" (per-column before/after bytes),
+    "before_bytes", "after_bytes", "seconds", "kpis", "identical",
+    "sparse_rejected"}.
+    """
+    t0 = time.perf_counter()
+    plan = analyse_columns(df, category_ratio, sparse_fill)
+    optimized = apply_dtypes(df, plan)
+    seconds = time.perf_counter() - t0
+
+    kpis = verify_kpis(df, optimized) if verify else None
+    has_sparse = plan["Target"].map(lambda t: isinstance(t, str) and t.startswith("Sparse[")).any()
+    if kpis is not None and not kpis["Identical"].all() and has_sparse:
+        retry = optimize_frame(df, category_ratio, None, verify=True)
+        retry["seconds"] += seconds
+        retry["sparse_rejected"] = True
+        return retry
+
+    return {
+        "df": optimized,
+        "plan": plan,
+        "report": _memory_report(df, optimized, plan),
+        "before_bytes": int(df.memory_usage(deep=True).sum()),
+        "after_bytes": int(optimized.memory_usage(deep=True).sum()),
+        "seconds": float(seconds),
+        "kpis": kpis,
+        "identical": bool(kpis["Identical"].all()) if kpis is not None else None,
+        "sparse_rejected": False,
+    }
+
+
+# ============================================================
+# KPI round trip
+# ============================================================
+def _same(a, b) -> bool:
+    if isinstance(a, (pd.Series, pd.DataFrame)):
+        return type(a) is type(b) and a.equals(b) and list(map(str, a.index)) == list(map(str, b.index))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b):
+        return True
+    return a == b
+
+
+def verify_kpis(original: pd.DataFrame, optimized: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recompute the Module 4 KPIs on both frames: dataset health, per-batch
+    tables for every batch size, module map-reduce KPIs, rolling-window
+    sweep and event-stream payloads. Identical means exactly equal; a
+    check that raises on the optimised frame counts as a difference.
+    """
+    from services.batch_service import batch_aggregate_many
+    from services.mapreduce_service import module_kpi_jobs, run_jobs
+    from services.stream_service import _encode_rows
+    from services.window_service import window_index
+
+    batch_sizes = list(range(1000, 50001, 1000))
+    jobs = [job for group in module_kpi_jobs(original).values() for job in group]
+    checks = {
+        "Missing cells": lambda d: int(d.isna().sum().sum()),
+        "Batch tables (50 sizes)": lambda d: batch_aggregate_many(d, batch_sizes),
+        "Map-reduce module KPIs": lambda d: run_jobs(jobs, d)["results"],
+        "Rolling-window sweep": lambda d: window_index(d).sweep(4000, step=500),
+        "Event payloads": lambda d: _encode_rows(d),
+    }
+    rows = []
+    for name, fn in checks.items():
+        expected = fn(original)
+        try:
+            rows.append({"KPI": name, "Identical": _same(expected, fn(optimized)), "Note": ""})
+        except Exception as exc:
+            rows.append({"KPI": name, "Identical": False, "Note": f"{type(exc).__name__}: {exc}"})
+    return pd.DataFrame(rows)
@@ -0,0 +1,421 @@
+# ============================================================
+# eventtime_service.py – Event-Time Windowing Engine
+# ============================================================
+#
+# Windowed KPIs over event time rather than row order. Every record
+# gets an event time, taken from a timestamp column when the dataset
+# has one, or otherwise generated deterministically from a seed as
+# Poisson arrivals with a random delivery lag, so records arrive out
+# of order. The engine assigns records to tumbling, sliding or session
+# windows and updates each window's aggregates incrementally.
+#
+# A watermark (max event time seen - allowed out-of-orderness) decides
+# when a window is complete: it fires once the watermark passes its
+# end. Late records still update a fired window (re-emitting it) until
+# the watermark passes end + allowed lateness; then the window's state
+# is evicted and later records for it are dropped and counted. State
+# therefore only holds windows near the watermark, and memory stays
+# flat however long the stream runs.
+# ============================================================
+
+from __future__ import annotations
+
+import heapq
+import time
+from collections import deque
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import DELAY_CANDIDATES, DISTANCE_CANDIDATES, TIMESTAMP_CANDIDATES, first_existing_col
+
+WINDOW_KINDS = ("tumbling", "sliding", "session")
+
+DEFAULT_RATE = 100.0  # synthetic events per second of event time
+DEFAULT_DISORDER = 2.0  # mean synthetic delivery lag (s)
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _numeric(df: pd.DataFrame, candidates: list[str]) -> np.ndarray:
+    col = first_existing_col(df, candidates)
+    if col is None:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _timestamp_seconds(df: pd.DataFrame, column: str | None) -> tuple[np.ndarray | None, str | None]:
+    """Seconds since the earliest timestamp, or (None, None) when no usable timestamp column exists."""
+    col = column or first_existing_col(df, TIMESTAMP_CANDIDATES)
+    if col is None or col not in df.columns or len(df) == 0:
+        return None, None
+    ts = pd.to_datetime(df[col], errors="coerce")
+    if ts.notna().mean() < 0.9:
+        return None, None
+    ts = ts.ffill().bfill()
+    return (ts - ts.min()).dt.total_seconds().to_numpy(dtype=np.float64), col
+
+
+# ============================================================
+# Event times
+# ============================================================
+def event_stream(
+    df: pd.DataFrame,
+    events: int,
+    key: str | None = None,
+    timestamp_column: str | None = None,
+    rate: float = DEFAULT_RATE,
+    disorder: float = DEFAULT_DISORDER,
+    seed: int = 2025,
+) -> Iterator[tuple[float, object, float, float]]:
+    """
+    Yield `events` records (event_time, key, delay, distance) in arrival
+    order, cycling through df for streams longer than the dataset.
+
+    With a timestamp column, event time is that column (later cycles
+    are shifted past the previous one). Otherwise arrivals are Poisson
+    at `rate`/s and each record's event time is its arrival minus an
+    exponential lag with mean `disorder` seconds, all from `seed`.
+    """
+    n = len(df)
+    if n == 0:
+        return
+    delay = _numeric(df, DELAY_CANDIDATES)
+    distance = _numeric(df, DISTANCE_CANDIDATES)
+    keys = df[key].astype(str).to_numpy() if key else np.full(n, None, dtype=object)
+    stamps, _ = _timestamp_seconds(df, timestamp_column)
+    rng = np.random.default_rng(seed)
+    span = float(stamps.max()) + 1.0 if stamps is not None else 0.0
+
+    clock = 0.0
+    emitted, cycle = 0, 0
+    while emitted < events:
+        take = min(n, events - emitted)
+        if stamps is not None:
+            times = stamps[:take] + cycle * span
+        else:
+            arrivals = clock + np.cumsum(rng.exponential(1.0 / rate, take))
+            clock = float(arrivals[-1])
+            times = arrivals - (rng.exponential(disorder, take) if disorder > 0 else 0.0)
+        yield from zip(times.tolist(), keys[:take].tolist(), delay[:take].tolist(), distance[:take].tolist())
+        emitted += take
+        cycle += 1
+
+
+def event_time_source(df: pd.DataFrame, timestamp_column: str | None = None) -> str:
+    """'column <name>' when event time comes from a timestamp column, else 'synthetic'."""
+    _, col = _timestamp_seconds(df, timestamp_column)
+    return f"column {col}" if col else "synthetic"
+
+
+# ============================================================
+# Window assigners
+# ============================================================
+# Bounds are computed from integer window numbers so the same window
+# always gets bit-identical (start, end) keys.
+def _tumbling(t: float, size: float) -> list[tuple[float, float]]:
+    k = int(np.floor(t / size))
+    return [(k * size, k * size + size)]
+
+
+def _sliding(t: float, size: float, slide: float) -> list[tuple[float, float]]:
+    k = int(np.floor(t / slide))
+    out = []
+    while k * slide + size > t:
+        out.append((k * slide, k * slide + size))
+        k -= 1
+    return out
+
+
+class _Window:
+    __slots__ = ("key", "start", "end", "events", "delay_sum", "delay_n", "dist_sum", "dist_n", "fired", "updates")
+
+    def __init__(self, key, start: float, end: float):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.events = 0
+        self.delay_sum = 0.0
+        self.delay_n = 0
+        self.dist_sum = 0.0
+        self.dist_n = 0
+        self.fired = False
+        self.updates = 0
+
+    def add(self, delay: float, distance: float) -> None:
+        self.events += 1
+        if delay == delay:
+            self.delay_sum += delay
+            self.delay_n += 1
+        if distance == distance:
+            self.dist_sum += distance
+            self.dist_n += 1
+
+    def absorb(self, other: "_Window") -> None:
+        self.start = min(self.start, other.start)
+        self.end = max(self.end, other.end)
+        self.events += other.events
+        self.delay_sum += other.delay_sum
+        self.delay_n += other.delay_n
+        self.dist_sum += other.dist_sum
+        self.dist_n += other.dist_n
+        self.fired = self.fired or other.fired
+
+
+# ============================================================
+# Engine
+# ============================================================
+class WindowEngine:
+    """
+    Incremental event-time windows with a bounded-out-of-orderness
+    watermark and allowed lateness.
+
+    kind="tumbling": [k*size, (k+1)*size); kind="sliding": windows of
+    `size` every `slide`; kind="session": per-key activity separated by
+    more than `gap` seconds. push() one record at a time; fired and
+    re-fired windows are appended to `results` (the newest
+    `max_results` are kept; `emitted` counts all of them).
+    """
+
+    def __init__(
+        self,
+        kind: str = "tumbling",
+        size: float = 60.0,
+        slide: float | None = None,
+        gap: float = 5.0,
+        out_of_orderness: float = 5.0,
+        allowed_lateness: float = 0.0,
+        max_results: int = 10_000,
+    ):
+        if kind not in WINDOW_KINDS:
+            raise ValueError(f"Unknown window kind: {kind}. Choose one of {WINDOW_KINDS}.")
+        if size <= 0 or gap <= 0 or (slide is not None and slide <= 0):
+            raise ValueError("Window size, slide and session gap must be positive.")
+        if kind == "sliding" and slide is not None and slide > size:
+            # hopping windows would leave gaps, and records in them would look late
+            raise ValueError("Slide must not exceed the window size.")
+        self.kind = kind
+        self.size = float(size)
+        self.slide = float(slide) if slide is not None else float(size)
+        self.gap = float(gap)
+        self.out_of_orderness = max(0.0, float(out_of_orderness))
+        self.allowed_lateness = max(0.0, float(allowed_lateness))
+
+        self.watermark = -np.inf
+        self.windows: dict[int, _Window] = {}
+        self.index: dict[tuple, int] = {}  # (key, start, end) -> id for tumbling/sliding
+        self.sessions: dict[object, list[int]] = {}  # key -> ids of open sessions
+        self._fire: list[tuple[float, int]] = []
+        self._purge: list[tuple[float, int]] = []
+        self._next_id = 0
+
+        self.results: deque = deque(maxlen=max(1, int(max_results)))
+        self.emitted = 0
+        self.events = 0
+        self.on_time = 0
+        self.late_accepted = 0
+        self.late_dropped = 0
+        self.evicted = 0
+        self.max_open = 0
+
+    # ---------- state ----------
+    def _open(self, key, start: float, end: float) -> tuple[int, _Window]:
+        wid = self._next_id
+        self._next_id += 1
+        w = _Window(key, start, end)
+        self.windows[wid] = w
+        self._schedule(wid, w)
+        return wid, w
+
+    def _schedule(self, wid: int, w: _Window) -> None:
+        heapq.heappush(self._fire, (w.end, wid))
+        heapq.heappush(self._purge, (w.end + self.allowed_lateness, wid))
+
+    def _drop(self, wid: int) -> None:
+        w = self.windows.pop(wid)
+        if self.kind == "session":
+            ids = self.sessions.get(w.key)
+            if ids is not None:
+                ids.remove(wid)
+                if not ids:
+                    del self.sessions[w.key]
+        else:
+            self.index.pop((w.key, w.start, w.end), None)
+
+    def _emit(self, w: _Window, late: bool) -> None:
+        self.results.append(
+            {
+                "Key": w.key,
+                "Start": w.start,
+                "End": w.end,
+                "Events": w.events,
+                "Avg Delay": w.delay_sum / w.delay_n if w.delay_n else None,
+                "Avg Distance": w.dist_sum / w.dist_n if w.dist_n else None,
+                "Watermark": self.watermark,
+                "Late Update": late,
+            }
+        )
+        self.emitted += 1
+
+    # ---------- assignment ----------
+    def _assign_fixed(self, t: float, key, delay: float, distance: float) -> tuple[bool, bool]:
+        """Add the record to its windows; returns (accepted, updated an already fired window)."""
+        spans = _tumbling(t, self.size) if self.kind == "tumbling" else _sliding(t, self.size, self.slide)
+        accepted = late = False
+        for start, end in spans:
+            wid = self.index.get((key, start, end))
+            if wid is None:
+                if end + self.allowed_lateness <= self.watermark:
+                    continue
+                wid, w = self._open(key, start, end)
+                self.index[(key, start, end)] = wid
+            else:
+                w = self.windows[wid]
+            w.add(delay, distance)
+            accepted = True
+            if w.fired:
+                w.updates += 1
+                late = True
+                self._emit(w, late=True)
+        return accepted, late
+
+    def _assign_session(self, t: float, key, delay: float, distance: float) -> tuple[bool, bool]:
+        """Extend or merge the key's sessions overlapping [t, t + gap), or open a new one."""
+        ids = self.sessions.setdefault(key, [])
+        hits = [wid for wid in ids if self.windows[wid].start - self.gap <= t < self.windows[wid].end]
+        if not hits:
+            if t + self.gap + self.allowed_lateness <= self.watermark:
+                if not ids:
+                    del self.sessions[key]
+                return False, False
+            wid, w = self._open(key, t, t + self.gap)
+            ids.append(wid)
+        else:
+            wid, w = hits[0], self.windows[hits[0]]
+            end = w.end
+            for other in hits[1:]:
+                w.absorb(self.windows[other])
+                self._drop(other)
+            w.start, w.end = min(w.start, t), max(w.end, t + self.gap)
+            if w.end != end:
+                self._schedule(wid, w)
+        w.add(delay, distance)
+        late = w.fired
+        if late:
+            w.updates += 1
+            self._emit(w, late=True)
+        return True, late
+
+    # ---------- watermark ----------
+    def _advance(self, watermark: float) -> None:
+        if watermark <= self.watermark:
+            return
+        self.watermark = watermark
+        while self._fire and self._fire[0][0] <= watermark:
+            end, wid = heapq.heappop(self._fire)
+            w = self.windows.get(wid)
+            if w is not None and w.end == end and not w.fired:
+                w.fired = True
+                self._emit(w, late=False)
+        while self._purge and self._purge[0][0] <= watermark:
+            due, wid = heapq.heappop(self._purge)
+            w = self.windows.get(wid)
+            if w is not None and w.end + self.allowed_lateness == due:
+                self._drop(wid)
+                self.evicted += 1
+
+    def push(self, t: float, key, delay: float, distance: float) -> None:
+        self.events += 1
+        if self.kind == "session":
+            accepted, late = self._assign_session(t, key, delay, distance)
+        else:
+            accepted, late = self._assign_fixed(t, key, delay, distance)
+        if not accepted:
+            self.late_dropped += 1
+        elif late or t < self.watermark:
+            self.late_accepted += 1
+        else:
+            self.on_time += 1
+        self.max_open = max(self.max_open, len(self.windows))
+        self._advance(t - self.out_of_orderness)
+
+    def flush(self) -> None:
+        """End of a finite stream: fire every remaining window."""
+        self._advance(np.inf)
+
+    def results_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            list(self.results),
+            columns=["Key", "Start", "End", "Events", "Avg Delay", "Avg Distance", "Watermark", "Late Update"],
+        )
+
+
+# ============================================================
+# Runner
+# ============================================================
+def run_event_time_windows(
+    df: pd.DataFrame,
+    kind: str = "tumbling",
+    size: float = 60.0,
+    slide: float | None = None,
+    gap: float = 5.0,
+    out_of_orderness: float = 5.0,
+    allowed_lateness: float = 0.0,
+    events: int | None = None,
+    key: str | None = None,
+    timestamp_column: str | None = None,
+    rate: float = DEFAULT_RATE,
+    disorder: float = DEFAULT_DISORDER,
+    seed: int = 2025,
+    report_every: int = 1_000,
+    flush: bool = True,
+) -> dict:
+    """
+    Stream `events` records (default: one pass over df) through a
+    WindowEngine and sample its state every `report_every` records.
+
+    Returns {"results", "state" (timeline of open windows / watermark),
+    "events", "on_time", "late_accepted", "late_dropped", "emitted",
+    "evicted", "max_open_windows", "seconds", "events_per_sec",
+    "time_source"}.
+    """
+    events = len(df) if events is None else max(0, int(events))
+    report_every = max(1, int(report_every))
+    engine = WindowEngine(kind, size, slide, gap, out_of_orderness, allowed_lateness)
+
+    state = []
+    t0 = time.perf_counter()
+    for i, (t, k, delay, distance) in enumerate(
+        event_stream(df, events, key, timestamp_column, rate, disorder, seed), start=1
+    ):
+        engine.push(t, k, delay, distance)
+        if i % report_every == 0:
+            state.append(
+                {
+                    "Events": i,
+                    "Open Windows": len(engine.windows),
+                    "Watermark s": engine.watermark,
+                    "Emitted": engine.emitted,
+                    "Late Dropped": engine.late_dropped,
+                }
+            )
+    if flush:
+        engine.flush()
+    seconds = time.perf_counter() - t0
+
+    return {
+        "results": engine.results_frame(),
+        "state": pd.DataFrame(state, columns=["Events", "Open Windows", "Watermark s", "Emitted", "Late Dropped"]),
+        "events": engine.events,
+        "on_time": engine.on_time,
+        "late_accepted": engine.late_accepted,
+        "late_dropped": engine.late_dropped,
+        "emitted": engine.emitted,
+        "evicted": engine.evicted,
+        "max_open_windows": engine.max_open,
+        "seconds": float(seconds),
+        "events_per_sec": engine.events / seconds if seconds > 0 else None,
+        "time_source": event_time_source(df, timestamp_column),
+    }
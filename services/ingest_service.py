@@ -0,0 +1,361 @@
+# ============================================================
+# ingest_service.py – Asyncio Ingestion Pipeline
+# ============================================================
+#
+# Loads the survey CSV as four overlapping stages:
+#
+#   read (file blocks) -> parse (CSV -> frame) -> validate -> aggregate
+#
+# connected by bounded asyncio queues, so a slow stage back-pressures
+# the ones before it instead of letting blocks pile up in memory.
+# Blocking I/O and CPU-bound stages run on an executor; the event loop
+# only moves blocks between queues and samples queue depths. Each
+# stage reports busy, starved (waiting for input) and blocked
+# (waiting for space downstream) time, which identifies the bottleneck.
+#
+# Blocks are cut at the last newline, so the input must not contain
+# quoted fields with embedded newlines (true of the survey export); such
+# a field would be split across two blocks. Each block is parsed on its
+# own and the blocks are cast to common dtypes before concatenation.
+# ============================================================
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import DELAY_CANDIDATES, DISTANCE_CANDIDATES, first_existing_col
+
+DEFAULT_DATA_PATH = Path("assets/train.csv")
+DEFAULT_BLOCK_BYTES = 1 << 20
+DEFAULT_QUEUE_SIZE = 4
+
+INGEST_EXECUTORS = ("thread", "process")
+STAGES = ("read", "parse", "validate", "aggregate")
+
+_DONE = None
+
+
+# ============================================================
+# Helpers
+# ============================================================
+class StageStats:
+    """
+    Per-stage counters: items and rows handled, plus busy / starved /
+    blocked seconds summed over the stage's `workers` concurrent tasks.
+    """
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def row(self, wall: float) -> dict:
+        return {
+            "Stage": self.name,
+            "Workers": self.workers,
+            "Items": self.items,
+            "Rows": self.rows,
+            "Busy s": self.busy,
+            "Starved s": self.starved,
+            "Blocked s": self.blocked,
+            "Rows/sec (busy)": self.rows / self.busy if self.busy > 0 else None,
+            "Utilisation": self.busy / (wall * self.workers) if wall > 0 else 0.0,
+        }
+
+
+# ============================================================
+# Stage work (plain functions so a process pool can run them)
+# ============================================================
+def _read_block(f, block_bytes: int) -> bytes:
+    return f.read(block_bytes)
+
+
+def _parse_block(header: bytes, body: bytes) -> pd.DataFrame:
+    return pd.read_csv(BytesIO(header + body))
+
+
+def _unify_dtypes(frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """
+    Cast every block to the dtypes a single parse of the whole file infers.
+
+    A column can come back int64 in one block and float64 (missing values)
+    in another, or float64 in a block where a sparse text column is empty.
+    Blocks in which a column is entirely missing say nothing about its
+    type; the other blocks decide: all numeric -> their common numeric
+    dtype (float64 if any block is all missing), all boolean -> bool
+    (object if any block is all missing), otherwise the text dtype.
+    """
+    if len(frames) < 2:
+        return frames
+    targets = {}
+    for col in frames[0].columns:
+        typed = [f[col].dtype for f in frames if col in f and not f[col].isna().all()]
+        gaps = len(typed) < sum(col in f for f in frames)
+        if not typed:
+            target = frames[0][col].dtype
+        elif all(pd.api.types.is_bool_dtype(d) for d in typed):
+            target = np.dtype(object) if gaps else np.dtype(bool)
+        elif all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in typed):
+            target = np.result_type(*typed)
+            if gaps and target.kind in "iu":
+                target = np.dtype(np.float64)
+        else:
+            target = next((d for d in typed if not pd.api.types.is_numeric_dtype(d)), np.dtype(object))
+        targets[col] = target
+    out = []
+    for f in frames:
+        casts = {c: t for c, t in targets.items() if c in f and f[c].dtype != t}
+        out.append(f.astype(casts) if casts else f)
+    return out
+
+
+def _validate_frame(frame: pd.DataFrame, columns: list[str]) -> dict:
+    """Schema and value checks. The frame is not modified; issues are counted."""
+    report = {
+        "missing_columns": [c for c in columns if c not in frame.columns],
+        "unexpected_columns": [c for c in frame.columns if c not in columns],
+        "rows_with_missing": int(frame.isna().any(axis=1).sum()),
+        "missing_cells": int(frame.isna().sum().sum()),
+        "negative_values": 0,
+    }
+    for candidates in (DELAY_CANDIDATES, DISTANCE_CANDIDATES):
+        col = first_existing_col(frame, candidates)
+        if col:
+            values = pd.to_numeric(frame[col], errors="coerce")
+            report["negative_values"] += int((values < 0).sum())
+    return report
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+async def _put(queue: asyncio.Queue, item, stats: StageStats) -> None:
+    t0 = time.perf_counter()
+    await queue.put(item)
+    stats.blocked += time.perf_counter() - t0
+
+
+async def _get(queue: asyncio.Queue, stats: StageStats):
+    t0 = time.perf_counter()
+    item = await queue.get()
+    stats.starved += time.perf_counter() - t0
+    return item
+
+
+async def _read_stage(
+    path: Path,
+    block_bytes: int,
+    out_q: asyncio.Queue,
+    stats: StageStats,
+    io_pool: Executor,
+    header_box: dict,
+    n_downstream: int,
+) -> None:
+    loop = asyncio.get_running_loop()
+    with open(path, "rb") as f:
+        t0 = time.perf_counter()
+        header = await loop.run_in_executor(io_pool, f.readline)
+        stats.busy += time.perf_counter() - t0
+        header_box["header"] = header
+        carry = b""
+        seq = 0
+        while True:
+            t0 = time.perf_counter()
+            block = await loop.run_in_executor(io_pool, _read_block, f, block_bytes)
+            stats.busy += time.perf_counter() - t0
+            if not block:
+                break
+            data = carry + block
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                carry = data
+                continue
+            carry = data[cut:]
+            stats.items += 1
+            await _put(out_q, (seq, data[:cut]), stats)
+            seq += 1
+        if carry.strip():
+            stats.items += 1
+            await _put(out_q, (seq, carry + b"\n"), stats)
+    for _ in range(n_downstream):
+        await _put(out_q, _DONE, stats)
+
+
+async def _parse_worker(
+    in_q: asyncio.Queue, out_q: asyncio.Queue, stats: StageStats, pool: Executor, header_box: dict
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await _get(in_q, stats)
+        if item is _DONE:
+            await _put(out_q, _DONE, stats)
+            return
+        seq, body = item
+        t0 = time.perf_counter()
+        frame = await loop.run_in_executor(pool, _parse_block, header_box["header"], body)
+        stats.busy += time.perf_counter() - t0
+        stats.items += 1
+        stats.rows += len(frame)
+        await _put(out_q, (seq, frame), stats)
+
+
+async def _validate_stage(
+    in_q: asyncio.Queue,
+    out_q: asyncio.Queue,
+    stats: StageStats,
+    pool: Executor,
+    n_upstream: int,
+    columns_box: dict,
+    report: dict,
+) -> None:
+    loop = asyncio.get_running_loop()
+    done = 0
+    while done < n_upstream:
+        item = await _get(in_q, stats)
+        if item is _DONE:
+            done += 1
+            continue
+        seq, frame = item
+        columns = columns_box.setdefault("columns", list(frame.columns))
+        t0 = time.perf_counter()
+        block_report = await loop.run_in_executor(pool, _validate_frame, frame, columns)
+        stats.busy += time.perf_counter() - t0
+        stats.items += 1
+        stats.rows += len(frame)
+        for key in ("rows_with_missing", "missing_cells", "negative_values"):
+            report[key] += block_report[key]
+        if block_report["missing_columns"] or block_report["unexpected_columns"]:
+            report["schema_mismatches"] += 1
+        await _put(out_q, (seq, frame), stats)
+    await _put(out_q, _DONE, stats)
+
+
+async def _aggregate_stage(in_q: asyncio.Queue, stats: StageStats, parts: dict, totals: dict) -> None:
+    while True:
+        item = await _get(in_q, stats)
+        if item is _DONE:
+            return
+        seq, frame = item
+        t0 = time.perf_counter()
+        parts[seq] = frame
+        totals["rows"] += len(frame)
+        col = first_existing_col(frame, DELAY_CANDIDATES)
+        if col:
+            values = pd.to_numeric(frame[col], errors="coerce")
+            totals["delay_sum"] += float(values.sum())
+            totals["delay_count"] += int(values.notna().sum())
+        stats.busy += time.perf_counter() - t0
+        stats.items += 1
+        stats.rows += len(frame)
+
+
+async def _sample_depths(queues: dict[str, asyncio.Queue], samples: list[dict], t0: float, every: float) -> None:
+    while True:
+        samples.append({"ms": (time.perf_counter() - t0) * 1000.0, **{name: q.qsize() for name, q in queues.items()}})
+        await asyncio.sleep(every)
+
+
+async def _run_pipeline(
+    path: Path,
+    block_bytes: int,
+    queue_size: int,
+    parse_workers: int,
+    pool: Executor,
+    io_pool: Executor,
+    sample_every: float,
+) -> dict:
+    read_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    valid_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {name: StageStats(name, parse_workers if name == "parse" else 1) for name in STAGES}
+    header_box: dict = {}
+    columns_box: dict = {}
+    parts: dict[int, pd.DataFrame] = {}
+    report = {"rows_with_missing": 0, "missing_cells": 0, "negative_values": 0, "schema_mismatches": 0}
+    totals = {"rows": 0, "delay_sum": 0.0, "delay_count": 0}
+    samples: list[dict] = []
+
+    t0 = time.perf_counter()
+    queues = {"read→parse": read_q, "parse→validate": parse_q, "validate→aggregate": valid_q}
+    sampler = asyncio.create_task(_sample_depths(queues, samples, t0, sample_every))
+    await asyncio.gather(
+        _read_stage(path, block_bytes, read_q, stats["read"], io_pool, header_box, parse_workers),
+        *[_parse_worker(read_q, parse_q, stats["parse"], pool, header_box) for _ in range(parse_workers)],
+        _validate_stage(parse_q, valid_q, stats["validate"], pool, parse_workers, columns_box, report),
+        _aggregate_stage(valid_q, stats["aggregate"], parts, totals),
+    )
+    wall = time.perf_counter() - t0
+    sampler.cancel()
+
+    stats["read"].rows = totals["rows"]
+    return {"stats": stats, "parts": parts, "report": report, "totals": totals, "samples": samples, "wall": wall}
+
+
+def ingest_csv(
+    path: str | Path = DEFAULT_DATA_PATH,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    parse_workers: int = 2,
+    executor: str = "thread",
+    sample_every: float = 0.005,
+) -> dict:
+    """
+    Load a CSV through the read -> parse -> validate -> aggregate pipeline.
+
+    block_bytes sets the read granularity (blocks are cut on line ends, so
+    quoted fields must not contain newlines),
+    queue_size bounds every inter-stage queue (backpressure) and
+    parse_workers runs that many parse tasks concurrently. CPU-bound
+    stages go to a thread or process pool (`executor`).
+
+    Returns {"df", "stages", "queues", "bottleneck", "seconds", "rows",
+    "blocks", "validation", "avg_delay"}. df equals pd.read_csv(path).
+    """
+    if executor not in INGEST_EXECUTORS:
+        raise ValueError(f"Unknown executor: {executor}. Choose one of {INGEST_EXECUTORS}.")
+    path = Path(path)
+    if not path.exists():
+        raise ValueError(f"No such file: {path}")
+    block_bytes = max(1024, int(block_bytes))
+    queue_size = max(1, int(queue_size))
+    parse_workers = max(1, int(parse_workers))
+
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=parse_workers + 1) as pool, ThreadPoolExecutor(max_workers=1) as io_pool:
+        run = asyncio.run(_run_pipeline(path, block_bytes, queue_size, parse_workers, pool, io_pool, sample_every))
+
+    parts = run["parts"]
+    if parts:
+        df = pd.concat(_unify_dtypes([parts[k] for k in sorted(parts)]), ignore_index=True)
+    else:
+        df = pd.read_csv(path, nrows=0)
+
+    wall = run["wall"]
+    stages = pd.DataFrame([run["stats"][name].row(wall) for name in STAGES])
+    bottleneck = stages.loc[stages["Utilisation"].idxmax(), "Stage"] if len(stages) else None
+    totals = run["totals"]
+    return {
+        "df": df,
+        "stages": stages,
+        "queues": pd.DataFrame(run["samples"]),
+        "bottleneck": bottleneck,
+        "seconds": float(wall),
+        "rows": int(totals["rows"]),
+        "blocks": int(run["stats"]["read"].items),
+        "validation": run["report"],
+        "avg_delay": totals["delay_sum"] / totals["delay_count"] if totals["delay_count"] else None,
+        "queue_size": queue_size,
+        "parse_workers": parse_workers,
+        "executor": executor,
+    }
@@ -0,0 +1,347 @@
+# ============================================================
+# mapreduce_service.py – Local Map-Reduce Jobs
+# ============================================================
+#
+# Small map-reduce framework for the dashboard KPIs. A job maps each
+# row partition to a partial result, merges partials with an
+# associative combiner and finalises the merged partial. The scheduler
+# runs jobs on a serial, thread-pool or process-pool executor and, by
+# default, fuses every job into one task per partition, so all KPIs
+# come out of a single scan with per-job map/combine timings.
+#
+# Jobs are plain objects (no closures), so they pickle for the process
+# executor. Means are combined as (sum, count) and can differ from a
+# single-pass pandas mean in the last few bits.
+# ============================================================
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import (
+    ARRIVAL_CANDIDATES,
+    DELAY_CANDIDATES,
+    DISTANCE_CANDIDATES,
+    SATISFACTION_CANDIDATES,
+    SATISFIED_LABELS,
+    first_existing_col,
+)
+
+MAPREDUCE_EXECUTORS = ("serial", "thread", "process")
+DEFAULT_PARTITIONS = 8
+
+CREW_COLUMNS = ["On-board service", "Inflight service", "Checkin service"]
+SERVICE_COLUMNS = [
+    "Inflight wifi service",
+    "Departure/Arrival time convenient",
+    "Ease of Online booking",
+    "Gate location",
+    "Food and drink",
+    "Online boarding",
+    "Seat comfort",
+    "Inflight entertainment",
+    "On-board service",
+    "Leg room service",
+    "Baggage handling",
+    "Checkin service",
+    "Inflight service",
+    "Cleanliness",
+]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _numeric(part: pd.DataFrame, column: str) -> pd.Series:
+    return pd.to_numeric(part[column], errors="coerce")
+
+
+# ============================================================
+# Jobs
+# ============================================================
+class Job:
+    """
+    map(partition) -> partial; combine(a, b) -> partial (associative);
+    finalize(partial) -> result. Subclasses override the three methods.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def map(self, part: pd.DataFrame):
+        raise NotImplementedError
+
+    def combine(self, a, b):
+        raise NotImplementedError
+
+    def finalize(self, partial):
+        return partial
+
+
+class RowCountJob(Job):
+    def map(self, part: pd.DataFrame) -> int:
+        return len(part)
+
+    def combine(self, a: int, b: int) -> int:
+        return a + b
+
+
+class MissingCellsJob(Job):
+    def map(self, part: pd.DataFrame) -> int:
+        return int(part.isna().sum().sum())
+
+    def combine(self, a: int, b: int) -> int:
+        return a + b
+
+
+class MeanJob(Job):
+    """Mean of a numeric column (None when it has no values)."""
+
+    def __init__(self, name: str, column: str):
+        super().__init__(name)
+        self.column = column
+
+    def map(self, part: pd.DataFrame) -> tuple[float, int]:
+        s = _numeric(part, self.column)
+        return float(s.sum()), int(s.notna().sum())
+
+    def combine(self, a, b):
+        return a[0] + b[0], a[1] + b[1]
+
+    def finalize(self, partial):
+        total, count = partial
+        return total / count if count else None
+
+
+class ColumnMeansJob(Job):
+    """Per-column means of several numeric columns, as a Series."""
+
+    def __init__(self, name: str, columns: list[str]):
+        super().__init__(name)
+        self.columns = list(columns)
+
+    def map(self, part: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        block = part[self.columns].apply(pd.to_numeric, errors="coerce")
+        return block.sum().to_numpy(dtype=np.float64), block.notna().sum().to_numpy(dtype=np.int64)
+
+    def combine(self, a, b):
+        return a[0] + b[0], a[1] + b[1]
+
+    def finalize(self, partial) -> pd.Series:
+        sums, counts = partial
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(sums / counts, index=self.columns)
+
+
+class LabelRateJob(Job):
+    """Percentage of rows whose normalised text label is in `labels`."""
+
+    def __init__(self, name: str, column: str, labels):
+        super().__init__(name)
+        self.column = column
+        self.labels = {str(x).strip().lower() for x in labels}
+
+    def map(self, part: pd.DataFrame) -> tuple[int, int]:
+        raw = part[self.column].astype(str).str.strip().str.lower()
+        return int(raw.isin(self.labels).sum()), len(part)
+
+    def combine(self, a, b):
+        return a[0] + b[0], a[1] + b[1]
+
+    def finalize(self, partial):
+        hits, rows = partial
+        return hits / rows * 100.0 if rows else None
+
+
+class ValueCountsJob(Job):
+    """Value counts of one column (descending), combined by index-aligned addition."""
+
+    def __init__(self, name: str, column: str):
+        super().__init__(name)
+        self.column = column
+
+    def map(self, part: pd.DataFrame) -> pd.Series:
+        return part[self.column].value_counts()
+
+    def combine(self, a: pd.Series, b: pd.Series) -> pd.Series:
+        return a.add(b, fill_value=0).astype(np.int64)
+
+    def finalize(self, partial: pd.Series) -> pd.Series:
+        return partial.sort_values(ascending=False, kind="stable")
+
+
+class FunctionJob(Job):
+    """Ad-hoc job from three functions (module-level functions if the process executor is used)."""
+
+    def __init__(self, name: str, map_fn: Callable, combine_fn: Callable, finalize_fn: Callable | None = None):
+        super().__init__(name)
+        self.map_fn = map_fn
+        self.combine_fn = combine_fn
+        self.finalize_fn = finalize_fn
+
+    def map(self, part):
+        return self.map_fn(part)
+
+    def combine(self, a, b):
+        return self.combine_fn(a, b)
+
+    def finalize(self, partial):
+        return self.finalize_fn(partial) if self.finalize_fn else partial
+
+
+# ============================================================
+# Scheduler
+# ============================================================
+def _map_task(jobs: list[Job], part: pd.DataFrame) -> list[tuple[object, float]]:
+    """Run every job's map over one partition (one task = one scan); returns (partial, seconds) per job."""
+    out = []
+    for job in jobs:
+        t0 = time.perf_counter()
+        partial = job.map(part)
+        out.append((partial, time.perf_counter() - t0))
+    return out
+
+
+def _partitions(df: pd.DataFrame, partitions: int) -> list[pd.DataFrame]:
+    bounds = np.linspace(0, len(df), max(1, min(int(partitions), max(len(df), 1))) + 1).astype(np.int64)
+    return [df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def run_jobs(
+    jobs: list[Job],
+    df: pd.DataFrame,
+    partitions: int = DEFAULT_PARTITIONS,
+    executor: str = "serial",
+    workers: int | None = None,
+    fuse: bool = True,
+) -> dict:
+    """
+    Run map-reduce jobs over row partitions of df.
+
+    fuse=True submits one task per partition that runs every job's map
+    (a single scan); fuse=False submits one task per (job, partition).
+    Partials are combined in partition order.
+
+    Returns {"results": {name: value}, "timings": DataFrame, "seconds",
+    "map_seconds", "executor", "fused", "partitions", "tasks"}; an empty
+    job list returns empty results without scanning df.
+    """
+    if executor not in MAPREDUCE_EXECUTORS:
+        raise ValueError(f"Unknown executor: {executor}. Choose one of {MAPREDUCE_EXECUTORS}.")
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique.")
+
+    parts = _partitions(df, partitions)
+    if not jobs:
+        return {
+            "results": {},
+            "timings": pd.DataFrame(columns=["Job", "Map s", "Combine s", "Partitions", "Share %"]),
+            "seconds": 0.0,
+            "map_seconds": 0.0,
+            "executor": executor,
+            "fused": bool(fuse),
+            "partitions": len(parts),
+            "tasks": 0,
+        }
+    groups = [jobs] if fuse else [[job] for job in jobs]
+    workers = max(1, int(workers or os.cpu_count() or 1))
+
+    t0 = time.perf_counter()
+    # task results: results[g][p] = [(partial, seconds), ...] for the jobs of group g on partition p
+    if executor == "serial":
+        results = [[_map_task(group, part) for part in parts] for group in groups]
+    else:
+        pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        with pool_cls(max_workers=workers) as pool:
+            futures = [[pool.submit(_map_task, group, part) for part in parts] for group in groups]
+            results = [[f.result() for f in row] for row in futures]
+    map_wall = time.perf_counter() - t0
+
+    out: dict[str, object] = {}
+    timings = []
+    for group, per_part in zip(groups, results):
+        for j, job in enumerate(group):
+            partials = [task[j][0] for task in per_part]
+            map_s = sum(task[j][1] for task in per_part)
+            t1 = time.perf_counter()
+            merged = partials[0]
+            for partial in partials[1:]:
+                merged = job.combine(merged, partial)
+            out[job.name] = job.finalize(merged)
+            timings.append(
+                {"Job": job.name, "Map s": map_s, "Combine s": time.perf_counter() - t1, "Partitions": len(partials)}
+            )
+    seconds = time.perf_counter() - t0
+
+    timings = pd.DataFrame(timings)
+    timings["Share %"] = timings["Map s"] / timings["Map s"].sum() * 100.0 if timings["Map s"].sum() > 0 else 0.0
+    return {
+        "results": out,
+        "timings": timings,
+        "seconds": float(seconds),
+        "map_seconds": float(map_wall),
+        "executor": executor,
+        "fused": bool(fuse),
+        "partitions": len(parts),
+        "tasks": len(parts) * len(groups),
+    }
+
+
+# ============================================================
+# Module KPI jobs
+# ============================================================
+def flight_kpi_jobs(df: pd.DataFrame) -> list[Job]:
+    """Module 1 headline KPIs for the columns present in df."""
+    jobs: list[Job] = [RowCountJob("Total Flights")]
+    for name, candidates in (
+        ("Avg Distance", DISTANCE_CANDIDATES),
+        ("Avg Departure Delay", DELAY_CANDIDATES),
+        ("Avg Arrival Delay", ARRIVAL_CANDIDATES),
+    ):
+        col = first_existing_col(df, candidates)
+        if col:
+            jobs.append(MeanJob(name, col))
+    if "Estimated Fuel Consumption (kg)" in df.columns:
+        jobs.append(MeanJob("Avg Fuel", "Estimated Fuel Consumption (kg)"))
+    crew = [c for c in CREW_COLUMNS if c in df.columns]
+    if crew:
+        jobs.append(ColumnMeansJob("Crew Ratings", crew))
+    return jobs
+
+
+def customer_kpi_jobs(df: pd.DataFrame) -> list[Job]:
+    """Module 2 KPIs: satisfied rate and label distribution from the raw label, plus service ratings."""
+    jobs: list[Job] = []
+    sat_col = first_existing_col(df, SATISFACTION_CANDIDATES)
+    if sat_col:
+        jobs.append(LabelRateJob("Satisfied Rate %", sat_col, SATISFIED_LABELS))
+        jobs.append(ValueCountsJob("Satisfaction Labels", sat_col))
+    services = [c for c in SERVICE_COLUMNS if c in df.columns]
+    if services:
+        jobs.append(ColumnMeansJob("Service Ratings", services))
+    return jobs
+
+
+def cloud_kpi_jobs(df: pd.DataFrame) -> list[Job]:
+    """Module 4 dataset-health KPIs."""
+    jobs: list[Job] = [RowCountJob("Rows"), MissingCellsJob("Missing Cells")]
+    col = first_existing_col(df, DELAY_CANDIDATES)
+    if col:
+        jobs.append(MeanJob("Overall Avg Departure Delay", col))
+    return jobs
+
+
+def module_kpi_jobs(df: pd.DataFrame) -> dict[str, list[Job]]:
+    """KPI jobs of Modules 1, 2 and 4, keyed by module, ready to run in one shared pass."""
+    return {
+        "Flight Performance": flight_kpi_jobs(df),
+        "Customer Experience": customer_kpi_jobs(df),
+        "Cloud Analytics": cloud_kpi_jobs(df),
+    }
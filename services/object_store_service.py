@@ -0,0 +1,373 @@
+# ============================================================
+# object_store_service.py – Object Storage Abstraction
+# ============================================================
+#
+# A minimal S3-style storage interface (buckets, keys, multipart
+# uploads, ranged GETs) with a filesystem-backed implementation, plus
+# a partitioned dataset loader that fetches objects concurrently on a
+# thread pool and parses each one as it arrives.
+#
+# The loader only talks to the ObjectStore interface, so pointing it
+# at a real store means adding one more implementation. The local
+# store can inject a fixed per-request latency to mimic a network
+# round trip when measuring throughput against concurrency.
+# ============================================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_STORE_ROOT = Path("object_store")
+DEFAULT_PART_BYTES = 5 << 20
+DEFAULT_ROWS_PER_PARTITION = 10_000
+
+_BUCKET_RE = re.compile(r"^[a-z0-9][a-z0-9.-]{1,61}[a-z0-9]$")
+
+
+# ============================================================
+# Storage interface
+# ============================================================
+class ObjectStore(ABC):
+    """
+    Storage interface used by the loaders. Keys are '/'-separated paths.
+    Byte ranges are inclusive (start, end), like an HTTP Range header.
+    """
+
+    @abstractmethod
+    def create_bucket(self, bucket: str) -> None:
+        ...
+
+    @abstractmethod
+    def put_object(self, bucket: str, key: str, data: bytes) -> dict:
+        ...
+
+    @abstractmethod
+    def get_object(self, bucket: str, key: str, byte_range: tuple[int, int] | None = None) -> bytes:
+        ...
+
+    @abstractmethod
+    def head_object(self, bucket: str, key: str) -> dict:
+        ...
+
+    @abstractmethod
+    def list_objects(self, bucket: str, prefix: str = "") -> list[dict]:
+        ...
+
+    @abstractmethod
+    def delete_object(self, bucket: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def create_multipart_upload(self, bucket: str, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    def complete_multipart_upload(self, bucket: str, key: str, upload_id: str) -> dict:
+        ...
+
+    @abstractmethod
+    def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        ...
+
+
+class LocalObjectStore(ObjectStore):
+    """
+    Filesystem-backed store: root/<bucket>/data/<key> holds the bytes and
+    root/<bucket>/meta/<key>.json the size, ETag and part sizes. Multipart
+    parts are staged under root/<bucket>/uploads/<upload_id>/ until the
+    upload is completed.
+
+    latency_ms adds a fixed delay to every request (simulated round trip).
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_STORE_ROOT, latency_ms: float = 0.0):
+        self.root = Path(root)
+        self.latency_ms = float(latency_ms)
+
+    # ---- paths & helpers ----
+    def _bucket_dir(self, bucket: str) -> Path:
+        if not _BUCKET_RE.match(bucket):
+            raise ValueError(f"Invalid bucket name: {bucket!r} (3-63 chars: lowercase letters, digits, '.', '-').")
+        return self.root / bucket
+
+    def _paths(self, bucket: str, key: str) -> tuple[Path, Path]:
+        parts = [p for p in key.split("/") if p]
+        if not parts or any(p in (".", "..") for p in parts):
+            raise ValueError(f"Invalid object key: {key!r}")
+        base = self._bucket_dir(bucket)
+        if not base.exists():
+            raise KeyError(f"No such bucket: {bucket}")
+        return base.joinpath("data", *parts), base.joinpath("meta", *parts[:-1], parts[-1] + ".json")
+
+    def _wait(self) -> None:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _write_meta(self, meta_path: Path, meta: dict) -> None:
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        tmp.replace(meta_path)
+
+    # ---- buckets & objects ----
+    def create_bucket(self, bucket: str) -> None:
+        self._bucket_dir(bucket).mkdir(parents=True, exist_ok=True)
+
+    def put_object(self, bucket: str, key: str, data: bytes) -> dict:
+        self._wait()
+        data_path, meta_path = self._paths(bucket, key)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_name(data_path.name + f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(data_path)
+        meta = {
+            "key": key,
+            "size": len(data),
+            "etag": hashlib.md5(data).hexdigest(),
+            "parts": [len(data)],
+            "modified": time.time(),
+        }
+        self._write_meta(meta_path, meta)
+        return meta
+
+    def head_object(self, bucket: str, key: str) -> dict:
+        self._wait()
+        _, meta_path = self._paths(bucket, key)
+        if not meta_path.exists():
+            raise KeyError(f"No such object: {bucket}/{key}")
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+
+    def get_object(self, bucket: str, key: str, byte_range: tuple[int, int] | None = None) -> bytes:
+        self._wait()
+        data_path, _ = self._paths(bucket, key)
+        if not data_path.exists():
+            raise KeyError(f"No such object: {bucket}/{key}")
+        with open(data_path, "rb") as f:
+            if byte_range is None:
+                return f.read()
+            start, end = int(byte_range[0]), int(byte_range[1])
+            if start < 0 or end < start:
+                raise ValueError(f"Invalid byte range: {byte_range}")
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def list_objects(self, bucket: str, prefix: str = "") -> list[dict]:
+        self._wait()
+        meta_root = self._bucket_dir(bucket) / "meta"
+        if not meta_root.exists():
+            return []
+        out = []
+        for path in meta_root.rglob("*.json"):
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            if meta["key"].startswith(prefix):
+                out.append(meta)
+        return sorted(out, key=lambda m: m["key"])
+
+    def delete_object(self, bucket: str, key: str) -> None:
+        self._wait()
+        data_path, meta_path = self._paths(bucket, key)
+        data_path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        base = self._bucket_dir(bucket)
+        for path, top in ((data_path, base / "data"), (meta_path, base / "meta")):
+            # drop directories left empty, so per-run prefixes leave nothing behind
+            parent = path.parent
+            while parent != top and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+
+    # ---- multipart ----
+    def _upload_dir(self, bucket: str, upload_id: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            raise ValueError(f"Invalid upload id: {upload_id!r}")
+        return self._bucket_dir(bucket) / "uploads" / upload_id
+
+    def create_multipart_upload(self, bucket: str, key: str) -> str:
+        self._wait()
+        self._paths(bucket, key)
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(bucket, upload_id)
+        upload_dir.mkdir(parents=True)
+        (upload_dir / "key").write_text(key, encoding="utf-8")
+        return upload_id
+
+    def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        self._wait()
+        upload_dir = self._upload_dir(bucket, upload_id)
+        if not upload_dir.exists():
+            raise KeyError(f"No such upload: {upload_id}")
+        if not 1 <= int(part_number) <= 10_000:
+            raise ValueError("Part numbers run from 1 to 10000.")
+        (upload_dir / f"{int(part_number):05d}.part").write_bytes(data)
+        return hashlib.md5(data).hexdigest()
+
+    def complete_multipart_upload(self, bucket: str, key: str, upload_id: str) -> dict:
+        """Concatenate the staged parts in part-number order into the final object (S3-style multipart ETag)."""
+        self._wait()
+        upload_dir = self._upload_dir(bucket, upload_id)
+        if not upload_dir.exists():
+            raise KeyError(f"No such upload: {upload_id}")
+        part_files = sorted(upload_dir.glob("*.part"))
+        if not part_files:
+            raise ValueError("Cannot complete a multipart upload with no parts.")
+
+        data_path, meta_path = self._paths(bucket, key)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_name(data_path.name + f".{upload_id}.tmp")
+        sizes, digests = [], b""
+        with open(tmp, "wb") as out:
+            for part in part_files:
+                data = part.read_bytes()
+                out.write(data)
+                sizes.append(len(data))
+                digests += hashlib.md5(data).digest()
+        tmp.replace(data_path)
+        shutil.rmtree(upload_dir)
+
+        etag = f"{hashlib.md5(digests).hexdigest()}-{len(sizes)}"
+        meta = {"key": key, "size": sum(sizes), "etag": etag, "parts": sizes, "modified": time.time()}
+        self._write_meta(meta_path, meta)
+        return meta
+
+    def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        self._wait()
+        shutil.rmtree(self._upload_dir(bucket, upload_id), ignore_errors=True)
+
+
+# ============================================================
+# Uploads & ranged reads
+# ============================================================
+def upload_multipart(
+    store: ObjectStore, bucket: str, key: str, data: bytes, part_bytes: int = DEFAULT_PART_BYTES
+) -> dict:
+    """Upload data as a multipart object of part_bytes-sized parts (aborted on failure)."""
+    part_bytes = max(1, int(part_bytes))
+    upload_id = store.create_multipart_upload(bucket, key)
+    try:
+        for number, start in enumerate(range(0, max(len(data), 1), part_bytes), start=1):
+            store.upload_part(bucket, key, upload_id, number, data[start : start + part_bytes])
+        return store.complete_multipart_upload(bucket, key, upload_id)
+    except Exception:
+        store.abort_multipart_upload(bucket, key, upload_id)
+        raise
+
+
+def get_object_ranged(store: ObjectStore, bucket: str, key: str, range_bytes: int, concurrency: int = 4) -> bytes:
+    """Fetch one object as concurrent ranged GETs of range_bytes each and reassemble it in order."""
+    size = store.head_object(bucket, key)["size"]
+    range_bytes = max(1, int(range_bytes))
+    ranges = [(start, min(size, start + range_bytes) - 1) for start in range(0, size, range_bytes)]
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as pool:
+        chunks = list(pool.map(lambda r: store.get_object(bucket, key, r), ranges))
+    return b"".join(chunks)
+
+
+# ============================================================
+# Partitioned datasets
+# ============================================================
+def publish_partitions(
+    df: pd.DataFrame,
+    store: ObjectStore,
+    bucket: str,
+    prefix: str = "train/",
+    rows_per_partition: int = DEFAULT_ROWS_PER_PARTITION,
+    part_bytes: int = DEFAULT_PART_BYTES,
+) -> list[dict]:
+    """
+    Write df as CSV partition objects prefix/part-00000.csv, ... (each with a
+    header row). Existing objects under the prefix are replaced.
+    Partitions larger than part_bytes are uploaded as multipart objects.
+    """
+    rows_per_partition = max(1, int(rows_per_partition))
+    store.create_bucket(bucket)
+    delete_prefix(store, bucket, prefix)
+
+    written = []
+    for number, start in enumerate(range(0, len(df), rows_per_partition)):
+        key = f"{prefix}part-{number:05d}.csv"
+        data = df.iloc[start : start + rows_per_partition].to_csv(index=False).encode("utf-8")
+        if len(data) > part_bytes:
+            written.append(upload_multipart(store, bucket, key, data, part_bytes))
+        else:
+            written.append(store.put_object(bucket, key, data))
+    return written
+
+
+def delete_prefix(store: ObjectStore, bucket: str, prefix: str) -> int:
+    """Delete every object under prefix; returns the number of objects removed."""
+    objects = store.list_objects(bucket, prefix)
+    for meta in objects:
+        store.delete_object(bucket, meta["key"])
+    return len(objects)
+
+
+def load_partitions(store: ObjectStore, bucket: str, prefix: str = "train/", concurrency: int = 4) -> dict:
+    """
+    Fetch every partition object under prefix on a thread pool and parse
+    each one as soon as its bytes arrive. Frames are reassembled in key order.
+
+    Returns {"df", "objects", "bytes", "seconds", "mb_per_sec", "rows_per_sec", "concurrency"}.
+    """
+    concurrency = max(1, int(concurrency))
+    t0 = time.perf_counter()
+    objects = store.list_objects(bucket, prefix)
+    if not objects:
+        raise ValueError(f"No objects under {bucket}/{prefix}")
+
+    keys = [m["key"] for m in objects]
+    frames: dict[str, pd.DataFrame] = {}
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(store.get_object, bucket, key): key for key in keys}
+        for future in as_completed(futures):
+            data = future.result()
+            total_bytes += len(data)
+            frames[futures[future]] = pd.read_csv(BytesIO(data))
+    df = pd.concat([frames[k] for k in keys], ignore_index=True)
+    seconds = time.perf_counter() - t0
+
+    return {
+        "df": df,
+        "objects": len(keys),
+        "bytes": int(total_bytes),
+        "seconds": float(seconds),
+        "mb_per_sec": total_bytes / 1024**2 / seconds if seconds > 0 else float("inf"),
+        "rows_per_sec": len(df) / seconds if seconds > 0 else float("inf"),
+        "concurrency": concurrency,
+    }
+
+
+def benchmark_concurrency(
+    store: ObjectStore, bucket: str, prefix: str = "train/", concurrencies=(1, 2, 4, 8)
+) -> pd.DataFrame:
+    """Partition-load throughput for each concurrency level (one full load per level)."""
+    rows = []
+    for c in concurrencies:
+        run = load_partitions(store, bucket, prefix, concurrency=int(c))
+        rows.append(
+            {
+                "Concurrency": int(c),
+                "Seconds": run["seconds"],
+                "MB/s": run["mb_per_sec"],
+                "Rows/s": run["rows_per_sec"],
+                "Objects": run["objects"],
+            }
+        )
+    out = pd.DataFrame(rows)
+    out["Speedup"] = out["Seconds"].iloc[0] / out["Seconds"]
+    return out
@@ -0,0 +1,305 @@
+# ============================================================
+# scenario_store_service.py – Persistent Scenario Results
+# ============================================================
+#
+# SQLite-backed store for simulation results. Each scenario is keyed
+# by (dataset fingerprint, model, parameters, seed, sims) and keeps its
+# KPIs, any extra JSON data and result frames (histograms, percentile
+# bands, curves), so repeated scenarios are served from disk and saved
+# scenarios can be compared without resimulating. Every slider position
+# is a new scenario, so each scenario type keeps only its most recently
+# used MAX_SCENARIOS rows.
+# ============================================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+STORE_DIR = Path("scenarios")
+DEFAULT_STORE_PATH = STORE_DIR / "scenario_store.sqlite"
+MAX_SCENARIOS = 200  # rows kept per scenario type
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    key TEXT PRIMARY KEY,
+    scenario TEXT NOT NULL,
+    label TEXT NOT NULL,
+    fingerprint TEXT,
+    model TEXT NOT NULL,
+    params TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    sims INTEGER NOT NULL,
+    created REAL NOT NULL,
+    seconds REAL,
+    kpis TEXT NOT NULL,
+    data TEXT NOT NULL,
+    frames TEXT NOT NULL
+)
+"""
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _connect(path: str | Path) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path)
+    con.execute(_SCHEMA)
+    return con
+
+
+def _canonical(params: dict) -> str:
+    """Order-independent JSON for parameters (floats rounded so 1.15 and 1.1500000001 agree)."""
+
+    def norm(v):
+        if isinstance(v, float):
+            return round(v, 10)
+        if isinstance(v, dict):
+            return {k: norm(x) for k, x in v.items()}
+        if isinstance(v, (list, tuple)):
+            return [norm(x) for x in v]
+        return v
+
+    return json.dumps(norm(params), sort_keys=True, default=str)
+
+
+def _frames_to_json(frames: dict[str, pd.DataFrame]) -> str:
+    return json.dumps({name: df.to_json(orient="table", double_precision=15) for name, df in frames.items()})
+
+
+def _frames_from_json(text: str) -> dict[str, pd.DataFrame]:
+    return {name: pd.read_json(StringIO(payload), orient="table") for name, payload in json.loads(text).items()}
+
+
+def _unique_labels(records: list[dict]) -> list[str]:
+    """Scenario labels, with the key appended to repeats so no column is silently merged."""
+    seen: set[str] = set()
+    labels = []
+    for r in records:
+        label = r["label"]
+        if label in seen:
+            label = f"{label} · {r['key'][:8]}"
+        seen.add(label)
+        labels.append(label)
+    return labels
+
+
+def _row_to_record(row: sqlite3.Row) -> dict:
+    return {
+        "key": row["key"],
+        "scenario": row["scenario"],
+        "label": row["label"],
+        "fingerprint": row["fingerprint"],
+        "model": row["model"],
+        "params": json.loads(row["params"]),
+        "seed": row["seed"],
+        "sims": row["sims"],
+        "created": row["created"],
+        "seconds": row["seconds"],
+        "kpis": json.loads(row["kpis"]),
+        "data": json.loads(row["data"]),
+        "frames": _frames_from_json(row["frames"]),
+    }
+
+
+# ============================================================
+# Store API
+# ============================================================
+def scenario_key(fingerprint: str | None, model: str, params: dict, seed: int, sims: int) -> str:
+    """Stable key for one scenario: hash of (dataset fingerprint, model, parameters, seed, sims)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{fingerprint}|{model}|{_canonical(params)}|{int(seed)}|{int(sims)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_scenario(key: str, path: str | Path = DEFAULT_STORE_PATH) -> dict | None:
+    if not Path(path).exists():
+        return None
+    with closing(_connect(path)) as con, con:
+        con.row_factory = sqlite3.Row
+        row = con.execute("SELECT * FROM scenarios WHERE key = ?", (key,)).fetchone()
+    return _row_to_record(row) if row else None
+
+
+def touch_scenario(key: str, path: str | Path = DEFAULT_STORE_PATH) -> None:
+    """Mark a scenario as just used, so retention keeps it."""
+    with closing(_connect(path)) as con, con:
+        con.execute("UPDATE scenarios SET created = ? WHERE key = ?", (time.time(), key))
+
+
+def prune_scenarios(
+    max_scenarios: int = MAX_SCENARIOS, scenario: str | None = None, path: str | Path = DEFAULT_STORE_PATH
+) -> int:
+    """Keep the max_scenarios most recently used rows per scenario type; returns how many were removed."""
+    if not Path(path).exists():
+        return 0
+    with closing(_connect(path)) as con, con:
+        types = [scenario] if scenario is not None else [r[0] for r in con.execute("SELECT DISTINCT scenario FROM scenarios")]
+        removed = 0
+        for kind in types:
+            removed += con.execute(
+                "DELETE FROM scenarios WHERE scenario = ? AND key NOT IN "
+                "(SELECT key FROM scenarios WHERE scenario = ? ORDER BY created DESC LIMIT ?)",
+                (kind, kind, max(0, int(max_scenarios))),
+            ).rowcount
+    return removed
+
+
+def put_scenario(
+    key: str,
+    scenario: str,
+    label: str,
+    fingerprint: str | None,
+    model: str,
+    params: dict,
+    seed: int,
+    sims: int,
+    kpis: dict,
+    data: dict | None = None,
+    frames: dict[str, pd.DataFrame] | None = None,
+    seconds: float | None = None,
+    path: str | Path = DEFAULT_STORE_PATH,
+    max_scenarios: int | None = MAX_SCENARIOS,
+) -> None:
+    """Insert or replace one scenario result, then prune its type to max_scenarios rows (None = no limit)."""
+    with closing(_connect(path)) as con, con:
+        con.execute(
+            "INSERT OR REPLACE INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                scenario,
+                label,
+                fingerprint,
+                model,
+                _canonical(params),
+                int(seed),
+                int(sims),
+                time.time(),
+                seconds,
+                json.dumps(kpis),
+                json.dumps(data or {}),
+                _frames_to_json(frames or {}),
+            ),
+        )
+    if max_scenarios is not None:
+        prune_scenarios(max_scenarios, scenario, path)
+
+
+def cached_scenario(
+    compute: Callable[[], dict],
+    scenario: str,
+    fingerprint: str | None,
+    model: str,
+    params: dict,
+    seed: int | None,
+    sims: int,
+    label: str | None = None,
+    path: str | Path = DEFAULT_STORE_PATH,
+    max_scenarios: int | None = MAX_SCENARIOS,
+) -> dict:
+    """
+    Serve a scenario from the store, or run compute() and persist it.
+
+    compute() returns {"kpis": flat dict, "data": JSON-able dict (optional),
+    "frames": {name: DataFrame} (optional)}. Unseeded runs are not
+    reproducible, so they are computed but never stored. A hit counts as
+    a use for retention (see prune_scenarios).
+    Returns the stored record plus "cached" (True on a store hit).
+    """
+    key = scenario_key(fingerprint, model, params, seed if seed is not None else -1, sims)
+    if seed is not None:
+        record = get_scenario(key, path)
+        if record is not None:
+            touch_scenario(key, path)
+            return {**record, "cached": True}
+
+    t0 = time.perf_counter()
+    result = compute()
+    seconds = time.perf_counter() - t0
+
+    record = {
+        "key": key,
+        "scenario": scenario,
+        "label": label or f"{scenario} · {model} · seed {seed} · {sims:,} sims",
+        "fingerprint": fingerprint,
+        "model": model,
+        "params": json.loads(_canonical(params)),
+        "seed": seed,
+        "sims": int(sims),
+        "created": time.time(),
+        "seconds": seconds,
+        "kpis": result["kpis"],
+        "data": result.get("data", {}),
+        "frames": result.get("frames", {}),
+    }
+    if seed is not None:
+        put_scenario(
+            key,
+            scenario,
+            record["label"],
+            fingerprint,
+            model,
+            params,
+            seed,
+            sims,
+            record["kpis"],
+            data=record["data"],
+            frames=record["frames"],
+            seconds=seconds,
+            path=path,
+            max_scenarios=max_scenarios,
+        )
+    return {**record, "cached": False}
+
+
+def list_scenarios(path: str | Path = DEFAULT_STORE_PATH, scenario: str | None = None) -> pd.DataFrame:
+    """Saved scenarios (most recently used first) without their frames."""
+    columns = ["key", "scenario", "label", "model", "params", "seed", "sims", "created", "seconds"]
+    if not Path(path).exists():
+        return pd.DataFrame(columns=columns)
+    query = f"SELECT {', '.join(columns)} FROM scenarios"
+    args: tuple = ()
+    if scenario is not None:
+        query += " WHERE scenario = ?"
+        args = (scenario,)
+    with closing(_connect(path)) as con, con:
+        out = pd.read_sql_query(query + " ORDER BY created DESC", con, params=args)
+    out["created"] = pd.to_datetime(out["created"], unit="s")
+    return out
+
+
+def compare_scenarios(keys: list[str], path: str | Path = DEFAULT_STORE_PATH) -> pd.DataFrame:
+    """KPIs of saved scenarios side by side (one column per scenario; repeated labels get the key appended)."""
+    records = [r for r in (get_scenario(k, path) for k in keys) if r is not None]
+    labels = _unique_labels(records)
+    return pd.DataFrame({label: pd.Series(r["kpis"], dtype="float64") for label, r in zip(labels, records)})
+
+
+def scenario_overlay(keys: list[str], frame: str, column: str, path: str | Path = DEFAULT_STORE_PATH) -> pd.DataFrame:
+    """One column of a stored frame (e.g. an exceedance curve) for each saved scenario, aligned on the index."""
+    records = [r for r in (get_scenario(k, path) for k in keys) if r is not None]
+    return pd.DataFrame(
+        {
+            label: r["frames"][frame][column]
+            for label, r in zip(_unique_labels(records), records)
+            if frame in r["frames"] and column in r["frames"][frame]
+        }
+    ).sort_index()
+
+
+def clear_scenarios(path: str | Path = DEFAULT_STORE_PATH) -> int:
+    """Delete every saved scenario; returns how many were removed."""
+    if not Path(path).exists():
+        return 0
+    with closing(_connect(path)) as con, con:
+        return con.execute("DELETE FROM scenarios").rowcount
@@ -0,0 +1,293 @@
+# ============================================================
+# scoring_service.py – Batch Passenger Satisfaction Scoring
+# ============================================================
+#
+# Trains a satisfaction classifier on assets/train.csv, persists the
+# model together with its feature schema, and scores new survey
+# batches chunk-by-chunk so very large files never sit in memory.
+# ============================================================
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import ID_CANDIDATES, SATISFACTION_CANDIDATES, SATISFIED_LABELS, first_existing_col
+
+MODEL_DIR = Path("models")
+DEFAULT_MODEL_PATH = MODEL_DIR / "satisfaction_model.joblib"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+NUMERIC_FEATURES = [
+    "Age",
+    "Flight Distance",
+    "Inflight wifi service",
+    "Departure/Arrival time convenient",
+    "Ease of Online booking",
+    "Gate location",
+    "Food and drink",
+    "Online boarding",
+    "Seat comfort",
+    "Inflight entertainment",
+    "On-board service",
+    "Leg room service",
+    "Baggage handling",
+    "Checkin service",
+    "Inflight service",
+    "Cleanliness",
+    "Departure Delay in Minutes",
+    "Arrival Delay in Minutes",
+]
+
+CATEGORICAL_FEATURES = ["Gender", "Customer Type", "Type of Travel", "Class"]
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _target_from_labels(values: pd.Series) -> pd.Series:
+    """Binary target: 1 = satisfied, 0 = neutral/dissatisfied (numeric labels: >= 4, or 1 for 0/1 data)."""
+    raw = values.astype(str).str.strip().str.lower()
+    numeric = pd.to_numeric(raw, errors="coerce")
+    if numeric.notna().all():
+        cutoff = 1 if numeric.max() <= 1 else 4
+        return (numeric >= cutoff).astype(np.int8)
+    return raw.isin(SATISFIED_LABELS).astype(np.int8)
+
+
+def _encode(frame: pd.DataFrame, schema: dict) -> np.ndarray:
+    """
+    Turn a raw survey frame into the model's feature matrix.
+    Missing columns become NaN; unseen categories become NaN (treated as missing).
+    """
+    n = len(frame)
+    numeric = schema["numeric"]
+    categorical = schema["categorical"]
+    X = np.full((n, len(numeric) + len(categorical)), np.nan, dtype=np.float32)
+
+    for j, col in enumerate(numeric):
+        if col in frame.columns:
+            X[:, j] = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+
+    offset = len(numeric)
+    for j, (col, cats) in enumerate(categorical.items()):
+        if col in frame.columns:
+            codes = pd.Categorical(frame[col].astype(str).str.strip(), categories=cats).codes.astype(np.float32)
+            codes[codes < 0] = np.nan
+            X[:, offset + j] = codes
+
+    return X
+
+
+def _schema_path(model_path: Path) -> Path:
+    return model_path.with_suffix(".schema.json")
+
+
+# ============================================================
+# Training & persistence
+# ============================================================
+def train_satisfaction_model(df: pd.DataFrame | None = None, holdout: float = 0.2, seed: int = 42) -> dict:
+    """
+    Fit a gradient-boosted satisfaction classifier.
+    Returns a model bundle: {"model", "schema", "metrics"}.
+    """
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    if df is None:
+        from services.data_service import load_data
+
+        df = load_data()
+
+    target_col = first_existing_col(df, SATISFACTION_CANDIDATES)
+    if target_col is None:
+        raise ValueError("Training data has no satisfaction column.")
+
+    numeric = [c for c in NUMERIC_FEATURES if c in df.columns]
+    categorical = {
+        c: sorted(df[c].dropna().astype(str).str.strip().unique().tolist())
+        for c in CATEGORICAL_FEATURES
+        if c in df.columns
+    }
+    if not numeric and not categorical:
+        raise ValueError("Training data contains none of the expected feature columns.")
+
+    schema = {
+        "numeric": numeric,
+        "categorical": categorical,
+        "target": target_col,
+        "positive_label": "satisfied",
+    }
+
+    X = _encode(df, schema)
+    y = _target_from_labels(df[target_col]).to_numpy()
+
+    rng = np.random.default_rng(seed)
+    test_mask = rng.random(len(df)) < holdout
+
+    model = HistGradientBoostingClassifier(
+        categorical_features=[False] * len(numeric) + [True] * len(categorical),
+        random_state=seed,
+    )
+
+    t0 = time.perf_counter()
+    model.fit(X[~test_mask], y[~test_mask])
+    train_s = time.perf_counter() - t0
+
+    accuracy = float((model.predict(X[test_mask]) == y[test_mask]).mean()) if test_mask.any() else None
+
+    return {
+        "model": model,
+        "schema": schema,
+        "metrics": {
+            "train_rows": int((~test_mask).sum()),
+            "holdout_rows": int(test_mask.sum()),
+            "holdout_accuracy": accuracy,
+            "train_seconds": float(train_s),
+        },
+    }
+
+
+def save_model(bundle: dict, path: str | Path = DEFAULT_MODEL_PATH) -> Path:
+    """Persist the model bundle plus a human-readable schema JSON next to it."""
+    import joblib
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(bundle, path)
+
+    schema_doc = {"schema": bundle["schema"], "metrics": bundle.get("metrics", {})}
+    _schema_path(path).write_text(json.dumps(schema_doc, indent=2), encoding="utf-8")
+    return path
+
+
+def load_model(path: str | Path = DEFAULT_MODEL_PATH) -> dict:
+    import joblib
+
+    return joblib.load(Path(path))
+
+
+def get_model(path: str | Path = DEFAULT_MODEL_PATH, retrain: bool = False) -> dict:
+    """Load the persisted model, training and saving it first if needed."""
+    path = Path(path)
+    if path.exists() and not retrain:
+        return load_model(path)
+
+    bundle = train_satisfaction_model()
+    save_model(bundle, path)
+    return bundle
+
+
+# ============================================================
+# Batch scoring
+# ============================================================
+def _iter_chunks(frame_or_path: pd.DataFrame | str | Path, chunksize: int, usecols: set[str]) -> Iterator[pd.DataFrame]:
+    if isinstance(frame_or_path, pd.DataFrame):
+        for start in range(0, len(frame_or_path), chunksize):
+            yield frame_or_path.iloc[start : start + chunksize]
+        return
+
+    reader = pd.read_csv(frame_or_path, chunksize=chunksize, usecols=lambda c: c in usecols)
+    for chunk in reader:
+        yield chunk
+
+
+def _score_chunk(model, schema: dict, chunk: pd.DataFrame, id_col: str | None) -> pd.DataFrame:
+    proba = model.predict_proba(_encode(chunk, schema))[:, 1]
+
+    out = pd.DataFrame(index=chunk.index)
+    if id_col is not None:
+        out[id_col] = chunk[id_col].to_numpy()
+    out["satisfaction_probability"] = proba.astype(np.float32)
+    out["predicted_satisfied"] = (proba >= 0.5).astype(np.int8)
+    return out
+
+
+def score(
+    frame_or_path: pd.DataFrame | str | Path,
+    bundle: dict | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    workers: int | None = None,
+    output_path: str | Path | None = None,
+) -> dict:
+    """
+    Score a survey batch (DataFrame or CSV path) for predicted satisfaction.
+
+    Chunks are streamed through the model on a thread pool (`workers`),
+    with at most 2 * workers chunks in flight so memory stays bounded.
+    If `output_path` is given, results are appended to that CSV and not
+    kept in memory (use this for multi-million-row files).
+
+    Returns {"scores", "rows", "chunks", "seconds", "rows_per_sec", "workers", "output_path"}.
+    """
+    if bundle is None:
+        bundle = get_model()
+
+    model = bundle["model"]
+    schema = bundle["schema"]
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    chunksize = max(1, int(chunksize))
+
+    feature_cols = set(schema["numeric"]) | set(schema["categorical"])
+
+    if isinstance(frame_or_path, pd.DataFrame):
+        id_col = first_existing_col(frame_or_path, ID_CANDIDATES)
+        if not feature_cols & set(frame_or_path.columns):
+            raise ValueError("Input frame contains none of the model's feature columns.")
+    else:
+        header = pd.read_csv(frame_or_path, nrows=0)
+        id_col = first_existing_col(header, ID_CANDIDATES)
+        if not feature_cols & set(header.columns):
+            raise ValueError(f"{frame_or_path} contains none of the model's feature columns.")
+    # the id column as spelled in this input ("Id", "ID", ...), not the candidate spelling
+    usecols = feature_cols | ({id_col} if id_col is not None else set())
+
+    if output_path is not None:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    parts: list[pd.DataFrame] = []
+    rows = 0
+    n_chunks = 0
+
+    def _emit(result: pd.DataFrame) -> None:
+        nonlocal rows, n_chunks
+        if output_path is not None:
+            result.to_csv(output_path, mode="w" if n_chunks == 0 else "a", header=n_chunks == 0, index=False)
+        else:
+            parts.append(result)
+        rows += len(result)
+        n_chunks += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for chunk in _iter_chunks(frame_or_path, chunksize, usecols):
+            pending.append(pool.submit(_score_chunk, model, schema, chunk, id_col))
+            if len(pending) >= 2 * workers:
+                _emit(pending.popleft().result())
+        while pending:
+            _emit(pending.popleft().result())
+    seconds = time.perf_counter() - t0
+
+    scores = None
+    if output_path is None:
+        scores = pd.concat(parts) if parts else pd.DataFrame(columns=["satisfaction_probability", "predicted_satisfied"])
+
+    return {
+        "scores": scores,
+        "rows": int(rows),
+        "chunks": int(n_chunks),
+        "seconds": float(seconds),
+        "rows_per_sec": float(rows / seconds) if seconds > 0 else float("inf"),
+        "workers": workers,
+        "output_path": str(output_path) if output_path is not None else None,
+    }
@@ -0,0 +1,2226 @@
+# ============================================================
+# simulation_service.py – Vectorised Simulation Kernels
+# ============================================================
+#
+# Shared Monte Carlo kernels for the Risk & Scenario Simulation
+# module. Everything here is pure NumPy (no Streamlit) so it can be
+# used from the UI, the CLI, or a worker process.
+# ============================================================
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # optional: the NumPy kernels are used instead
+    numba = None
+
+DAYS_PER_YEAR = 365.0
+
+# Draws per independently-seeded block. Blocks (not workers) own the
+# random streams, so results are identical for any worker count.
+DEFAULT_BLOCK_SIZE = 65_536
+
+DEFAULT_CHUNK_PATHS = 5_000
+DEFAULT_BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Resolution of the per-day log-price histogram used for streaming bands
+_BAND_BINS = 2048
+
+
+# ============================================================
+# Reproducible parallel runner
+# ============================================================
+def _block_sizes(n: int, block_size: int) -> list[int]:
+    block_size = max(1, int(block_size))
+    return [min(block_size, n - start) for start in range(0, n, block_size)]
+
+
+def iter_seeded_blocks(n: int, seed: int | None, block_size: int) -> Iterator[tuple[np.random.Generator, int]]:
+    """Yield (generator, block_n) pairs; block k always gets SeedSequence(seed).spawn(...)[k]."""
+    sizes = _block_sizes(n, block_size)
+    for child, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes):
+        yield np.random.default_rng(child), size
+
+
+def _run_blocks(kernel: Callable, seeds: list, sizes: list[int], params: dict) -> np.ndarray:
+    parts = [kernel(np.random.default_rng(ss), size, **params) for ss, size in zip(seeds, sizes)]
+    return np.concatenate(parts, axis=-1)
+
+
+def run_monte_carlo(
+    kernel: Callable,
+    n: int,
+    seed: int | None = None,
+    workers: int = 1,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    **params,
+) -> np.ndarray:
+    """
+    Run `kernel(rng, n, **params)` for n samples, sharded across processes.
+
+    The n samples are cut into fixed-size blocks, each with its own
+    Generator spawned from SeedSequence(seed). Workers receive contiguous
+    runs of blocks and the shard outputs are concatenated in block order
+    along the last axis, so the result is bit-identical for any worker
+    count. `kernel` must be a module-level function (picklable).
+    """
+    n = int(n)
+    if n <= 0:
+        return kernel(np.random.default_rng(seed), 0, **params)
+
+    sizes = _block_sizes(n, block_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = max(1, min(int(workers), len(sizes)))
+    if workers == 1:
+        return _run_blocks(kernel, seeds, sizes, params)
+
+    bounds = np.linspace(0, len(sizes), workers + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_blocks, kernel, seeds[a:b], sizes[a:b], params)
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+        parts = [f.result() for f in futures]
+    return np.concatenate(parts, axis=-1)
+
+
+# ============================================================
+# Delay Monte Carlo
+# ============================================================
+def delay_draws(
+    rng: np.random.Generator,
+    n: int,
+    mean_delay: float,
+    std_delay: float,
+    crisis_multiplier: float,
+    backend: str = "numpy",
+) -> np.ndarray:
+    """Clipped-normal delay kernel: max(N(mean, std), 0) * crisis multiplier."""
+    if backend != "numpy" and resolve_backend(backend) == "numba":
+        return _jit_clipped_normal(rng, int(n), float(mean_delay), float(std_delay), float(crisis_multiplier))
+    delays = rng.normal(loc=mean_delay, scale=std_delay, size=n)
+    np.clip(delays, 0, None, out=delays)
+    delays *= crisis_multiplier
+    return delays
+
+
+# ============================================================
+# Delay distribution models (fitted to the dataset)
+# ============================================================
+DELAY_MODELS = {
+    "normal": "Clipped normal (baseline)",
+    "empirical": "Empirical bootstrap",
+    "zi_lognormal": "Zero-inflated lognormal",
+    "zi_gamma": "Zero-inflated gamma",
+    "kde": "Zero-inflated log-space KDE",
+}
+
+# (dataset fingerprint, model kind) -> fitted model dict.
+# Empirical/KDE pools are stored sorted so they double as inverse CDFs.
+_FIT_CACHE: OrderedDict = OrderedDict()
+_FIT_CACHE_SIZE = 32
+
+
+def _fit_delay_model(kind: str, values: np.ndarray) -> dict:
+    from scipy import stats
+
+    values = values[np.isfinite(values)]
+    values = np.clip(values, 0, None)
+    positive = values[values > 0]
+    p_zero = float(np.mean(values == 0)) if len(values) else 0.0
+
+    if kind == "normal":
+        std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+        return {"kind": kind, "mean": float(values.mean()), "std": std if std > 0 else 10.0}
+
+    if kind == "empirical":
+        return {"kind": kind, "values": np.sort(values)}
+
+    if len(positive) < 2:
+        raise ValueError(f"Not enough positive delays to fit '{kind}'.")
+
+    if kind == "zi_lognormal":
+        sigma, _, scale = stats.lognorm.fit(positive, floc=0)
+        return {"kind": kind, "p_zero": p_zero, "mu": float(np.log(scale)), "sigma": float(sigma)}
+
+    if kind == "zi_gamma":
+        shape, _, scale = stats.gamma.fit(positive, floc=0)
+        return {"kind": kind, "p_zero": p_zero, "shape": float(shape), "scale": float(scale)}
+
+    if kind == "kde":
+        log_pos = np.log(positive)
+        kde = stats.gaussian_kde(log_pos)
+        return {
+            "kind": kind,
+            "p_zero": p_zero,
+            "log_values": np.sort(log_pos),
+            "bandwidth": float(np.sqrt(kde.covariance[0, 0])),
+        }
+
+    raise ValueError(f"Unknown delay model '{kind}'. Expected one of: {', '.join(DELAY_MODELS)}.")
+
+
+def fit_delay_model(kind: str, values, fingerprint: str | None = None) -> dict:
+    """Fit (or fetch from cache) a delay model for this dataset's delay array."""
+    import scipy.stats  # noqa: F401  (keep the one-off import cost out of fit timings)
+
+    from services.data_service import dataset_fingerprint
+
+    values = np.asarray(values, dtype=np.float64)
+    key = (fingerprint or dataset_fingerprint(values), kind)
+    if key in _FIT_CACHE:
+        _FIT_CACHE.move_to_end(key)
+        return _FIT_CACHE[key]
+
+    t0 = time.perf_counter()
+    model = _fit_delay_model(kind, values)
+    model["fit_seconds"] = time.perf_counter() - t0
+    model["fingerprint"] = key[0]
+    _FIT_CACHE[key] = model
+    while len(_FIT_CACHE) > _FIT_CACHE_SIZE:
+        _FIT_CACHE.popitem(last=False)
+    return model
+
+
+def model_delay_draws(
+    rng: np.random.Generator,
+    n: int,
+    model: dict,
+    crisis_multiplier: float = 1.0,
+    backend: str = "numpy",
+) -> np.ndarray:
+    """Runner kernel: n delays from a fitted model, scaled by the crisis multiplier."""
+    if backend != "numpy" and resolve_backend(backend) == "numba":
+        return _jit_model_delay_draws(rng, n, model, crisis_multiplier)
+
+    kind = model["kind"]
+
+    if kind == "normal":
+        return delay_draws(rng, n, model["mean"], model["std"], crisis_multiplier)
+
+    if kind == "empirical":
+        pool = model["values"]
+        out = pool[rng.integers(0, len(pool), size=n)]
+    elif kind == "zi_lognormal":
+        out = rng.lognormal(model["mu"], model["sigma"], size=n)
+    elif kind == "zi_gamma":
+        out = rng.gamma(model["shape"], model["scale"], size=n)
+    elif kind == "kde":
+        pool = model["log_values"]
+        out = pool[rng.integers(0, len(pool), size=n)]
+        out += model["bandwidth"] * rng.standard_normal(n)
+        np.exp(out, out=out)
+    else:
+        raise ValueError(f"Unknown delay model '{kind}'.")
+
+    if kind != "empirical":
+        out[rng.random(n) < model["p_zero"]] = 0.0
+    out *= crisis_multiplier
+    return out
+
+
+# ============================================================
+# Variance reduction & quasi-Monte Carlo
+# ============================================================
+VARIANCE_REDUCTION_MODES = {
+    "plain": "Plain Monte Carlo",
+    "antithetic": "Antithetic variates",
+    "sobol": "Scrambled Sobol (QMC)",
+    "importance": "Importance sampling (tail)",
+}
+
+DEFAULT_REPLICATES = 16
+
+# Share of importance-sampling draws aimed at the tail region (rest stay uniform)
+_IS_TAIL_SHARE = 0.9
+
+# Keeps inverse CDFs finite when antithetic/QMC points land on 0 or 1
+_U_EPS = 1e-12
+
+
+def delay_from_uniforms(model: dict, U: np.ndarray) -> np.ndarray:
+    """
+    Inverse-CDF transform of uniforms into (unscaled) delays.
+    U has shape (n, 2); column 0 drives the delay level (monotone), column 1
+    is only used for the KDE kernel noise.
+    """
+    from scipy import special
+
+    kind = model["kind"]
+    u = np.clip(U[:, 0], _U_EPS, 1.0 - _U_EPS)
+
+    if kind == "normal":
+        return np.clip(model["mean"] + model["std"] * special.ndtri(u), 0, None)
+
+    if kind == "empirical":
+        pool = model["values"]
+        return pool[np.minimum((u * len(pool)).astype(np.int64), len(pool) - 1)]
+
+    p_zero = model["p_zero"]
+    v = np.clip((u - p_zero) / (1.0 - p_zero), _U_EPS, 1.0 - _U_EPS)
+
+    if kind == "zi_lognormal":
+        out = np.exp(model["mu"] + model["sigma"] * special.ndtri(v))
+    elif kind == "zi_gamma":
+        out = model["scale"] * special.gammaincinv(model["shape"], v)
+    elif kind == "kde":
+        pool = model["log_values"]
+        idx = np.minimum((v * len(pool)).astype(np.int64), len(pool) - 1)
+        noise = special.ndtri(np.clip(U[:, 1], _U_EPS, 1.0 - _U_EPS))
+        out = np.exp(pool[idx] + model["bandwidth"] * noise)
+    else:
+        raise ValueError(f"Unknown delay model '{kind}'.")
+
+    out[u < p_zero] = 0.0
+    return out
+
+
+def delay_cdf(model: dict, x: float) -> float:
+    """P(delay <= x) under the (unscaled) model; approximate for KDE."""
+    from scipy import special
+
+    if x < 0:
+        return 0.0
+
+    kind = model["kind"]
+    if kind == "normal":
+        return float(special.ndtr((x - model["mean"]) / model["std"]))
+    if kind == "empirical":
+        pool = model["values"]
+        return float(np.searchsorted(pool, x, side="right") / len(pool))
+
+    p_zero = model["p_zero"]
+    if x == 0:
+        return p_zero
+    if kind == "zi_lognormal":
+        pos = special.ndtr((np.log(x) - model["mu"]) / model["sigma"])
+    elif kind == "zi_gamma":
+        pos = special.gammainc(model["shape"], x / model["scale"])
+    elif kind == "kde":
+        pool = model["log_values"]
+        pos = np.searchsorted(pool, np.log(x), side="right") / len(pool)
+    else:
+        raise ValueError(f"Unknown delay model '{kind}'.")
+    return float(p_zero + (1.0 - p_zero) * pos)
+
+
+def _replicate_uniforms(
+    mode: str,
+    rng: np.random.Generator,
+    m: int,
+    tail_start: float,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """One replicate of m uniform points in [0, 1)^2 plus likelihood-ratio weights (IS only)."""
+    if mode == "plain":
+        return rng.random((m, 2)), None
+
+    if mode == "antithetic":
+        half = rng.random((m // 2, 2))
+        return np.concatenate([half, 1.0 - half]), None
+
+    if mode == "sobol":
+        from scipy.stats import qmc
+
+        return qmc.Sobol(d=2, scramble=True, seed=rng).random(m), None
+
+    if mode == "importance":
+        # Defensive mixture on column 0: q(u) = (1 - a) + a * 1{u >= tail_start} / (1 - tail_start)
+        U = rng.random((m, 2))
+        in_tail = rng.random(m) < _IS_TAIL_SHARE
+        U[in_tail, 0] = tail_start + (1.0 - tail_start) * U[in_tail, 0]
+        q = (1.0 - _IS_TAIL_SHARE) + _IS_TAIL_SHARE * (U[:, 0] >= tail_start) / (1.0 - tail_start)
+        return U, 1.0 / q
+
+    raise ValueError(f"Unknown variance reduction mode '{mode}'. Expected one of: {', '.join(VARIANCE_REDUCTION_MODES)}.")
+
+
+def _weighted_percentiles(x: np.ndarray, w: np.ndarray | None, qs: list[float]) -> np.ndarray:
+    if w is None:
+        return np.percentile(x, qs)
+    order = np.argsort(x)
+    cw = np.cumsum(w[order])
+    cw /= cw[-1]
+    idx = np.searchsorted(cw, np.asarray(qs) / 100.0)
+    return x[order][np.minimum(idx, len(x) - 1)]
+
+
+def _point_kpis(x: np.ndarray, w: np.ndarray | None, threshold: float) -> dict:
+    wx = x if w is None else w * x
+    exceed = (x > threshold) if w is None else w * (x > threshold)
+    p95, p99 = _weighted_percentiles(x, w, [95, 99])
+    return {
+        "expected": float(np.mean(wx)),
+        "p_over": float(np.mean(exceed) * 100.0),
+        "p95": float(p95),
+        "p99": float(p99),
+        "worst": float(np.max(x)),
+    }
+
+
+def replicate_kpis(
+    delays: np.ndarray,
+    threshold: float,
+    replicates: int = DEFAULT_REPLICATES,
+    weights: np.ndarray | None = None,
+) -> tuple[dict, dict]:
+    """
+    Point KPIs over all draws plus batch-means standard errors.
+
+    Draws are split into `replicates` contiguous, independent groups;
+    each KPI's SE is std(group estimates) / sqrt(replicates). This works
+    the same for plain, antithetic (pairs kept within a group), randomised
+    QMC (one scramble per group) and importance-sampled draws.
+    """
+    kpis = _point_kpis(delays, weights, threshold)
+
+    groups = np.array_split(np.arange(len(delays)), max(2, int(replicates)))
+    per_group = [
+        _point_kpis(delays[g], None if weights is None else weights[g], threshold) for g in groups if len(g)
+    ]
+    se = {}
+    for key in ("expected", "p_over", "p95", "p99"):
+        vals = np.array([k[key] for k in per_group])
+        se[key] = float(vals.std(ddof=1) / np.sqrt(len(vals))) if len(vals) > 1 else float("nan")
+    se["worst"] = None
+    return kpis, se
+
+
+def estimate_delay_risk(
+    model: dict,
+    n: int,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    mode: str = "plain",
+    seed: int | None = None,
+    replicates: int = DEFAULT_REPLICATES,
+) -> dict:
+    """
+    Delay-risk KPIs with standard errors under a variance-reduction mode.
+
+    Returns {"mode", "draws", "kpis", "se", "delays", "weights"}; weights are
+    the importance-sampling likelihood ratios (None for other modes) and
+    should be used when histogramming the delays. Sobol replicates are
+    rounded up to a power of two, so "draws" may exceed n.
+    """
+    replicates = max(2, int(replicates))
+    m = max(2, -(-int(n) // replicates))
+    if mode == "antithetic":
+        m += m % 2
+    elif mode == "sobol":
+        m = 1 << int(np.ceil(np.log2(m)))
+
+    tail_start = 0.0
+    if mode == "importance":
+        u_t = delay_cdf(model, threshold / crisis_multiplier)
+        tail_start = min(max(0.0, u_t - 0.5 * (1.0 - u_t)), 1.0 - 1e-9)
+
+    parts, weights = [], []
+    for ss in np.random.SeedSequence(seed).spawn(replicates):
+        U, w = _replicate_uniforms(mode, np.random.default_rng(ss), m, tail_start)
+        parts.append(delay_from_uniforms(model, U))
+        weights.append(w)
+
+    delays = np.concatenate(parts)
+    delays *= crisis_multiplier
+    w_all = None if mode != "importance" else np.concatenate(weights)
+
+    kpis, se = replicate_kpis(delays, threshold, replicates=replicates, weights=w_all)
+    return {"mode": mode, "draws": int(len(delays)), "kpis": kpis, "se": se, "delays": delays, "weights": w_all}
+
+
+def compare_variance_reduction(
+    model: dict,
+    n: int,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    seed: int | None = None,
+    replicates: int = DEFAULT_REPLICATES,
+) -> pd.DataFrame:
+    """
+    Run every mode at the same budget. "Draw savings ×" is the variance ratio
+    (SE_plain / SE_mode)^2 for P(Delay > threshold), i.e. how many times more
+    plain draws would be needed for the same precision.
+    """
+    rows = []
+    base_se = None
+    for mode, label in VARIANCE_REDUCTION_MODES.items():
+        t0 = time.perf_counter()
+        res = estimate_delay_risk(model, n, threshold, crisis_multiplier, mode=mode, seed=seed, replicates=replicates)
+        seconds = time.perf_counter() - t0
+        se = res["se"]
+        if mode == "plain":
+            base_se = se["p_over"]
+        rows.append(
+            {
+                "Mode": label,
+                "Draws": res["draws"],
+                "P(>threshold) %": res["kpis"]["p_over"],
+                "SE P(>threshold)": se["p_over"],
+                "Expected": res["kpis"]["expected"],
+                "SE Expected": se["expected"],
+                "SE P95": se["p95"],
+                "SE P99": se["p99"],
+                "Draw savings ×": (base_se / se["p_over"]) ** 2 if base_se and se["p_over"] > 0 else float("nan"),
+                "Time (ms)": seconds * 1000.0,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def benchmark_delay_models(
+    values,
+    n: int = 1_000_000,
+    seed: int | None = 0,
+    kinds: tuple[str, ...] = tuple(DELAY_MODELS),
+) -> pd.DataFrame:
+    """Fit each model and time n draws; reports throughput alongside tail KPIs."""
+    values = np.asarray(values, dtype=np.float64)
+    rows = []
+    for kind in kinds:
+        model = fit_delay_model(kind, values)
+        t0 = time.perf_counter()
+        draws = model_delay_draws(np.random.default_rng(seed), n, model)
+        seconds = time.perf_counter() - t0
+        p95, p99 = np.percentile(draws, [95, 99])
+        rows.append(
+            {
+                "Model": DELAY_MODELS[kind],
+                "Draws": n,
+                "Fit (ms)": model["fit_seconds"] * 1000.0,
+                "Sample (ms)": seconds * 1000.0,
+                "Draws/sec": n / seconds if seconds > 0 else float("inf"),
+                "Mean": float(draws.mean()),
+                "P95": float(p95),
+                "P99": float(p99),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+# ============================================================
+# Scenario sweep (crisis multiplier x threshold grid)
+# ============================================================
+SWEEP_KPIS = ("expected", "p_over", "p95", "p99", "worst")
+
+_SWEEP_CACHE: OrderedDict = OrderedDict()
+_SWEEP_CACHE_SIZE = 32
+
+
+def _count_scaled_exceedances(sorted_base: np.ndarray, multipliers: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    #{x : x * m > t} for every (m, t), via one broadcast searchsorted on t / m.
+    A one-step correction makes the count agree exactly with comparing the
+    scaled draws (t / m and x * m can round differently at ties).
+    """
+    n = len(sorted_base)
+    m = multipliers[:, None]
+    t = thresholds[None, :]
+    cut = np.searchsorted(sorted_base, t / m, side="right")
+
+    prev = sorted_base[np.maximum(cut - 1, 0)]
+    fix_down = (cut > 0) & (prev * m > t)
+    cut = np.where(fix_down, np.searchsorted(sorted_base, prev, side="left"), cut)
+
+    nxt = sorted_base[np.minimum(cut, n - 1)]
+    fix_up = (cut < n) & (nxt * m <= t)
+    cut = np.where(fix_up, np.searchsorted(sorted_base, nxt, side="right"), cut)
+    return n - cut
+
+
+def sweep_delay_scenarios(
+    model: dict,
+    n: int,
+    multipliers,
+    thresholds,
+    seed: int | None = None,
+    workers: int = 1,
+) -> dict:
+    """
+    Evaluate every (crisis multiplier, threshold) pair from one shared base draw.
+
+    Delays scale linearly with the multiplier, so a single unscaled draw
+    (common random numbers) serves the whole grid: exceedances come from a
+    broadcast searchsorted over the sorted draw, percentiles/mean/max scale
+    by m. Results match simulate-per-scenario with the same seed and are
+    cached by (dataset fingerprint, model, seed, n, grid).
+
+    Returns {"multipliers", "thresholds", "kpis", "tensor", "cached", "seconds"}
+    where tensor has shape (len(SWEEP_KPIS), len(multipliers), len(thresholds)).
+    """
+    multipliers = np.asarray(multipliers, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    key = (
+        model.get("fingerprint"),
+        model["kind"],
+        seed,
+        int(n),
+        tuple(multipliers.round(10)),
+        tuple(thresholds.round(10)),
+    )
+    if key[0] is not None and key in _SWEEP_CACHE:
+        _SWEEP_CACHE.move_to_end(key)
+        return {**_SWEEP_CACHE[key], "cached": True}
+
+    t0 = time.perf_counter()
+    base = run_monte_carlo(model_delay_draws, n, seed=seed, workers=workers, model=model, crisis_multiplier=1.0)
+    base.sort()
+
+    n_m, n_t = len(multipliers), len(thresholds)
+    p95, p99 = np.percentile(base, [95, 99])
+    per_m = {
+        "expected": float(base.mean()) * multipliers,
+        "p95": p95 * multipliers,
+        "p99": p99 * multipliers,
+        "worst": base[-1] * multipliers,
+    }
+
+    tensor = np.empty((len(SWEEP_KPIS), n_m, n_t), dtype=np.float64)
+    for i, kpi in enumerate(SWEEP_KPIS):
+        if kpi == "p_over":
+            tensor[i] = _count_scaled_exceedances(base, multipliers, thresholds) / len(base) * 100.0
+        else:
+            tensor[i] = np.broadcast_to(per_m[kpi][:, None], (n_m, n_t))
+
+    result = {
+        "multipliers": multipliers,
+        "thresholds": thresholds,
+        "kpis": SWEEP_KPIS,
+        "tensor": tensor,
+        "seconds": time.perf_counter() - t0,
+    }
+    if key[0] is not None:
+        _SWEEP_CACHE[key] = result
+        while len(_SWEEP_CACHE) > _SWEEP_CACHE_SIZE:
+            _SWEEP_CACHE.popitem(last=False)
+    return {**result, "cached": False}
+
+
+def sweep_lookup(sweep: dict, multiplier: float, threshold: float) -> dict:
+    """KPIs for one grid point of a sweep (nearest grid values)."""
+    i = int(np.abs(sweep["multipliers"] - multiplier).argmin())
+    j = int(np.abs(sweep["thresholds"] - threshold).argmin())
+    return {kpi: float(sweep["tensor"][k, i, j]) for k, kpi in enumerate(sweep["kpis"])}
+
+
+def sweep_frame(sweep: dict, kpi: str = "p_over") -> pd.DataFrame:
+    """One KPI slice as a (multiplier x threshold) DataFrame, ready for a heatmap."""
+    k = list(sweep["kpis"]).index(kpi)
+    out = pd.DataFrame(
+        sweep["tensor"][k],
+        index=pd.Index(np.round(sweep["multipliers"], 2), name="Crisis multiplier"),
+        columns=pd.Index(sweep["thresholds"], name="Threshold (min)"),
+    )
+    return out
+
+
+# ============================================================
+# Constant-memory streaming Monte Carlo
+# ============================================================
+DEFAULT_THRESHOLD_GRID = np.arange(0.0, 605.0, 5.0)
+DEFAULT_HIST_WIDTH = 5.0
+DEFAULT_HIST_UPPER = 600.0
+
+
+class RunningMoments:
+    """Count / mean / M2 / min / max with Chan's parallel merge."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def update(self, x: np.ndarray) -> None:
+        if len(x) == 0:
+            return
+        other = RunningMoments()
+        other.n = len(x)
+        other.mean = float(x.mean())
+        other.m2 = float(((x - other.mean) ** 2).sum())
+        other.min = float(x.min())
+        other.max = float(x.max())
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta**2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+
+class FixedHistogram:
+    """Fixed-width bins over [0, upper) plus an overflow bin; merge = add counts."""
+
+    def __init__(self, width: float = DEFAULT_HIST_WIDTH, upper: float = DEFAULT_HIST_UPPER):
+        self.width = float(width)
+        self.edges = np.arange(0.0, upper + width, width)
+        self.counts = np.zeros(len(self.edges), dtype=np.int64)
+
+    def update(self, x: np.ndarray) -> None:
+        idx = np.minimum((x / self.width).astype(np.int64), len(self.edges) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.edges))
+
+    def merge(self, other: "FixedHistogram") -> None:
+        self.counts += other.counts
+
+
+class ExceedanceCounter:
+    """Counts of draws strictly above each threshold in a fixed grid."""
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLD_GRID):
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.over = np.zeros(len(self.thresholds), dtype=np.int64)
+
+    def update(self, x: np.ndarray) -> None:
+        # searchsorted(..., "left") = number of thresholds strictly below each draw
+        below = np.bincount(np.searchsorted(self.thresholds, x, side="left"), minlength=len(self.thresholds) + 1)
+        self.over += np.cumsum(below[::-1])[::-1][1:]
+
+    def merge(self, other: "ExceedanceCounter") -> None:
+        self.over += other.over
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch-style log buckets).
+
+    Positive values go to bucket ceil(log_gamma(x)) with gamma = (1 + a) / (1 - a),
+    so every reported quantile is within relative error `a`. Buckets are a
+    dense array over [min_value, max_value] (values outside are clamped) and
+    zeros are counted separately; merge = add counts.
+    """
+
+    def __init__(self, rel_accuracy: float = 0.005, min_value: float = 1e-3, max_value: float = 1e6):
+        self.gamma = (1.0 + rel_accuracy) / (1.0 - rel_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self._offset = int(np.ceil(np.log(min_value) / self._log_gamma))
+        n_buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.counts = np.zeros(n_buckets, dtype=np.int64)
+        self.zeros = 0
+
+    def update(self, x: np.ndarray) -> None:
+        pos = x[x > 0]
+        self.zeros += int(len(x) - len(pos))
+        idx = np.ceil(np.log(pos) / self._log_gamma).astype(np.int64) - self._offset
+        np.clip(idx, 0, len(self.counts) - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.counts += other.counts
+        self.zeros += other.zeros
+
+    def quantile(self, q: float) -> float:
+        total = self.zeros + int(self.counts.sum())
+        if total == 0:
+            return float("nan")
+        rank = q * (total - 1)
+        if rank < self.zeros:
+            return 0.0
+        j = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        j = min(j, len(self.counts) - 1)
+        # Bucket midpoint (in relative terms) of (gamma^(k-1), gamma^k]
+        return float(2.0 * self.gamma ** (j + self._offset) / (self.gamma + 1.0))
+
+
+_KPI_KEYS = ("expected", "p_over", "p95", "p99", "worst")
+
+
+class DelayStreamAccumulator:
+    """All streaming delay statistics in one mergeable object (a few hundred KB)."""
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLD_GRID):
+        self.moments = RunningMoments()
+        self.histogram = FixedHistogram()
+        self.exceedance = ExceedanceCounter(thresholds)
+        self.sketch = QuantileSketch()
+
+    def update(self, x: np.ndarray) -> None:
+        self.moments.update(x)
+        self.histogram.update(x)
+        self.exceedance.update(x)
+        self.sketch.update(x)
+
+    def merge(self, other: "DelayStreamAccumulator") -> None:
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.exceedance.merge(other.exceedance)
+        self.sketch.merge(other.sketch)
+
+    def p_over(self, threshold: float) -> float | None:
+        """P(delay > threshold), or None before any draws; exact on the threshold grid, interpolated between grid points or from the sketch beyond it."""
+        n = self.moments.n
+        if n == 0:
+            return None
+        grid = self.exceedance.thresholds
+        if grid[0] <= threshold <= grid[-1]:
+            return float(np.interp(threshold, grid, self.exceedance.over) / n)
+        qs = np.linspace(0.0, 1.0, 2001)
+        values = np.array([self.sketch.quantile(q) for q in qs])
+        return float(1.0 - np.interp(threshold, values, qs))
+
+    def kpis(self, threshold: float) -> tuple[dict, dict]:
+        """Same KPI keys as delay_risk_kpis, plus asymptotic standard errors (all None before any draws)."""
+        n = self.moments.n
+        if n == 0:
+            return dict.fromkeys(_KPI_KEYS), dict.fromkeys(_KPI_KEYS)
+        p = self.p_over(threshold)
+        kpis = {
+            "expected": self.moments.mean,
+            "p_over": p * 100.0,
+            "p95": self.sketch.quantile(0.95),
+            "p99": self.sketch.quantile(0.99),
+            "worst": self.moments.max,
+        }
+
+        se = {
+            "expected": float(self.moments.std / np.sqrt(n)),
+            "p_over": float(np.sqrt(p * (1.0 - p) / n) * 100.0),
+            "worst": None,
+        }
+        # Quantile SE: sqrt(q(1-q)/n) / f(x_q), density from the fixed histogram
+        for key, q in (("p95", 0.95), ("p99", 0.99)):
+            b = min(int(kpis[key] / self.histogram.width), len(self.histogram.counts) - 2)
+            density = self.histogram.counts[b] / (n * self.histogram.width)
+            se[key] = float(np.sqrt(q * (1.0 - q) / n) / density) if density > 0 else float("nan")
+        return kpis, se
+
+    def histogram_frame(self) -> pd.DataFrame:
+        """5-minute histogram in the same shape as Module 3's _delay_histogram_df."""
+        upper = max(180.0, self.sketch.quantile(0.99) + 30.0)
+        keep = self.histogram.edges[:-1] < upper
+        return pd.DataFrame(
+            {"Delay (min)": self.histogram.edges[:-1][keep], "Count": self.histogram.counts[:-1][keep]}
+        ).set_index("Delay (min)")
+
+
+def _fold_blocks(kernel: Callable, seeds: list, sizes: list[int], params: dict, thresholds) -> DelayStreamAccumulator:
+    acc = DelayStreamAccumulator(thresholds)
+    for ss, size in zip(seeds, sizes):
+        acc.update(kernel(np.random.default_rng(ss), size, **params))
+    return acc
+
+
+def stream_monte_carlo(
+    kernel: Callable,
+    n: int,
+    seed: int | None = None,
+    workers: int = 1,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    thresholds=DEFAULT_THRESHOLD_GRID,
+    **params,
+) -> DelayStreamAccumulator:
+    """
+    Constant-memory counterpart of run_monte_carlo.
+
+    Uses the same block seeding, but each block is folded into a
+    DelayStreamAccumulator and discarded, so 100M draws need only one
+    block of memory per worker. Counts (histogram, exceedances, sketch)
+    match a materialised run with the same seed exactly.
+    """
+    sizes = _block_sizes(int(n), block_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = max(1, min(int(workers), len(sizes) or 1))
+    if workers == 1:
+        return _fold_blocks(kernel, seeds, sizes, params, thresholds)
+
+    bounds = np.linspace(0, len(sizes), workers + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_fold_blocks, kernel, seeds[a:b], sizes[a:b], params, thresholds)
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+        acc = futures[0].result()
+        for f in futures[1:]:
+            acc.merge(f.result())
+    return acc
+
+
+# ============================================================
+# Exceedance curve (sorted-draw index, O(log n) queries)
+# ============================================================
+# Each curve holds its sorted draws (8 bytes per draw, more with weights),
+# so the cache is bounded by bytes rather than entry count.
+_CURVE_CACHE: OrderedDict = OrderedDict()
+_CURVE_CACHE_BYTES = 64 * 1024**2
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation written the way np.percentile does it (bit-identical results)."""
+    diff = b - a
+    out = np.asarray(a + diff * t)
+    np.subtract(b, diff * (1.0 - t), out=out, where=np.asarray(t) >= 0.5)
+    return out
+
+
+class ExceedanceCurve:
+    """
+    Sorted support points with cumulative weights: one sort up front, then
+    P(X > x), percentiles and whole exceedance curves are searchsorted
+    lookups (O(log n) per query) instead of full passes over the draws.
+
+    For unweighted draws the point KPIs equal replicate_kpis exactly;
+    importance-sampling weights follow _point_kpis' estimators.
+    """
+
+    def __init__(self, values: np.ndarray, cum: np.ndarray | None, cum_sq: np.ndarray | None, n: int, mean: float, std: float):
+        self.values = values
+        self.n = int(n)
+        self.mean = float(mean)
+        self.std = float(std)
+        self.worst = float(values[-1]) if len(values) else float("nan")
+        self.build_seconds = 0.0
+        # None = one unit of weight per value (the cumulative count is the index itself)
+        self._cum = cum
+        self._cum_sq = cum_sq
+
+    @classmethod
+    def from_draws(cls, draws: np.ndarray, weights: np.ndarray | None = None) -> "ExceedanceCurve":
+        t0 = time.perf_counter()
+        draws = np.asarray(draws, dtype=np.float64)
+        if weights is None:
+            curve = cls(np.sort(draws), None, None, len(draws), np.mean(draws), np.std(draws, ddof=1))
+        else:
+            order = np.argsort(draws)
+            w = np.asarray(weights, dtype=np.float64)[order]
+            wx = w * draws[order]
+            curve = cls(draws[order], np.cumsum(w), np.cumsum(w * w), len(draws), np.mean(wx), np.std(wx, ddof=1))
+        curve.build_seconds = time.perf_counter() - t0
+        return curve
+
+    @classmethod
+    def from_accumulator(cls, acc: DelayStreamAccumulator) -> "ExceedanceCurve":
+        """Step curve on the accumulator's exceedance grid (its cumulative histogram); no draws needed."""
+        n = acc.moments.n
+        # A final +inf knot carries the draws above the last grid threshold
+        knots = np.append(acc.exceedance.thresholds, np.inf)
+        at_or_below = np.append(n - acc.exceedance.over, n).astype(np.float64)
+        curve = cls(knots, at_or_below, at_or_below, n, acc.moments.mean, acc.moments.std)
+        curve.worst = acc.moments.max
+        return curve
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.values, self._cum, self._cum_sq) if a is not None)
+
+    def _weight_at_or_below(self, x, cum: np.ndarray | None) -> np.ndarray:
+        idx = np.searchsorted(self.values, x, side="right")
+        if cum is None:
+            return idx
+        return np.where(idx > 0, cum[np.maximum(idx - 1, 0)], 0.0)
+
+    def _total(self, cum: np.ndarray | None) -> float:
+        return len(self.values) if cum is None else float(cum[-1])
+
+    def p_over(self, x):
+        """P(X > x) for a scalar or array of thresholds."""
+        over = self._total(self._cum) - self._weight_at_or_below(x, self._cum)
+        p = np.asarray(over) / self.n
+        return float(p) if p.ndim == 0 else p
+
+    def quantile(self, q):
+        """q-th quantile (0..1), scalar or array: np.percentile's linear rule, or the weighted step rule."""
+        q = np.asarray(q, dtype=np.float64)
+        m = len(self.values)
+        if self._cum is None:
+            pos = m * q + (1.0 - q) - 1.0
+            lo = np.clip(np.floor(pos), 0, m - 1).astype(np.int64)
+            hi = np.minimum(lo + 1, m - 1)
+            out = _lerp(self.values[lo], self.values[hi], pos - np.floor(pos))
+        else:
+            idx = np.searchsorted(self._cum / self._cum[-1], q)
+            out = self.values[np.minimum(idx, m - 1)]
+        return float(out) if out.ndim == 0 else out
+
+    def kpis(self, threshold: float) -> tuple[dict, dict]:
+        """Same KPI keys as replicate_kpis, with asymptotic standard errors instead of batch means (None without draws)."""
+        if self.n == 0:
+            return dict.fromkeys(_KPI_KEYS), dict.fromkeys(_KPI_KEYS)
+        p = self.p_over(threshold)
+        p95, p99 = self.quantile([0.95, 0.99])
+        kpis = {"expected": self.mean, "p_over": p * 100.0, "p95": float(p95), "p99": float(p99), "worst": self.worst}
+
+        # E[(w 1{X > t})^2] reduces to p when unweighted
+        sq = (self._total(self._cum_sq) - self._weight_at_or_below(threshold, self._cum_sq)) / self.n
+        se = {
+            "expected": float(self.std / np.sqrt(self.n)),
+            "p_over": float(np.sqrt(max(sq - p * p, 0.0) / self.n) * 100.0),
+            "worst": None,
+        }
+        # Quantile SE: sqrt(q(1-q)/n) / f(x_q), density from the spread of neighbouring quantiles
+        for key, q in (("p95", 0.95), ("p99", 0.99)):
+            lo, hi = self.quantile([q - 0.005, min(q + 0.005, 1.0)])
+            density = (min(q + 0.005, 1.0) - (q - 0.005)) / (hi - lo) if hi > lo else 0.0
+            se[key] = float(np.sqrt(q * (1.0 - q) / self.n) / density) if density > 0 else float("nan")
+        return kpis, se
+
+    def curve(self, xs=None, points: int = 241) -> pd.DataFrame:
+        """P(X > x) in percent over `xs` (default: 0 .. max(180, P99.9)) for a line chart."""
+        if xs is None:
+            upper = min(float(self.quantile(0.999)), float(self.values[np.isfinite(self.values)][-1]))
+            xs = np.linspace(0.0, max(180.0, upper), points)
+        xs = np.asarray(xs, dtype=np.float64)
+        return pd.DataFrame({"Delay (min)": xs, "P(Delay > x) %": self.p_over(xs) * 100.0}).set_index("Delay (min)")
+
+
+def delay_exceedance_curve(
+    model: dict,
+    n: int,
+    crisis_multiplier: float = 1.0,
+    seed: int | None = None,
+    workers: int = 1,
+    backend: str = "numpy",
+) -> ExceedanceCurve:
+    """
+    Simulate once and index the draws; cached by (dataset fingerprint,
+    model, n, crisis multiplier, seed) within _CURVE_CACHE_BYTES, so
+    changing only the threshold never resimulates. Draws match
+    run_monte_carlo with model_delay_draws.
+    """
+    key = (model.get("fingerprint"), model["kind"], int(n), float(crisis_multiplier), seed, resolve_backend(backend))
+    if key[0] is not None and seed is not None and key in _CURVE_CACHE:
+        _CURVE_CACHE.move_to_end(key)
+        return _CURVE_CACHE[key]
+
+    t0 = time.perf_counter()
+    draws = run_monte_carlo(
+        model_delay_draws,
+        n,
+        seed=seed,
+        workers=workers,
+        model=model,
+        crisis_multiplier=crisis_multiplier,
+        backend=backend,
+    )
+    curve = ExceedanceCurve.from_draws(draws)
+    curve.build_seconds = time.perf_counter() - t0
+
+    if key[0] is not None and seed is not None and curve.nbytes <= _CURVE_CACHE_BYTES:
+        _CURVE_CACHE[key] = curve
+        while sum(c.nbytes for c in _CURVE_CACHE.values()) > _CURVE_CACHE_BYTES:
+            _CURVE_CACHE.popitem(last=False)
+    return curve
+
+
+# ============================================================
+# Stratified Monte Carlo (distance bucket x cabin class)
+# ============================================================
+STRATA_ALLOCATIONS = {
+    "neyman": "Neyman (weight x std of P(Delay > threshold))",
+    "proportional": "Proportional (weight only)",
+}
+
+DEFAULT_DISTANCE_BUCKETS = 4
+DEFAULT_MIN_STRATUM_DRAWS = 1_000
+
+_STACKED_PARAMS = ("mean", "std", "mu", "sigma", "shape", "scale", "bandwidth", "p_zero")
+
+
+def _distance_bucket_labels(distances: pd.Series, buckets: int) -> pd.Series:
+    binned = pd.qcut(distances, q=buckets, duplicates="drop")
+    labels = {iv: f"{iv.left:,.0f}–{iv.right:,.0f}" for iv in binned.cat.categories}
+    return binned.map(labels).astype(str)
+
+
+def _stack_strata_models(models: list[dict]) -> dict:
+    """Per-stratum parameters as arrays (pools concatenated with offsets) so one kernel call draws every stratum."""
+    kind = models[0]["kind"]
+    stacked = {"kind": kind}
+    pool_key = {"empirical": "values", "kde": "log_values"}.get(kind)
+    if pool_key:
+        lengths = np.array([len(m[pool_key]) for m in models], dtype=np.int64)
+        stacked["pool"] = np.concatenate([m[pool_key] for m in models])
+        stacked["offset"] = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        stacked["length"] = lengths
+    for param in _STACKED_PARAMS:
+        if param in models[0]:
+            stacked[param] = np.array([m[param] for m in models], dtype=np.float64)
+    return stacked
+
+
+def fit_delay_strata(
+    delays,
+    distances=None,
+    classes=None,
+    kind: str = "empirical",
+    distance_buckets: int = DEFAULT_DISTANCE_BUCKETS,
+) -> dict:
+    """
+    Fit one delay model per (distance quantile bucket, class) stratum.
+
+    Strata too thin for a parametric fit borrow the pooled model's
+    parameters. Missing distances or classes collapse that dimension to
+    a single "All" level. Returns {"kind", "table", "models", "stacked"}
+    where table holds each stratum's flight count and population weight.
+    """
+    # inputs are joined by position: callers may pass Series with gappy (dropna'd) indexes
+    frame = pd.DataFrame({"delay": pd.to_numeric(pd.Series(delays), errors="coerce").to_numpy()})
+    if distances is not None:
+        dist = pd.to_numeric(pd.Series(distances), errors="coerce").reset_index(drop=True)
+        frame["distance"] = _distance_bucket_labels(dist, distance_buckets).to_numpy() if dist.nunique() > 1 else "All"
+    else:
+        frame["distance"] = "All"
+    frame["class"] = pd.Series(classes).astype(str).str.strip().to_numpy() if classes is not None else "All"
+    frame = frame.dropna(subset=["delay"])
+    frame = frame[frame["distance"] != "nan"]
+    if frame.empty:
+        raise ValueError("No numeric delays to stratify.")
+
+    pooled = fit_delay_model(kind, frame["delay"].to_numpy())
+
+    rows, models = [], []
+    for (bucket, cls), group in frame.groupby(["distance", "class"], sort=True):
+        try:
+            model = fit_delay_model(kind, group["delay"].to_numpy())
+            borrowed = False
+        except ValueError:
+            model, borrowed = pooled, True
+        models.append(model)
+        rows.append({"Distance": bucket, "Class": cls, "Flights": len(group), "Pooled fit": borrowed})
+
+    table = pd.DataFrame(rows)
+    table["Weight"] = table["Flights"] / table["Flights"].sum()
+    # qcut labels sort as strings; order buckets by their lower edge instead
+    lower = table["Distance"].str.split("–").str[0].str.replace(",", "")
+    order = np.lexsort((table["Class"].to_numpy(), pd.to_numeric(lower, errors="coerce").fillna(0).to_numpy()))
+    table = table.iloc[order].reset_index(drop=True)
+    models = [models[i] for i in order]
+
+    return {"kind": kind, "table": table, "models": models, "stacked": _stack_strata_models(models)}
+
+
+def stratified_delay_draws(
+    rng: np.random.Generator,
+    counts: np.ndarray,
+    stacked: dict,
+    crisis_multiplier: float = 1.0,
+) -> np.ndarray:
+    """
+    counts[h] delays from stratum h, all strata in one vectorised pass.
+    Output is grouped by stratum (stratum 0's draws first).
+    """
+    s = np.repeat(np.arange(len(counts)), counts)
+    n = len(s)
+    kind = stacked["kind"]
+
+    if kind == "normal":
+        out = stacked["mean"][s] + stacked["std"][s] * rng.standard_normal(n)
+        np.clip(out, 0, None, out=out)
+    elif kind in ("empirical", "kde"):
+        idx = stacked["offset"][s] + (rng.random(n) * stacked["length"][s]).astype(np.int64)
+        out = stacked["pool"][idx]
+        if kind == "kde":
+            out += stacked["bandwidth"][s] * rng.standard_normal(n)
+            np.exp(out, out=out)
+    elif kind == "zi_lognormal":
+        out = np.exp(stacked["mu"][s] + stacked["sigma"][s] * rng.standard_normal(n))
+    elif kind == "zi_gamma":
+        out = rng.gamma(stacked["shape"][s], stacked["scale"][s])
+    else:
+        raise ValueError(f"Unknown delay model '{kind}'.")
+
+    if kind not in ("normal", "empirical"):
+        out[rng.random(n) < stacked["p_zero"][s]] = 0.0
+    out *= crisis_multiplier
+    return out
+
+
+def _allocate_draws(n: int, scores: np.ndarray, min_draws: int) -> np.ndarray:
+    """Split n draws proportionally to scores (largest remainder), with a per-stratum floor."""
+    k = len(scores)
+    floor = min(int(min_draws), n // (2 * k))
+    if scores.sum() <= 0:
+        scores = np.ones(k)
+    share = (n - floor * k) * scores / scores.sum()
+    counts = np.floor(share).astype(np.int64)
+    counts[np.argsort(counts - share)[: n - floor * k - counts.sum()]] += 1
+    return counts + floor
+
+
+def simulate_stratified_delay_risk(
+    strata: dict,
+    n: int,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    allocation: str = "neyman",
+    seed: int | None = None,
+    min_draws: int = DEFAULT_MIN_STRATUM_DRAWS,
+) -> dict:
+    """
+    Stratified delay-risk KPIs from fit_delay_strata.
+
+    Neyman allocation gives stratum h draws in proportion to W_h * S_h with
+    S_h = sqrt(p_h (1 - p_h)), p_h = the model's P(Delay > threshold), so
+    draws go where the headline KPI is most uncertain. Aggregates are the
+    W_h-weighted stratum estimates; "draw_savings" is plain-MC variance of
+    P(Delay > threshold) over the stratified variance at the same budget.
+
+    Returns {"kpis", "se", "per_stratum", "allocation", "draws", "draw_savings", "seconds", "delays", "weights"}.
+    """
+    if allocation not in STRATA_ALLOCATIONS:
+        raise ValueError(f"Unknown allocation '{allocation}'. Expected one of: {', '.join(STRATA_ALLOCATIONS)}.")
+
+    t0 = time.perf_counter()
+    table = strata["table"]
+    W = table["Weight"].to_numpy(dtype=np.float64)
+    if allocation == "neyman":
+        p_model = np.array([1.0 - delay_cdf(m, threshold / crisis_multiplier) for m in strata["models"]])
+        scores = W * np.sqrt(np.clip(p_model * (1.0 - p_model), 0.0, None))
+    else:
+        scores = W
+    counts = _allocate_draws(int(n), scores, min_draws)
+
+    delays = stratified_delay_draws(np.random.default_rng(seed), counts, strata["stacked"], crisis_multiplier)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    per = []
+    for h in range(len(counts)):
+        x = delays[bounds[h] : bounds[h + 1]]
+        p = float(np.mean(x > threshold)) if len(x) else 0.0
+        per.append(
+            {
+                "Draws": int(len(x)),
+                "Expected": float(x.mean()) if len(x) else float("nan"),
+                "Var": float(x.var(ddof=1)) if len(x) > 1 else 0.0,
+                "P(>threshold) %": p * 100.0,
+                "SE P(>threshold)": float(np.sqrt(p * (1.0 - p) / max(len(x), 1)) * 100.0),
+                "P95": float(np.percentile(x, 95)) if len(x) else float("nan"),
+            }
+        )
+    per = pd.concat([table, pd.DataFrame(per)], axis=1)
+
+    p_h = per["P(>threshold) %"].to_numpy() / 100.0
+    n_h = np.maximum(counts, 1)
+    var_p = float(np.sum(W**2 * p_h * (1.0 - p_h) / n_h))
+    var_mean = float(np.sum(W**2 * per["Var"].to_numpy() / n_h))
+
+    # Per-draw weights W_h * n / n_h make the pooled draws an unbiased sample of the mixture
+    weights = np.repeat(W * len(delays) / n_h, counts)
+    kpis, se = ExceedanceCurve.from_draws(delays, weights).kpis(threshold)
+    p = float(np.sum(W * p_h))
+    kpis["expected"] = float(np.sum(W * per["Expected"].to_numpy()))
+    kpis["p_over"] = p * 100.0
+    se["expected"] = float(np.sqrt(var_mean))
+    se["p_over"] = float(np.sqrt(var_p) * 100.0)
+
+    return {
+        "kpis": kpis,
+        "se": se,
+        "per_stratum": per.drop(columns="Var"),
+        "allocation": allocation,
+        "draws": int(len(delays)),
+        "draw_savings": (p * (1.0 - p) / len(delays)) / var_p if var_p > 0 else float("nan"),
+        "seconds": time.perf_counter() - t0,
+        "delays": delays,
+        "weights": weights,
+    }
+
+
+# ============================================================
+# Adaptive-precision Monte Carlo
+# ============================================================
+ADAPTIVE_KPIS = ("expected", "p_over", "p95", "p99")
+
+# Absolute half-width that always counts as converged (minutes; p_over in pp),
+# so near-zero estimates don't demand impossible relative precision.
+DEFAULT_ABS_TOL = {"expected": 0.01, "p_over": 0.001, "p95": 0.05, "p99": 0.1}
+
+_ADAPTIVE_CACHE: OrderedDict = OrderedDict()
+_ADAPTIVE_CACHE_SIZE = 32
+
+
+def adaptive_delay_risk(
+    model: dict,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    rel_tol: float = 0.01,
+    time_budget_s: float = 5.0,
+    seed: int | None = None,
+    batch_size: int = DEFAULT_BLOCK_SIZE,
+    min_batches: int = 4,
+    max_draws: int = 200_000_000,
+    confidence: float = 0.95,
+    abs_tol: dict | None = None,
+) -> dict:
+    """
+    Draw in batches until every KPI's confidence half-width is within tolerance.
+
+    A KPI has converged when its half-width (z * SE from the streaming
+    accumulator) is <= rel_tol * |estimate| or <= its absolute floor. The
+    run stops when all KPIs converge, the time budget is spent, or
+    max_draws is reached. Batch k uses SeedSequence(seed) child k, so the
+    draws match run_monte_carlo(block_size=batch_size) with the same seed.
+
+    Runs with a dataset fingerprint and a seed are cached by (fingerprint,
+    model, threshold, multiplier, tolerances, budget, seed), so a rerun with
+    the same settings does not spend the time budget again.
+
+    Returns {"kpis", "se", "half_width", "draws", "batches", "seconds",
+    "converged", "stop_reason", "trace", "cached"}; trace has one row per batch.
+    """
+    from scipy.special import ndtri
+
+    abs_tol = {**DEFAULT_ABS_TOL, **(abs_tol or {})}
+    key = (
+        model.get("fingerprint"),
+        model["kind"],
+        float(threshold),
+        float(crisis_multiplier),
+        float(rel_tol),
+        float(time_budget_s),
+        seed,
+        int(batch_size),
+        int(min_batches),
+        int(max_draws),
+        float(confidence),
+        tuple(sorted(abs_tol.items())),
+    )
+    cacheable = key[0] is not None and seed is not None
+    if cacheable and key in _ADAPTIVE_CACHE:
+        _ADAPTIVE_CACHE.move_to_end(key)
+        return {**_ADAPTIVE_CACHE[key], "cached": True}
+
+    z = float(ndtri(0.5 + confidence / 2.0))
+    root = np.random.SeedSequence(seed)
+    acc = DelayStreamAccumulator()
+
+    trace = []
+    stop_reason = "max draws"
+    t0 = time.perf_counter()
+    while acc.moments.n < max_draws:
+        size = int(min(batch_size, max_draws - acc.moments.n))
+        acc.update(model_delay_draws(np.random.default_rng(root.spawn(1)[0]), size, model, crisis_multiplier))
+
+        kpis, se = acc.kpis(threshold)
+        half = {k: z * se[k] for k in ADAPTIVE_KPIS}
+        done = {
+            k: bool(np.isfinite(half[k]) and (half[k] <= rel_tol * abs(kpis[k]) or half[k] <= abs_tol[k]))
+            for k in ADAPTIVE_KPIS
+        }
+        elapsed = time.perf_counter() - t0
+
+        row = {"Draws": acc.moments.n, "Elapsed (ms)": elapsed * 1000.0}
+        for k in ADAPTIVE_KPIS:
+            row[k] = kpis[k]
+            row[f"{k} ±"] = half[k]
+        trace.append(row)
+
+        if len(trace) >= min_batches and all(done.values()):
+            stop_reason = "tolerance"
+            break
+        if elapsed >= time_budget_s:
+            stop_reason = "time budget"
+            break
+
+    kpis, se = acc.kpis(threshold)
+    result = {
+        "kpis": kpis,
+        "se": se,
+        "half_width": {k: z * se[k] for k in ADAPTIVE_KPIS},
+        "draws": acc.moments.n,
+        "batches": len(trace),
+        "seconds": time.perf_counter() - t0,
+        "converged": stop_reason == "tolerance",
+        "stop_reason": stop_reason,
+        "trace": pd.DataFrame(trace),
+    }
+    if cacheable:
+        _ADAPTIVE_CACHE[key] = result
+        while len(_ADAPTIVE_CACHE) > _ADAPTIVE_CACHE_SIZE:
+            _ADAPTIVE_CACHE.popitem(last=False)
+    return {**result, "cached": False}
+
+
+# ============================================================
+# Delay propagation across aircraft rotations
+# ============================================================
+CRUISE_KM_PER_MIN = 13.3  # ~800 km/h
+BLOCK_OVERHEAD_MIN = 30.0  # taxi, climb and descent allowance per leg
+
+
+def build_rotations(
+    distances,
+    n_aircraft: int,
+    max_legs: int = 8,
+    duty_hours: float = 16.0,
+    min_turn: float = 35.0,
+    mean_buffer: float = 20.0,
+    seed: int | None = None,
+) -> dict:
+    """
+    Synthetic daily rotations (chains of legs) drawn from the dataset's distances.
+
+    Each aircraft gets up to max_legs bootstrap-sampled leg distances; legs
+    are kept while cumulative block + turnaround time fits in the duty
+    window (always at least one). The scheduled slack before each leg
+    (ground time beyond the minimum turn) is exponential with mean
+    `mean_buffer`; slack[:, 0] is 0. Returns arrays of shape
+    (n_aircraft, max_legs): "distance", "block", "slack", "valid", plus "legs".
+    """
+    rng = np.random.default_rng(seed)
+    distances = np.asarray(distances, dtype=np.float64)
+    distances = distances[np.isfinite(distances) & (distances > 0)]
+    if len(distances) == 0:
+        raise ValueError("No valid flight distances to build rotations from.")
+
+    shape = (int(n_aircraft), int(max_legs))
+    dist = distances[rng.integers(0, len(distances), size=shape)]
+    block = dist / CRUISE_KM_PER_MIN + BLOCK_OVERHEAD_MIN
+    slack = rng.exponential(mean_buffer, size=shape) if mean_buffer > 0 else np.zeros(shape)
+    slack[:, 0] = 0.0
+
+    ground = np.where(np.arange(shape[1]) > 0, min_turn, 0.0) + slack
+    day_minutes = np.cumsum(block + ground, axis=1)
+    valid = day_minutes <= duty_hours * 60.0
+    valid[:, 0] = True
+    # Keep only a contiguous prefix of legs per aircraft
+    valid = np.logical_and.accumulate(valid, axis=1)
+
+    return {
+        "distance": dist,
+        "block": block,
+        "slack": slack,
+        "valid": valid,
+        "legs": valid.sum(axis=1),
+    }
+
+
+def propagate_delays(primary: np.ndarray, slack: np.ndarray) -> np.ndarray:
+    """
+    Knock-on delay carried into each leg, vectorised over any leading axes.
+
+    Per chain, W_1 = 0 and W_k = max(W_{k-1} + P_{k-1} - S_k, 0). With
+    C_k = cumsum(P_{k-1} - S_k) and C_1 = 0 this is the Lindley form
+    W_k = C_k - min_{j<=k} C_j: one cumsum and one minimum.accumulate
+    along the leg axis. Total leg delay is primary + knock-on.
+    """
+    step = np.zeros_like(primary)
+    step[..., 1:] = primary[..., :-1] - slack[..., 1:]
+    np.cumsum(step, axis=-1, out=step)
+    return step - np.minimum.accumulate(step, axis=-1)
+
+
+def simulate_network_propagation(
+    model: dict,
+    rotations: dict,
+    replicas: int,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    seed: int | None = None,
+    chunk_elements: int = 4_000_000,
+) -> dict:
+    """
+    Monte Carlo over whole networks: replicas x aircraft x legs in chunks of replicas.
+
+    Primary delays come from the fitted delay model; knock-on delays from
+    propagate_delays. A chain "breaches" when any of its legs ends up more
+    than `threshold` minutes late; the same statistic ignoring knock-on
+    delay shows how much independence understates risk.
+    """
+    valid = rotations["valid"]
+    slack = rotations["slack"]
+    n_aircraft, max_legs = valid.shape
+    per_replica = n_aircraft * max_legs
+    chunk = max(1, int(chunk_elements // per_replica))
+
+    total_delay, knock_share, breach, breach_indep = [], [], [], []
+    leg_primary = np.zeros(max_legs)
+    leg_knock = np.zeros(max_legs)
+
+    t0 = time.perf_counter()
+    for rng, r in iter_seeded_blocks(int(replicas), seed, chunk):
+        primary = model_delay_draws(rng, r * per_replica, model, crisis_multiplier).reshape(r, n_aircraft, max_legs)
+        primary *= valid
+        knock = propagate_delays(primary, slack)
+        knock *= valid
+        total = primary + knock
+
+        net_total = total.sum(axis=(1, 2))
+        total_delay.append(net_total)
+        knock_share.append(np.divide(knock.sum(axis=(1, 2)), net_total, out=np.zeros(r), where=net_total > 0))
+        breach.append((total > threshold).any(axis=2).mean(axis=1))
+        breach_indep.append((primary > threshold).any(axis=2).mean(axis=1))
+        leg_primary += primary.sum(axis=(0, 1))
+        leg_knock += knock.sum(axis=(0, 1))
+    seconds = time.perf_counter() - t0
+
+    total_delay = np.concatenate(total_delay)
+    breach = np.concatenate(breach)
+    breach_indep = np.concatenate(breach_indep)
+    knock_share = np.concatenate(knock_share)
+
+    legs_per_position = valid.sum(axis=0) * len(total_delay)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        leg_profile = pd.DataFrame(
+            {
+                "Primary delay (min)": leg_primary / legs_per_position,
+                "Knock-on delay (min)": leg_knock / legs_per_position,
+            },
+            index=pd.Index(np.arange(1, max_legs + 1), name="Leg of day"),
+        )
+    leg_profile = leg_profile[legs_per_position > 0]
+
+    legs_simulated = int(valid.sum()) * len(total_delay)
+    return {
+        "replicas": len(total_delay),
+        "aircraft": n_aircraft,
+        "legs": int(valid.sum()),
+        "total_delay": total_delay,
+        "breach_share": breach,
+        "kpis": {
+            "network_delay_mean": float(total_delay.mean()),
+            "network_delay_p95": float(np.percentile(total_delay, 95)),
+            "knock_on_share": float(knock_share.mean() * 100.0),
+            "breach_share": float(breach.mean() * 100.0),
+            "breach_share_independent": float(breach_indep.mean() * 100.0),
+        },
+        "leg_profile": leg_profile,
+        "seconds": seconds,
+        "legs_per_sec": legs_simulated / seconds if seconds > 0 else float("inf"),
+    }
+
+
+_NETWORK_CACHE: OrderedDict = OrderedDict()
+_NETWORK_CACHE_SIZE = 32
+
+
+def network_delay_risk(
+    model: dict,
+    distances,
+    n_aircraft: int,
+    replicas: int,
+    threshold: float,
+    crisis_multiplier: float = 1.0,
+    mean_buffer: float = 20.0,
+    seed: int | None = None,
+) -> dict:
+    """
+    build_rotations + simulate_network_propagation, cached for seeded runs.
+
+    The key is (dataset fingerprint, model, distances fingerprint, aircraft,
+    replicas, buffer, threshold, multiplier, seed), so reruns that only
+    touch other widgets reuse the result. Adds "cached" to the result.
+    """
+    from services.data_service import dataset_fingerprint
+
+    distances = np.asarray(distances, dtype=np.float64)
+    key = (
+        model.get("fingerprint"),
+        model["kind"],
+        dataset_fingerprint(distances),
+        int(n_aircraft),
+        int(replicas),
+        float(mean_buffer),
+        float(threshold),
+        float(crisis_multiplier),
+        seed,
+    )
+    cacheable = key[0] is not None and seed is not None
+    if cacheable and key in _NETWORK_CACHE:
+        _NETWORK_CACHE.move_to_end(key)
+        return {**_NETWORK_CACHE[key], "cached": True}
+
+    rotations = build_rotations(distances, n_aircraft, mean_buffer=mean_buffer, seed=seed)
+    result = simulate_network_propagation(model, rotations, replicas, threshold, crisis_multiplier, seed=seed)
+    if cacheable:
+        _NETWORK_CACHE[key] = result
+        while len(_NETWORK_CACHE) > _NETWORK_CACHE_SIZE:
+            _NETWORK_CACHE.popitem(last=False)
+    return {**result, "cached": False}
+
+
+# ============================================================
+# Fuel price paths (shared log-return kernel: GBM, jumps, regimes)
+# ============================================================
+FUEL_MODELS = {
+    "gbm": "Geometric Brownian motion",
+    "merton": "Merton jump-diffusion",
+    "regime": "Regime-switching volatility",
+}
+
+# Defaults relative to the chosen annual volatility; override via fuel_model(**params)
+_FUEL_MODEL_DEFAULTS = {
+    "merton": {"jump_intensity": 4.0, "jump_mean": 0.03, "jump_std": 0.08},
+    "regime": {"calm_vol_scale": 0.75, "stress_vol_scale": 2.0, "p_enter_stress": 0.01, "p_exit_stress": 0.05},
+}
+
+
+def fuel_model(kind: str = "gbm", annual_vol: float = 0.35, annual_drift: float = 0.03, **params) -> dict:
+    """Build a fuel price model spec; extra params override the per-model defaults."""
+    if kind not in FUEL_MODELS:
+        raise ValueError(f"Unknown fuel model '{kind}'. Expected one of: {', '.join(FUEL_MODELS)}.")
+    return {"kind": kind, "annual_vol": annual_vol, "annual_drift": annual_drift, **_FUEL_MODEL_DEFAULTS.get(kind, {}), **params}
+
+
+def _gbm_log_returns(model: dict, rng: np.random.Generator, out: np.ndarray, dt: float) -> None:
+    dtype = out.dtype.type
+    vol = model["annual_vol"]
+    rng.standard_normal(out=out, dtype=out.dtype)
+    out *= dtype(vol * np.sqrt(dt))
+    out += dtype((model["annual_drift"] - 0.5 * vol**2) * dt)
+
+
+def _merton_log_returns(model: dict, rng: np.random.Generator, out: np.ndarray, dt: float) -> None:
+    """GBM diffusion plus compound-Poisson lognormal jumps; drift is jump-compensated."""
+    lam, mu_j, sd_j = model["jump_intensity"], model["jump_mean"], model["jump_std"]
+    kappa = np.exp(mu_j + 0.5 * sd_j**2) - 1.0
+    _gbm_log_returns({**model, "annual_drift": model["annual_drift"] - lam * kappa}, rng, out, dt)
+
+    # Jumps are rare: only touch the (day, path) cells that actually jump
+    n_jumps = rng.poisson(lam * dt, size=out.shape)
+    rows, cols = np.nonzero(n_jumps)
+    k = n_jumps[rows, cols]
+    out[rows, cols] += (k * mu_j + np.sqrt(k) * sd_j * rng.standard_normal(len(k))).astype(out.dtype)
+
+
+def _regime_states(model: dict, rng: np.random.Generator, days: int, n_paths: int) -> np.ndarray:
+    """
+    Two-state Markov regimes (0 = calm, 1 = stress) for every (day, path), without a day loop.
+
+    Sojourn lengths are geometric, so each path is an alternating sequence
+    of durations; switch days are scattered into a (days, paths) count
+    matrix and the regime is the initial state XOR the parity of its
+    cumulative sum.
+    """
+    p_in, p_out = model["p_enter_stress"], model["p_exit_stress"]
+    state0 = rng.random(n_paths) < p_in / (p_in + p_out)
+
+    expected = days * 2.0 * p_in * p_out / (p_in + p_out)
+    k = int(np.ceil(expected + 6.0 * np.sqrt(expected) + 4))
+    switch_at = np.zeros((n_paths, 0), dtype=np.int64)
+    while switch_at.shape[1] == 0 or switch_at[:, -1].min() < days:
+        j = np.arange(switch_at.shape[1], switch_at.shape[1] + k)
+        in_stress = state0[:, None] ^ (j % 2 == 1)[None, :]
+        durations = rng.geometric(np.where(in_stress, p_out, p_in))
+        last = switch_at[:, -1:] if switch_at.shape[1] else np.zeros((n_paths, 1), dtype=np.int64)
+        switch_at = np.concatenate([switch_at, last + np.cumsum(durations, axis=1)], axis=1)
+
+    path_idx = np.broadcast_to(np.arange(n_paths)[:, None], switch_at.shape)
+    hit = switch_at < days
+    marks = np.bincount(switch_at[hit] * n_paths + path_idx[hit], minlength=days * n_paths).reshape(days, n_paths)
+    return state0[None, :] ^ (np.cumsum(marks, axis=0) % 2 == 1)
+
+
+def _regime_log_returns(model: dict, rng: np.random.Generator, out: np.ndarray, dt: float) -> None:
+    dtype = out.dtype.type
+    stress = _regime_states(model, rng, out.shape[0], out.shape[1])
+    vol = np.where(
+        stress, model["annual_vol"] * model["stress_vol_scale"], model["annual_vol"] * model["calm_vol_scale"]
+    ).astype(out.dtype)
+
+    rng.standard_normal(out=out, dtype=out.dtype)
+    out *= vol * dtype(np.sqrt(dt))
+    vol *= vol
+    vol *= dtype(-0.5 * dt)
+    out += vol
+    out += dtype(model["annual_drift"] * dt)
+
+
+_LOG_RETURN_KERNELS = {
+    "gbm": _gbm_log_returns,
+    "merton": _merton_log_returns,
+    "regime": _regime_log_returns,
+}
+
+
+def simulate_fuel_paths(
+    model: dict,
+    start_price: float,
+    days: int,
+    n_paths: int,
+    dtype=np.float64,
+    rng: np.random.Generator | None = None,
+    backend: str = "numpy",
+) -> np.ndarray:
+    """
+    Shared vectorised path kernel for every fuel model.
+
+    The model's kernel fills the (days, n_paths) log-return block in place;
+    the common tail then cumulative-sums along the day axis and
+    exponentiates. Returns shape (days + 1, n_paths); row 0 is start_price.
+    With the Numba backend, float64 GBM fuses draw, scale, cumsum and exp
+    into one loop. float32 and the other models stay on NumPy (its SIMD
+    float32 exp beats a scalar compiled loop).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    dtype = np.dtype(dtype)
+
+    prices = np.empty((days + 1, n_paths), dtype=dtype)
+    prices[0, :] = start_price
+
+    if model["kind"] == "gbm" and dtype == np.float64 and backend != "numpy" and resolve_backend(backend) == "numba":
+        _jit_gbm_paths(model, rng, prices, start_price)
+        return prices
+
+    log_ret = prices[1:]
+    _LOG_RETURN_KERNELS[model["kind"]](model, rng, log_ret, 1.0 / DAYS_PER_YEAR)
+    np.cumsum(log_ret, axis=0, out=log_ret)
+    np.exp(log_ret, out=log_ret)
+    log_ret *= dtype.type(start_price)
+    return prices
+
+
+def simulate_gbm_paths(
+    start_price: float,
+    days: int,
+    annual_vol: float,
+    annual_drift: float,
+    n_paths: int,
+    dtype=np.float64,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """
+    Simulate GBM price paths in a single vectorised pass.
+
+    Draws the full (days, n_paths) shock matrix, turns it into
+    log-returns in place, cumulative-sums along the day axis and
+    exponentiates. Returns an array of shape (days + 1, n_paths);
+    row 0 is the starting price.
+    """
+    model = fuel_model("gbm", annual_vol, annual_drift)
+    return simulate_fuel_paths(model, start_price, days, n_paths, dtype=dtype, rng=rng)
+
+
+def gbm_draws(rng: np.random.Generator, n: int, **params) -> np.ndarray:
+    """Runner kernel: (days + 1, n) GBM paths from `rng`."""
+    return simulate_gbm_paths(n_paths=n, rng=rng, **params)
+
+
+def fuel_path_draws(rng: np.random.Generator, n: int, model: dict, **params) -> np.ndarray:
+    """Runner kernel: (days + 1, n) paths of any fuel model from `rng`."""
+    return simulate_fuel_paths(model, n_paths=n, rng=rng, **params)
+
+
+def iter_fuel_path_chunks(
+    model: dict,
+    start_price: float,
+    days: int,
+    n_paths: int,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    dtype=np.float64,
+    seed: int | None = None,
+    backend: str = "numpy",
+) -> Iterator[np.ndarray]:
+    """Yield path blocks of at most `chunk_paths` columns, each from its own spawned stream."""
+    for rng, size in iter_seeded_blocks(n_paths, seed, chunk_paths):
+        yield simulate_fuel_paths(model, start_price, days, size, dtype=dtype, rng=rng, backend=backend)
+
+
+def iter_gbm_path_chunks(
+    start_price: float,
+    days: int,
+    annual_vol: float,
+    annual_drift: float,
+    n_paths: int,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    dtype=np.float64,
+    seed: int | None = None,
+) -> Iterator[np.ndarray]:
+    """Yield GBM path blocks of at most `chunk_paths` columns, each from its own spawned stream."""
+    model = fuel_model("gbm", annual_vol, annual_drift)
+    return iter_fuel_path_chunks(model, start_price, days, n_paths, chunk_paths=chunk_paths, dtype=dtype, seed=seed)
+
+
+def benchmark_fuel_models(
+    start_price: float = 85.0,
+    days: int = 180,
+    annual_vol: float = 0.35,
+    annual_drift: float = 0.03,
+    n_paths: int = 50_000,
+    seed: int | None = 0,
+    dtypes=(np.float32, np.float64),
+) -> pd.DataFrame:
+    """Paths/sec for every fuel model and dtype, in DEFAULT_CHUNK_PATHS chunks."""
+    rows = []
+    for kind, label in FUEL_MODELS.items():
+        model = fuel_model(kind, annual_vol, annual_drift)
+        for dtype in dtypes:
+            t0 = time.perf_counter()
+            finals = [
+                block[-1] for block in iter_fuel_path_chunks(model, start_price, days, n_paths, dtype=dtype, seed=seed)
+            ]
+            seconds = time.perf_counter() - t0
+            final = np.concatenate(finals).astype(np.float64)
+            rows.append(
+                {
+                    "Model": label,
+                    "dtype": np.dtype(dtype).name,
+                    "Paths": n_paths,
+                    "Days": days,
+                    "Seconds": seconds,
+                    "Paths/sec": n_paths / seconds if seconds > 0 else float("inf"),
+                    "Final P5": float(np.percentile(final, 5)),
+                    "Final P95": float(np.percentile(final, 95)),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+class PercentileBands:
+    """
+    Per-day percentile bands folded from (days + 1, paths) price blocks.
+
+    Each day keeps a fixed-size histogram of log-prices, so memory is
+    O(days * bins) no matter how many paths stream through. Bin ranges
+    are set from the first block (widened on both sides); later
+    outliers are clamped into the edge bins, which only affects
+    quantiles far outside the reported bands.
+    """
+
+    def __init__(self, percentiles: tuple[float, ...] = DEFAULT_BAND_PERCENTILES, bins: int = _BAND_BINS):
+        self.percentiles = percentiles
+        self.bins = int(bins)
+        self.counts = None
+        self.lo = self.width = None
+        self.price_sum = None
+        self.n = 0
+
+    def update(self, block: np.ndarray) -> None:
+        n_days, n = block.shape
+        if n == 0:
+            return
+        bins = self.bins
+        log_p = np.log(block, dtype=np.float64)
+
+        if self.counts is None:
+            lo = log_p.min(axis=1)
+            hi = log_p.max(axis=1)
+            span = np.maximum(hi - lo, 1e-9)
+            self.lo = lo - span
+            self.width = 3.0 * span / bins
+            self.counts = np.zeros(n_days * bins, dtype=np.int64)
+            self.price_sum = np.zeros(n_days, dtype=np.float64)
+
+        self.price_sum += block.sum(axis=1, dtype=np.float64)
+
+        # Bin index computed in place to avoid extra (days, paths) temporaries
+        log_p -= self.lo[:, None]
+        log_p /= self.width[:, None]
+        np.floor(log_p, out=log_p)
+        np.clip(log_p, 0, bins - 1, out=log_p)
+        idx = log_p.astype(np.int64)
+        del log_p
+        idx += (np.arange(n_days, dtype=np.int64) * bins)[:, None]
+        self.counts += np.bincount(idx.ravel(), minlength=n_days * bins)
+        self.n += n
+
+    def frame(self) -> pd.DataFrame:
+        """One row per day: a column per percentile ("P5", "Median", ...) plus "Mean"."""
+        if self.counts is None:
+            return pd.DataFrame()
+
+        counts = self.counts.reshape(-1, self.bins)
+        cum = np.cumsum(counts, axis=1)
+
+        out = {}
+        for q in self.percentiles:
+            target = (q / 100.0) * self.n
+            j = np.argmax(cum >= target, axis=1)
+            below = np.where(j > 0, cum[np.arange(len(j)), j - 1], 0)
+            in_bin = np.maximum(counts[np.arange(len(j)), j], 1)
+            frac = np.clip((target - below) / in_bin, 0.0, 1.0)
+            out[f"P{q:g}" if q != 50 else "Median"] = np.exp(self.lo + (j + frac) * self.width)
+
+        bands = pd.DataFrame(out)
+        bands["Mean"] = self.price_sum / self.n
+        bands.index.name = "Day"
+        return bands
+
+
+def percentile_bands_from_chunks(
+    chunks: Iterator[np.ndarray],
+    percentiles: tuple[float, ...] = DEFAULT_BAND_PERCENTILES,
+    bins: int = _BAND_BINS,
+) -> pd.DataFrame:
+    """Fold (days + 1, paths) price blocks into per-day percentile bands (see PercentileBands)."""
+    bands = PercentileBands(percentiles, bins)
+    for block in chunks:
+        bands.update(block)
+    return bands.frame()
+
+
+def fuel_price_bands(
+    start_price: float,
+    days: int,
+    annual_vol: float,
+    annual_drift: float,
+    n_paths: int,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    dtype=np.float32,
+    percentiles: tuple[float, ...] = DEFAULT_BAND_PERCENTILES,
+    seed: int | None = None,
+    kind: str = "gbm",
+    model_params: dict | None = None,
+    backend: str = "numpy",
+) -> pd.DataFrame:
+    """Percentile fan-chart bands for fuel prices (100k+ paths, bounded memory); `kind` picks the model."""
+    model = fuel_model(kind, annual_vol, annual_drift, **(model_params or {}))
+    chunks = iter_fuel_path_chunks(
+        model, start_price, days, n_paths, chunk_paths=chunk_paths, dtype=dtype, seed=seed, backend=backend
+    )
+    bands = percentile_bands_from_chunks(chunks, percentiles=percentiles)
+    if not bands.empty:
+        bands.iloc[0, :] = start_price
+    return bands
+
+
+# ============================================================
+# Fuel price risk: VaR / CVaR, drawdowns, hedging
+# ============================================================
+DEFAULT_FUEL_HORIZONS = (7, 30, 90, 180, 365)
+DEFAULT_HEDGE_RATIOS = (0.0, 0.25, 0.5, 0.75, 1.0)
+DEFAULT_FUEL_VOLUME_BBL = 1_000_000
+
+
+def _var_cvar(losses: np.ndarray, confidence: float) -> tuple[float, float]:
+    var = float(np.quantile(losses, confidence))
+    tail = losses[losses >= var]
+    return var, float(tail.mean()) if len(tail) else var
+
+
+def fuel_risk_from_chunks(
+    chunks: Iterator[np.ndarray],
+    start_price: float,
+    horizons,
+    hedge_ratios=DEFAULT_HEDGE_RATIOS,
+    confidence: float = 0.95,
+    volume_bbl: float = DEFAULT_FUEL_VOLUME_BBL,
+) -> dict:
+    """
+    Risk analytics over (days + 1, paths) price blocks, one pass, bounded memory.
+
+    Only prices at the requested horizons and two per-path scalars (max
+    drawdown, max run-up) are kept, so memory is O(len(horizons) * paths)
+    rather than O(days * paths). The airline is a fuel buyer: loss is the
+    per-barrel price rise from start_price. A hedge ratio h locks h of the
+    volume at start_price (a simple swap) at the final horizon.
+    """
+    horizons = sorted({int(h) for h in horizons})
+    at_h, max_dd, max_ru = [], [], []
+
+    t0 = time.perf_counter()
+    for block in chunks:
+        horizons = [h for h in horizons if h < block.shape[0]] or [block.shape[0] - 1]
+        at_h.append(block[horizons, :].astype(np.float64))
+
+        # Running peak / trough along the day axis, then worst relative move per path
+        peak = np.maximum.accumulate(block, axis=0)
+        max_dd.append(((peak - block) / peak).max(axis=0))
+        del peak
+        trough = np.minimum.accumulate(block, axis=0)
+        max_ru.append(((block - trough) / trough).max(axis=0))
+    seconds = time.perf_counter() - t0
+
+    prices = np.concatenate(at_h, axis=1)
+    max_dd = np.concatenate(max_dd) * 100.0
+    max_ru = np.concatenate(max_ru) * 100.0
+    n_paths = prices.shape[1]
+
+    rows = []
+    for i, h in enumerate(horizons):
+        loss = prices[i] - start_price
+        var, cvar = _var_cvar(loss, confidence)
+        p5, p50, p95 = np.percentile(prices[i], [5, 50, 95])
+        rows.append(
+            {
+                "Horizon (days)": h,
+                "P5 price": p5,
+                "Median price": p50,
+                "P95 price": p95,
+                "VaR (USD/bbl)": var,
+                "CVaR (USD/bbl)": cvar,
+                "VaR (USD M)": var * volume_bbl / 1e6,
+                "CVaR (USD M)": cvar * volume_bbl / 1e6,
+            }
+        )
+    var_table = pd.DataFrame(rows).set_index("Horizon (days)")
+
+    qs = [50, 90, 95, 99]
+    drawdowns = pd.DataFrame(
+        {"Max drawdown %": np.percentile(max_dd, qs), "Max run-up %": np.percentile(max_ru, qs)},
+        index=pd.Index([f"P{q}" for q in qs], name="Percentile"),
+    )
+
+    final = prices[-1]
+    hedge_rows = []
+    for h in hedge_ratios:
+        # Cost per barrel vs. start price (positive = paying more)
+        cost_change = (1.0 - h) * (final - start_price)
+        hedge_pnl = h * (final - start_price)
+        var, cvar = _var_cvar(cost_change, confidence)
+        hedge_rows.append(
+            {
+                "Hedge ratio": h,
+                "Expected cost change (USD M)": float(cost_change.mean()) * volume_bbl / 1e6,
+                "Std (USD M)": float(cost_change.std()) * volume_bbl / 1e6,
+                "VaR (USD M)": var * volume_bbl / 1e6,
+                "CVaR (USD M)": cvar * volume_bbl / 1e6,
+                "Hedge P&L mean (USD M)": float(hedge_pnl.mean()) * volume_bbl / 1e6,
+                "P(hedge loses) %": float(np.mean(hedge_pnl < 0) * 100.0) if h > 0 else 0.0,
+            }
+        )
+    hedge_table = pd.DataFrame(hedge_rows).set_index("Hedge ratio")
+
+    return {
+        "paths": n_paths,
+        "confidence": confidence,
+        "var_table": var_table,
+        "drawdowns": drawdowns,
+        "hedge_table": hedge_table,
+        "max_drawdown": max_dd,
+        "seconds": seconds,
+        "paths_per_sec": n_paths / seconds if seconds > 0 else float("inf"),
+    }
+
+
+def fuel_risk_analytics(
+    start_price: float,
+    days: int,
+    annual_vol: float,
+    annual_drift: float,
+    n_paths: int,
+    horizons=DEFAULT_FUEL_HORIZONS,
+    hedge_ratios=DEFAULT_HEDGE_RATIOS,
+    confidence: float = 0.95,
+    volume_bbl: float = DEFAULT_FUEL_VOLUME_BBL,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    dtype=np.float32,
+    seed: int | None = None,
+    kind: str = "gbm",
+    model_params: dict | None = None,
+    backend: str = "numpy",
+) -> dict:
+    """VaR/CVaR, drawdown and hedge analytics for simulated fuel paths (see fuel_risk_from_chunks)."""
+    horizons = [h for h in horizons if h < days] + [days]
+    model = fuel_model(kind, annual_vol, annual_drift, **(model_params or {}))
+    chunks = iter_fuel_path_chunks(
+        model, start_price, days, n_paths, chunk_paths=chunk_paths, dtype=dtype, seed=seed, backend=backend
+    )
+    return fuel_risk_from_chunks(chunks, start_price, horizons, hedge_ratios, confidence, volume_bbl)
+
+
+def fuel_bands_and_risk(
+    start_price: float,
+    days: int,
+    annual_vol: float,
+    annual_drift: float,
+    n_paths: int,
+    horizons=DEFAULT_FUEL_HORIZONS,
+    hedge_ratios=DEFAULT_HEDGE_RATIOS,
+    confidence: float = 0.95,
+    volume_bbl: float = DEFAULT_FUEL_VOLUME_BBL,
+    chunk_paths: int = DEFAULT_CHUNK_PATHS,
+    dtype=np.float32,
+    percentiles: tuple[float, ...] = DEFAULT_BAND_PERCENTILES,
+    seed: int | None = None,
+    kind: str = "gbm",
+    model_params: dict | None = None,
+    backend: str = "numpy",
+) -> dict:
+    """
+    Fan-chart bands and risk analytics from one simulation pass.
+
+    Every path block is folded into the bands and the risk statistics
+    before the next one is drawn, so the result equals fuel_price_bands()
+    and fuel_risk_analytics() with the same arguments at the cost of one.
+    Returns {"bands", "risk"}.
+    """
+    horizons = [h for h in horizons if h < days] + [days]
+    model = fuel_model(kind, annual_vol, annual_drift, **(model_params or {}))
+    chunks = iter_fuel_path_chunks(
+        model, start_price, days, n_paths, chunk_paths=chunk_paths, dtype=dtype, seed=seed, backend=backend
+    )
+    bands = PercentileBands(percentiles)
+
+    def _fold_bands():
+        for block in chunks:
+            bands.update(block)
+            yield block
+
+    risk = fuel_risk_from_chunks(_fold_bands(), start_price, horizons, hedge_ratios, confidence, volume_bbl)
+    frame = bands.frame()
+    if not frame.empty:
+        frame.iloc[0, :] = start_price
+    return {"bands": frame, "risk": risk}
+
+
+# ============================================================
+# Optional compiled kernels (Numba)
+# ============================================================
+SIMULATION_BACKENDS = {
+    "auto": "Auto (Numba if installed)",
+    "numpy": "NumPy (vectorised)",
+    "numba": "Numba JIT (fused loops)",
+}
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """Backend that will actually run: "numba" only when requested (or auto) and installed."""
+    if backend not in SIMULATION_BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of: {', '.join(SIMULATION_BACKENDS)}.")
+    return "numba" if backend != "numpy" and numba is not None else "numpy"
+
+
+# The loops below draw from the caller's Generator in the same order as the
+# NumPy kernels, so seeded results are bit-identical (paths through exp()
+# agree to within an ulp). Each kernel writes straight into its output:
+# no index arrays, masks or scaled copies.
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _jit_clipped_normal(rng, n, mean, std, crisis):
+        out = np.empty(n)
+        for i in range(n):
+            x = rng.normal(mean, std)
+            out[i] = (x if x > 0.0 else 0.0) * crisis
+        return out
+
+    @numba.njit(cache=True)
+    def _jit_gather_scale(pool, idx, crisis):
+        out = np.empty(idx.size)
+        for i in range(idx.size):
+            out[i] = pool[idx[i]] * crisis
+        return out
+
+    @numba.njit(cache=True)
+    def _jit_gather(pool, idx):
+        out = np.empty(idx.size)
+        for i in range(idx.size):
+            out[i] = pool[idx[i]]
+        return out
+
+    @numba.njit(cache=True)
+    def _jit_zero_inflate_scale(rng, out, p_zero, crisis):
+        for i in range(out.size):
+            if rng.random() < p_zero:
+                out[i] = 0.0
+            else:
+                out[i] *= crisis
+
+    @numba.njit(cache=True)
+    def _jit_kde_noise(rng, out, bandwidth):
+        for i in range(out.size):
+            out[i] = np.exp(out[i] + bandwidth * rng.standard_normal())
+
+    @numba.njit(cache=True)
+    def _jit_gbm(rng, prices, vol_dt, drift_dt, start):
+        # Day-major, like standard_normal(out=...) fills the (days, paths) block
+        acc = np.zeros(prices.shape[1])
+        for d in range(prices.shape[0] - 1):
+            for j in range(prices.shape[1]):
+                acc[j] += rng.standard_normal() * vol_dt + drift_dt
+                prices[d + 1, j] = np.exp(acc[j]) * start
+
+
+def _jit_model_delay_draws(rng: np.random.Generator, n: int, model: dict, crisis_multiplier: float) -> np.ndarray:
+    kind = model["kind"]
+    crisis = float(crisis_multiplier)
+    if kind == "normal":
+        return _jit_clipped_normal(rng, int(n), float(model["mean"]), float(model["std"]), crisis)
+    # Numba's scalar integers()/lognormal()/gamma() are slower than NumPy's
+    # vectorised draws, so those are drawn by NumPy (same stream) and the
+    # gather, noise, zero-inflation and scaling steps are fused
+    if kind == "empirical":
+        pool = model["values"]
+        return _jit_gather_scale(pool, rng.integers(0, len(pool), size=n), crisis)
+
+    if kind == "zi_lognormal":
+        out = rng.lognormal(model["mu"], model["sigma"], size=n)
+    elif kind == "zi_gamma":
+        out = rng.gamma(model["shape"], model["scale"], size=n)
+    elif kind == "kde":
+        pool = model["log_values"]
+        out = _jit_gather(pool, rng.integers(0, len(pool), size=n))
+        _jit_kde_noise(rng, out, float(model["bandwidth"]))
+    else:
+        raise ValueError(f"Unknown delay model '{kind}'.")
+    _jit_zero_inflate_scale(rng, out, float(model["p_zero"]), crisis)
+    return out
+
+
+def _jit_gbm_paths(model: dict, rng: np.random.Generator, prices: np.ndarray, start_price: float) -> None:
+    dt = 1.0 / DAYS_PER_YEAR
+    vol = model["annual_vol"]
+    _jit_gbm(rng, prices, vol * np.sqrt(dt), (model["annual_drift"] - 0.5 * vol**2) * dt, float(start_price))
+
+
+def _compare_backends(run, warmup) -> dict:
+    """Time one kernel under both backends (same seed) and compare outputs."""
+    t0 = time.perf_counter()
+    ref = run("numpy")
+    numpy_s = time.perf_counter() - t0
+
+    row = {"NumPy (ms)": numpy_s * 1000.0}
+    if numba is None:
+        missing = {"Numba (ms)": np.nan, "Compile (ms)": np.nan, "Speedup ×": np.nan, "Max rel. diff": np.nan}
+        return {**row, **missing, "Bit-identical": None}
+
+    t0 = time.perf_counter()
+    warmup()
+    compile_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    jit = run("numba")
+    numba_s = time.perf_counter() - t0
+
+    scale = np.maximum(np.abs(ref.astype(np.float64)), np.finfo(ref.dtype).tiny)
+    return {
+        **row,
+        "Numba (ms)": numba_s * 1000.0,
+        "Compile (ms)": compile_s * 1000.0,
+        "Speedup ×": numpy_s / numba_s if numba_s > 0 else float("inf"),
+        "Max rel. diff": float(np.max(np.abs(jit.astype(np.float64) - ref) / scale)) if ref.size else 0.0,
+        "Bit-identical": bool(np.array_equal(ref, jit)),
+    }
+
+
+def benchmark_backends(
+    values,
+    n: int = 1_000_000,
+    fuel_paths: int = 20_000,
+    fuel_days: int = 180,
+    seed: int | None = 0,
+    kinds: tuple[str, ...] = tuple(DELAY_MODELS),
+) -> pd.DataFrame:
+    """
+    NumPy vs Numba for every delay model and the GBM fuel kernel (float32/float64),
+    with the same seed on both sides. Compile time (first call) is reported
+    separately from the timed run; "Max rel. diff" is the numerical
+    equivalence check (0 for bit-identical kernels, ~1 ulp through exp()).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rows = []
+    for kind in kinds:
+        model = fit_delay_model(kind, values)
+        row = _compare_backends(
+            lambda b: model_delay_draws(np.random.default_rng(seed), n, model, 1.15, backend=b),
+            lambda: model_delay_draws(np.random.default_rng(seed), 16, model, 1.15, backend="numba"),
+        )
+        rows.append({"Kernel": f"Delay: {DELAY_MODELS[kind]}", "Elements": n, **row})
+
+    gbm = fuel_model("gbm")
+    for dtype in (np.float32, np.float64):
+        row = _compare_backends(
+            lambda b: simulate_fuel_paths(gbm, 85.0, fuel_days, fuel_paths, dtype, np.random.default_rng(seed), backend=b),
+            lambda: simulate_fuel_paths(gbm, 85.0, 2, 4, dtype, np.random.default_rng(seed), backend="numba"),
+        )
+        rows.append({"Kernel": f"Fuel GBM paths ({np.dtype(dtype).name})", "Elements": fuel_paths * fuel_days, **row})
+    return pd.DataFrame(rows)
@@ -0,0 +1,330 @@
+# ============================================================
+# stream_service.py – Local Event Stream (replayer + consumer)
+# ============================================================
+#
+# A real event stream for the Cloud Analytics module. A replayer
+# thread emits dataset rows at a configurable rate, either as
+# datagrams over a Unix socket pair or as lines appended to a log
+# file that the consumer tails. The consumer updates rolling-window
+# KPIs per event and reports sustained throughput, end-to-end lag
+# and dropped events.
+# ============================================================
+
+from __future__ import annotations
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import DELAY_CANDIDATES, DISTANCE_CANDIDATES, first_existing_col
+
+# Unix datagram sockets are unavailable on Windows; only the file tail works there.
+STREAM_SOURCES = ("socket", "file") if hasattr(socket, "AF_UNIX") else ("file",)
+
+DEFAULT_SOCKET_BUFFER = 1 << 20
+_END = b"END"
+
+
+# ============================================================
+# Helpers
+# ============================================================
+def _encode_rows(df: pd.DataFrame) -> list[bytes]:
+    """Per-row payload b"delay,distance" (missing values as nan), encoded once before replay."""
+    cols = []
+    for candidates in (DELAY_CANDIDATES, DISTANCE_CANDIDATES):
+        col = first_existing_col(df, candidates)
+        values = (
+            pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            if col
+            else np.full(len(df), np.nan)
+        )
+        cols.append(values)
+    return [f"{d!r},{x!r}".encode("ascii") for d, x in zip(cols[0].tolist(), cols[1].tolist())]
+
+
+# ============================================================
+# Replayer (producer)
+# ============================================================
+class EventReplayer(threading.Thread):
+    """
+    Emits `events` rows (cycling through the dataset) at `rate` events/sec
+    (0 = as fast as possible). Each event is b"seq,emit_time,delay,distance".
+
+    Socket sink: non-blocking datagrams; an event that finds the socket
+    buffer full is dropped, as a monitoring feed would. File sink: lines
+    appended to an append-only log (never dropped, lag grows instead).
+    """
+
+    def __init__(self, payloads: list[bytes], events: int, rate: float, sock=None, path: Path | None = None):
+        super().__init__(daemon=True)
+        if not payloads:
+            raise ValueError("Nothing to replay: the dataset has no rows.")
+        self.payloads = payloads
+        self.events = int(events)
+        self.rate = float(rate)
+        self.sock = sock
+        self.path = path
+        self.sent = 0
+        self.dropped = 0
+        self.stop_event = threading.Event()
+
+    def _due(self, t0: float) -> int:
+        if self.rate <= 0:
+            return self.events
+        return min(self.events, int((time.perf_counter() - t0) * self.rate) + 1)
+
+    def run(self) -> None:
+        n = len(self.payloads)
+        out = open(self.path, "ab") if self.path is not None else None
+        try:
+            t0 = time.perf_counter()
+            seq = 0
+            while seq < self.events and not self.stop_event.is_set():
+                due = self._due(t0)
+                lines = []
+                while seq < due:
+                    event = b"%d,%r," % (seq, time.time()) + self.payloads[seq % n]
+                    if out is not None:
+                        lines.append(event + b"\n")
+                        self.sent += 1
+                    else:
+                        try:
+                            self.sock.send(event)
+                            self.sent += 1
+                        except BlockingIOError:
+                            self.dropped += 1
+                    seq += 1
+                if lines:
+                    out.write(b"".join(lines))
+                    out.flush()
+                if seq < self.events:
+                    time.sleep(0.0005)
+            end = b"%s,%d" % (_END, seq)
+            if out is not None:
+                out.write(end + b"\n")
+                out.flush()
+            else:
+                self.sock.setblocking(True)
+                self.sock.send(end)
+        finally:
+            if out is not None:
+                out.close()
+
+
+# ============================================================
+# Consumer (incremental window KPIs)
+# ============================================================
+class RollingWindow:
+    """Last `size` events with NaN-aware running sums/counts, updated in O(1) per event."""
+
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self.events: deque = deque()
+        self.sums = [0.0, 0.0]
+        self.counts = [0, 0]
+
+    def push(self, delay: float, distance: float) -> None:
+        for j, v in enumerate((delay, distance)):
+            if v == v:
+                self.sums[j] += v
+                self.counts[j] += 1
+        self.events.append((delay, distance))
+        if len(self.events) > self.size:
+            for j, v in enumerate(self.events.popleft()):
+                if v == v:
+                    self.sums[j] -= v
+                    self.counts[j] -= 1
+
+    def means(self) -> tuple[float | None, float | None]:
+        return tuple(s / c if c else None for s, c in zip(self.sums, self.counts))
+
+
+class StreamConsumer:
+    """Parses events, tracks sequence gaps and lag, and emits a KPI snapshot every `report_every` events."""
+
+    def __init__(self, window_size: int, report_every: int, expected: int):
+        self.window = RollingWindow(window_size)
+        self.report_every = max(1, int(report_every))
+        self.lags = np.empty(max(1, int(expected)), dtype=np.float64)
+        self.received = 0
+        self.gaps = 0
+        self.next_seq = 0
+        self.first_at: float | None = None
+        self.last_at: float | None = None
+        self.snapshots: list[dict] = []
+        self._interval_lag = 0.0
+
+    def on_event(self, line: bytes) -> bool:
+        """Handle one event; returns False on the end-of-stream marker."""
+        now = time.time()
+        parts = line.split(b",")
+        if parts[0] == _END:
+            return False
+        seq = int(parts[0])
+        if seq > self.next_seq:
+            self.gaps += seq - self.next_seq
+        self.next_seq = seq + 1
+
+        lag = now - float(parts[1])
+        if self.received < len(self.lags):
+            self.lags[self.received] = lag
+        self._interval_lag += lag
+        self.window.push(float(parts[2]), float(parts[3]))
+
+        self.received += 1
+        self.first_at = now if self.first_at is None else self.first_at
+        self.last_at = now
+        if self.received % self.report_every == 0:
+            self._snapshot()
+        return True
+
+    def _snapshot(self) -> None:
+        avg_delay, avg_dist = self.window.means()
+        elapsed = (self.last_at - self.first_at) if self.first_at is not None else 0.0
+        in_interval = self.received % self.report_every or self.report_every
+        self.snapshots.append(
+            {
+                "Events": self.received,
+                "Dropped": self.gaps,
+                "Window Avg Delay": avg_delay,
+                "Window Avg Distance": avg_dist,
+                "Lag ms": self._interval_lag / in_interval * 1000.0,
+                "Events/sec": self.received / elapsed if elapsed > 0 else None,
+            }
+        )
+        self._interval_lag = 0.0
+
+    def finish(self) -> None:
+        if self.received % self.report_every:
+            self._snapshot()
+
+
+def _consume_socket(sock, consumer: StreamConsumer, timeout: float) -> bool:
+    sock.settimeout(timeout)
+    while True:
+        try:
+            data = sock.recv(4096)
+        except socket.timeout:
+            return False
+        if not consumer.on_event(data):
+            return True
+
+
+def _consume_file(path: Path, consumer: StreamConsumer, timeout: float) -> bool:
+    pending = b""
+    idle_since = time.perf_counter()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1 << 16)
+            if not chunk:
+                if time.perf_counter() - idle_since > timeout:
+                    return False
+                time.sleep(0.0005)
+                continue
+            idle_since = time.perf_counter()
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                if not consumer.on_event(line):
+                    return True
+
+
+# ============================================================
+# Stream runner
+# ============================================================
+def run_event_stream(
+    df: pd.DataFrame,
+    source: str = STREAM_SOURCES[0],
+    rate: float = 20_000,
+    events: int = 20_000,
+    window_size: int = 4_000,
+    report_every: int = 1_000,
+    path: str | Path | None = None,
+    buffer_bytes: int = DEFAULT_SOCKET_BUFFER,
+    timeout: float = 5.0,
+) -> dict:
+    """
+    Replay `events` dataset rows at `rate` events/sec through a local
+    source and consume them incrementally.
+
+    source="socket": Unix datagram socket pair (drops when the buffer is full;
+    not available where the platform lacks AF_UNIX, e.g. Windows).
+    source="file": append-only log file tailed by the consumer (path
+    defaults to a temporary file that is removed afterwards).
+
+    Returns {"timeline", "source", "sent", "received", "dropped",
+    "seconds", "events_per_sec", "target_rate", "lag_ms", "window",
+    "completed"}.
+    """
+    if source not in STREAM_SOURCES:
+        raise ValueError(f"Unknown stream source: {source}. Choose one of {STREAM_SOURCES}.")
+    events = max(1, int(events))
+    payloads = _encode_rows(df)
+    consumer = StreamConsumer(window_size, report_every, events)
+
+    t0 = time.perf_counter()
+    if source == "socket":
+        producer_sock, consumer_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            producer_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(buffer_bytes))
+            consumer_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(buffer_bytes))
+            producer_sock.setblocking(False)
+            replayer = EventReplayer(payloads, events, rate, sock=producer_sock)
+            replayer.start()
+            completed = _consume_socket(consumer_sock, consumer, timeout)
+            replayer.stop_event.set()
+            replayer.join()
+        finally:
+            producer_sock.close()
+            consumer_sock.close()
+    else:
+        owned = path is None
+        if owned:
+            # a unique file per run: Streamlit sessions are threads of one process
+            fd, name = tempfile.mkstemp(prefix="sia_events_", suffix=".log")
+            os.close(fd)
+            path = Path(name)
+        else:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"")
+        try:
+            replayer = EventReplayer(payloads, events, rate, path=path)
+            replayer.start()
+            completed = _consume_file(path, consumer, timeout)
+            replayer.stop_event.set()
+            replayer.join()
+        finally:
+            if owned:
+                path.unlink(missing_ok=True)
+    seconds = time.perf_counter() - t0
+    consumer.finish()
+
+    lags_ms = consumer.lags[: min(consumer.received, len(consumer.lags))] * 1000.0
+    elapsed = (consumer.last_at - consumer.first_at) if consumer.received > 1 else 0.0
+    avg_delay, avg_dist = consumer.window.means()
+    return {
+        "timeline": pd.DataFrame(consumer.snapshots),
+        "source": source,
+        "sent": int(replayer.sent),
+        "received": int(consumer.received),
+        "dropped": int(events - consumer.received),
+        "seconds": float(seconds),
+        "events_per_sec": float(consumer.received / elapsed) if elapsed > 0 else None,
+        "target_rate": float(rate),
+        "lag_ms": {
+            "mean": float(lags_ms.mean()) if len(lags_ms) else None,
+            "p50": float(np.percentile(lags_ms, 50)) if len(lags_ms) else None,
+            "p95": float(np.percentile(lags_ms, 95)) if len(lags_ms) else None,
+            "max": float(lags_ms.max()) if len(lags_ms) else None,
+        },
+        "window": {"avg_delay": avg_delay, "avg_distance": avg_dist, "events": len(consumer.window.events)},
+        "completed": bool(completed),
+    }
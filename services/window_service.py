@@ -0,0 +1,117 @@
+# ============================================================
+# window_service.py – Rolling-Window Index
+# ============================================================
+#
+# Prefix sums and NaN-aware prefix counts over the numeric KPI
+# columns, built once per dataset. Any contiguous window's sum, count
+# or mean is then two lookups and a subtraction, and a whole sweep of
+# windows is one vectorised subtraction over arrays of offsets.
+# ============================================================
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from services.data_service import DELAY_CANDIDATES, DISTANCE_CANDIDATES, first_existing_col
+
+WINDOW_COLUMNS = {"delay": DELAY_CANDIDATES, "distance": DISTANCE_CANDIDATES}
+
+# dataset fingerprint -> WindowIndex
+_INDEX_CACHE: OrderedDict = OrderedDict()
+_INDEX_CACHE_SIZE = 8
+
+
+# ============================================================
+# Prefix-sum index
+# ============================================================
+class WindowIndex:
+    """
+    Prefix sums S and counts C (length n + 1, S[0] = C[0] = 0) per column.
+
+    Window [start, end) has sum S[end] - S[start] and count C[end] - C[start];
+    missing values add 0 to both. Integer-valued columns (minutes, miles)
+    sum exactly in float64, so their window means equal a direct rescan.
+    Every method broadcasts over arrays of starts/ends.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.rows = len(next(iter(columns.values()))) if columns else 0
+        self.sums: dict[str, np.ndarray] = {}
+        self.counts: dict[str, np.ndarray] = {}
+        for name, values in columns.items():
+            values = np.asarray(values, dtype=np.float64)
+            if len(values) != self.rows:
+                raise ValueError("All indexed columns must have the same length.")
+            valid = ~np.isnan(values)
+            self.sums[name] = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+            self.counts[name] = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: dict[str, list[str]] = WINDOW_COLUMNS) -> "WindowIndex":
+        """Index the first matching column for each name (names with no match are skipped)."""
+        found = {}
+        for name, candidates in columns.items():
+            col = first_existing_col(df, candidates)
+            if col:
+                found[name] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        index = cls(found)
+        index.rows = len(df)
+        return index
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sums
+
+    def _bounds(self, start, end) -> tuple[np.ndarray, np.ndarray]:
+        start = np.clip(np.asarray(start, dtype=np.int64), 0, self.rows)
+        end = np.clip(np.asarray(end, dtype=np.int64), start, self.rows)
+        return start, end
+
+    def count(self, name: str, start, end):
+        start, end = self._bounds(start, end)
+        return self.counts[name][end] - self.counts[name][start]
+
+    def sum(self, name: str, start, end):
+        start, end = self._bounds(start, end)
+        return self.sums[name][end] - self.sums[name][start]
+
+    def mean(self, name: str, start, end):
+        """Window mean; NaN where the window holds no valid values."""
+        start, end = self._bounds(start, end)
+        counts = self.counts[name][end] - self.counts[name][start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.sums[name][end] - self.sums[name][start]) / counts
+
+    def sweep(self, window_size: int, step: int = 1, start: int = 0, stop: int | None = None) -> pd.DataFrame:
+        """
+        Every full window of window_size rows starting at start, start + step, ...
+        Returns one row per window: Start, Window Rows, and "<name> mean" /
+        "<name> count" for each indexed column.
+        """
+        window_size = max(1, int(window_size))
+        step = max(1, int(step))
+        stop = self.rows if stop is None else min(int(stop), self.rows)
+        starts = np.arange(max(0, int(start)), stop - window_size + 1, step, dtype=np.int64)
+        ends = starts + window_size
+
+        out = {"Start": starts, "Window Rows": ends - starts}
+        for name in self.sums:
+            out[f"{name} count"] = self.count(name, starts, ends)
+            out[f"{name} mean"] = self.mean(name, starts, ends)
+        return pd.DataFrame(out)
+
+
+def window_index(df: pd.DataFrame, fingerprint: str | None = None) -> WindowIndex:
+    """Build the window index for df, reusing a cached one when a dataset fingerprint is given."""
+    if fingerprint is None:
+        return WindowIndex.from_frame(df)
+    if fingerprint in _INDEX_CACHE:
+        _INDEX_CACHE.move_to_end(fingerprint)
+        return _INDEX_CACHE[fingerprint]
+    index = WindowIndex.from_frame(df)
+    _INDEX_CACHE[fingerprint] = index
+    while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+        _INDEX_CACHE.popitem(last=False)
+    return index